@@ -1,17 +1,38 @@
 import os
 import json
 import re
+import time
+import random
+import threading
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from flask import Flask, request, render_template
 from dotenv import load_dotenv
 import fitz
 import docx2txt
 from google.cloud import vision_v1 as vision
-from pdf2image import convert_from_bytes
 from langchain_google_vertexai import ChatVertexAI
+import shutil
 import tempfile
-from flask import Flask, request, render_template, jsonify
+from typing import Literal
+from werkzeug.datastructures import FileStorage
+from pydantic import BaseModel
+import requests
+from flask import Flask, Request, request, render_template, jsonify
+from utils.ocr_cache import ocr_cache
+from utils.ocr_preprocess import render_pdf_page, encode_for_ocr, record_ocr_call, ocr_stats
+from utils.keywords import CITIZEN_KEYWORDS, BUSINESS_KEYWORDS, STUDENT_KEYWORDS, KEYWORD_WEIGHTS
+from utils.keyword_scorer import KeywordScorer
+from utils.classify_sampler import (
+    CLASSIFY_TOKEN_BUDGET, sample_for_classification, estimate_tokens,
+    record_classification, classification_stats
+)
+from utils.structured_output import invoke_structured, structured_output_stats
+from utils.local_classifier import (
+    local_classifier, LOCAL_CLASSIFIER_THRESHOLD, LOCAL_CLASSIFIER_SHADOW_RATE,
+    record_decision, record_agreement, classifier_stats
+)
 
 load_dotenv()
 
@@ -28,149 +49,253 @@ app = Flask(
     __name__,
     template_folder=os.path.join(BASE_DIR, "templates")  # Set template path
 )
+
+# Background executor used to run full-document extraction while the sample is being classified
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("EXTRACT_WORKERS", "2")))
+# Shadow re-classifications get their own pool so they never delay a speculative extraction
+shadow_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SHADOW_CHECK_WORKERS", "1")))
+
+# Summary service used by /pipeline to summarize while pages are still being extracted
+SUMMARY_MODEL_URL = os.getenv("AI_SUMMARY_MODEL_URL", "http://localhost:8081")
+# ------------------- OCR Function -------------------
+def ocr_image(image, cache_key=None):
+    """
+    OCR a single page image with Vision, consulting the OCR cache first.
+    The image is converted to grayscale and encoded as JPEG/PNG by the preprocessing stage.
+    """
+    if ocr_cache and cache_key:
+        cached_text = ocr_cache.get(cache_key)
+        if cached_text is not None:
+            return cached_text
+
+    content, fmt = encode_for_ocr(image)
+    start = time.time()
+    response = vision_client.document_text_detection(image=vision.Image(content=content))
+    latency = time.time() - start
+    record_ocr_call(len(content), latency, fmt)
+    print(f"[OCR] Sent {len(content) / 1024:.1f} KB ({fmt}), Vision latency {latency:.2f} seconds")
+
+    page_text = response.full_text_annotation.text
+    if ocr_cache and cache_key and not response.error.message:
+        ocr_cache.put(cache_key, page_text)
+    return page_text
+
+# ------------------- Upload Handling -------------------
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+UPLOAD_SPOOL_BYTES = int(float(os.getenv("UPLOAD_SPOOL_MB", "2")) * 1024 * 1024)
+
+class SpooledRequest(Request):
+    """
+    Keeps small uploads in memory and spools larger ones to a named temporary file,
+    so PDFs can be opened by path instead of being read into worker memory.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if total_content_length is not None and total_content_length <= UPLOAD_SPOOL_BYTES:
+            return BytesIO()
+        return tempfile.NamedTemporaryFile("wb+", suffix=os.path.splitext(filename or "")[1])
+
+app.request_class = SpooledRequest
+# Larger requests are rejected with 413 before the body is parsed
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+
+def spooled_path(file_storage):
+    """Filesystem path of an upload spooled to disk, or None for in-memory uploads."""
+    stream = file_storage.stream
+    name = getattr(stream, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        stream.flush()
+        return name
+    return None
+
+def detach_upload(file_storage):
+    """
+    Private copy of an upload for background work: Werkzeug closes the request's stream (and
+    deletes its spool file) as soon as the view returns. Close the copy when done.
+    """
+    path = spooled_path(file_storage)
+    if path:
+        stream = tempfile.NamedTemporaryFile("wb+", suffix=os.path.splitext(path)[1])
+        with open(path, "rb") as src:
+            shutil.copyfileobj(src, stream)
+        stream.flush()
+    else:
+        stream = BytesIO(file_storage.read())
+        file_storage.seek(0)
+    stream.seek(0)
+    return FileStorage(stream=stream, filename=file_storage.filename, content_type=file_storage.content_type)
+
+def open_pdf(file_storage):
+    """Open an uploaded PDF with fitz, by path when spooled to disk, else from memory."""
+    path = spooled_path(file_storage)
+    if path:
+        return fitz.open(path, filetype="pdf")
+    try:
+        return fitz.open(stream=file_storage.read(), filetype="pdf")
+    finally:
+        file_storage.seek(0)
+
 # ------------------- Extract Text Function -------------------
-def extract_text(file_storage):
+MAX_EXTRACT_CHARS = int(os.getenv("MAX_EXTRACT_CHARS", "0")) or None  # 0 = no cap
+
+_SURROGATES = re.compile(r"[\ud800-\udfff]")
+
+def clean_page_text(page_text):
+    """Drop lone surrogates that cannot be encoded as UTF-8 (single pass, no byte round trip)."""
+    return _SURROGATES.sub("", page_text)
+
+def in_sample(page_index, page_count, sample_pages):
+    """True if the page belongs to the classification sample (first N pages plus the last page)."""
+    return not sample_pages or page_index < sample_pages or page_index == page_count - 1
+
+def iter_text(file_storage, sample_pages=None, cancel_event=None):
     """
-    file_storage: Flask's file object (in-memory)
+    file_storage: Flask's file object (in memory or spooled to disk)
+    sample_pages: if set, only the first `sample_pages` pages and the last page of a PDF are read
+    cancel_event: threading.Event checked before every page is rendered and sent to Vision
+
+    Yields the document text as per-page fragments so callers can consume pages lazily.
+    Joining every fragment gives the same text as extract_text (before stripping).
     """
-    text = ""
     try:
-        file_bytes = file_storage.read()
         filename_lower = file_storage.filename.lower()
         mime_type = mimetypes.guess_type(file_storage.filename)[0]
 
         # PDF (text)
         if filename_lower.endswith(".pdf") and mime_type == "application/pdf":
+            found_text = False
             try:
-                with fitz.open(stream=file_bytes, filetype="pdf") as doc:
-                    for page in doc:
+                with open_pdf(file_storage) as doc:
+                    for i, page in enumerate(doc):
+                        if not in_sample(i, doc.page_count, sample_pages):
+                            continue
                         page_text = page.get_text("text")
-                        page_text = page_text.encode("utf-8", errors="ignore").decode("utf-8", errors="ignore")
-                        text += page_text + "\n"
-                if text.strip():
-                    return text.strip()
+                        # Leading blank pages are stripped anyway; hold off until real text shows up
+                        if not found_text and not page_text.strip():
+                            continue
+                        found_text = True
+                        yield clean_page_text(page_text) + "\n"
+            except GeneratorExit:
+                raise
             except:
                 pass
+            if found_text:
+                return
 
         # DOCX
         elif filename_lower.endswith(".docx"):
-            with tempfile.NamedTemporaryFile(delete=True, suffix=".docx") as tmp:
-                tmp.write(file_bytes)
-                tmp.flush()
-                text = docx2txt.process(tmp.name)
-                text = text.encode("utf-8", errors="ignore").decode("utf-8", errors="ignore")
-                return text.strip()
+            # docx2txt reads the zip straight from the upload stream, no temp file round trip
+            yield clean_page_text(docx2txt.process(file_storage.stream))
+            return
 
         # TXT
         elif filename_lower.endswith(".txt"):
-            text = file_bytes.decode("utf-8", errors="ignore")
-            return text.strip()
+            yield file_storage.read().decode("utf-8", errors="ignore")
+            return
 
         # IMAGE or PDF (image-based OCR)
         if mime_type and ("image" in mime_type or filename_lower.endswith(".pdf")):
-            pages = []
             if filename_lower.endswith(".pdf"):
-                pages = convert_from_bytes(file_bytes, dpi=300)
+                with open_pdf(file_storage) as doc:
+                    for i, pdf_page in enumerate(doc):
+                        if not in_sample(i, doc.page_count, sample_pages):
+                            continue
+                        if cancel_event is not None and cancel_event.is_set():
+                            return  # no paid Vision call for a cancelled extraction
+                        page, dpi = render_pdf_page(pdf_page)
+                        print(f"[OCR] Page {i+1} rendered at {dpi} DPI")
+                        cache_key = ocr_cache.key_for_image(page) if ocr_cache else None
+                        yield f"\n\n--- PAGE {i+1} ---\n\n" + clean_page_text(ocr_image(page, cache_key))
             else:
                 from PIL import Image
-                pages = [Image.open(BytesIO(file_bytes))]
-
-            for i, page in enumerate(pages):
-                with BytesIO() as img_buffer:
-                    page.save(img_buffer, format="JPEG")
-                    img_buffer.seek(0)
-                    content = img_buffer.read()
-                image = vision.Image(content=content)
-                response = vision_client.document_text_detection(image=image)
-                page_text = response.full_text_annotation.text
-                page_text = page_text.encode("utf-8", errors="ignore").decode("utf-8", errors="ignore")
-                text += f"\n\n--- PAGE {i+1} ---\n\n" + page_text
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                file_bytes = file_storage.read()
+                page = Image.open(BytesIO(file_bytes))
+                # Raw image streams are hashed directly, so re-uploads skip decoding as well as Vision
+                cache_key = ocr_cache.key_for_bytes(file_bytes) if ocr_cache else None
+                yield "\n\n--- PAGE 1 ---\n\n" + clean_page_text(ocr_image(page, cache_key))
 
+    finally:
+        file_storage.seek(0)  # Reset pointer for potential re-use
+
+def limit_chars(fragments, max_chars=None):
+    """Pass page fragments through until `max_chars` characters have been yielded."""
+    size = 0
+    for fragment in fragments:
+        if max_chars is not None and size + len(fragment) >= max_chars:
+            yield fragment[:max_chars - size]
+            return
+        size += len(fragment)
+        yield fragment
+
+def join_text(fragments, max_chars=None, cancel_event=None):
+    """
+    Join page fragments once, stopping as soon as `max_chars` characters are collected.
+    If `cancel_event` is set between pages, extraction stops and an empty string is returned.
+    """
+    parts = []
+    for fragment in limit_chars(fragments, max_chars):
+        if cancel_event is not None and cancel_event.is_set():
+            return ""
+        parts.append(fragment)
+    return "".join(parts).strip()
+
+def extract_text(file_storage, max_chars=MAX_EXTRACT_CHARS, sample_pages=None, cancel_event=None):
+    """
+    file_storage: Flask's file object (in memory or spooled to disk)
+    max_chars: optional cap on the number of extracted characters
+    sample_pages: only read the first N pages plus the last page (PDF only)
+    cancel_event: threading.Event that aborts extraction between pages (before any further OCR)
+    """
+    fragments = iter_text(file_storage, sample_pages, cancel_event)
+    try:
+        return join_text(fragments, max_chars, cancel_event)
     except Exception as e:
         print(f"Error extracting text from {file_storage.filename}: {e}")
         return ""
     finally:
-        file_storage.seek(0)  # Reset pointer for potential re-use
+        fragments.close()
 
-    return text.strip()
-
-# ------------------- Pre-filter & Keywords (same as before) -------------------
-CITIZEN_KEYWORDS = [
-    # Legal & Court Documents
-    "rental", "lease", "loan", "insurance", "property", "employment",
-    "legal notice", "tenancy", "mortgage","certificate",
-    "agreement", "deed", "judgment", "order", "bail", "court",
-    "petition", "complaint", "fir", "charge sheet", "evidence",
-    "appeal", "writ", "ndps", "narcotics", "seizure", "arrest", "offence",
-    "accused", "petitioner", "respondent", "high court", "session court",
-    "bail application", "criminal case", "ndps act", "union of india",
-    "state", "public prosecutor", "investigation", "enforcement",
-    "gazette", "central bureau of narcotics",
-    "crime", "criminal", "arrest warrant", "summons", "affidavit",
-    "power of attorney", "will", "trust deed", "notary", "divorce",
-    "marriage certificate", "mutation document",
-    "police report",   
-    "court affidavit"
-]
-
-BUSINESS_KEYWORDS = [
-    "contract", "nda", "mou", "policy", "compliance", "invoice", "purchase order",
-    "agreement", "terms and conditions", "partnership", "corporate", "licensing",
-    "confidentiality", "quotation", "tender", "proposal", "rfp", "sow",
-    "memorandum of understanding", "board resolution", "gst invoice",
-    "tax invoice", "debit note", "credit note", "payment receipt",
-    "purchase agreement", "vendor registration", "audit report",
-    "annual report", "business license", "trade license",
-    "certificate of incorporation", 
-    "gst filing", "company registration", "trademark", "patent", "ipo",
-    "share certificate", "stock transfer", "compliance certificate",
-    "employee contract",
-    "resignation letter", "termination letter", "non-compete agreement",
-    "confidentiality agreement", "performance report", "sales report",
-    "import export license","delivery challan", "bank guarantee",
-    "letter of credit", "vendor agreement", "purchase agreement",
-    "project proposal", "financial statement", "budget report"
-]
-
-STUDENT_KEYWORDS = [
-    "admission", "scholarship", "internship", "internship offer", "internship letter",
-    "hostel", "disciplinary", "university", "course", "exam", "student loan",
-    "certificate", "educational", "program", "offer of internship",
-    "letter of recommendation", "bonafide certificate", "transfer certificate",
-    "research paper", "publication", "attendance sheet",
-    "college id card", "admission form", "application form", "fee structure",
-    "syllabus", "prospectus", "placement letter", "training certificate",
-    "campus selection", "offer of admission", "counselling letter", "internship completion",
-    "internship certificate", "academic transcript", "degree certificate",
-    
-]
+def extract_detached(upload, cancel_event=None):
+    """extract_text on a detach_upload() copy, closing (and deleting) the copy afterwards."""
+    try:
+        return extract_text(upload, cancel_event=cancel_event)
+    finally:
+        upload.close()
+
+# ------------------- Pre-filter & Keywords -------------------
+# Built once at import: one Aho-Corasick pass over the text scores all three categories.
+keyword_scorer = KeywordScorer(
+    {
+        "CITIZEN_DOC": CITIZEN_KEYWORDS,
+        "BUSINESS_DOC": BUSINESS_KEYWORDS,
+        "STUDENT_DOC": STUDENT_KEYWORDS,
+    },
+    weights=KEYWORD_WEIGHTS
+)
+
+def score_keywords(text):
+    """Calibrated per-category keyword scores (see utils/keyword_scorer.py)."""
+    return keyword_scorer.score(text)
 
 def pre_filter(text):
-    text_lower = text.lower()
-    scores = {
-        "CITIZEN_DOC": sum(k in text_lower for k in CITIZEN_KEYWORDS),
-        "BUSINESS_DOC": sum(k in text_lower for k in BUSINESS_KEYWORDS),
-        "STUDENT_DOC": sum(k in text_lower for k in STUDENT_KEYWORDS)
-    }
-    predicted_category = max(scores, key=scores.get)
-    if scores[predicted_category] == 0:
-        return "INVALID_DOC"
-    return predicted_category
+    return score_keywords(text)["label"]
 
 # ------------------- Classify & Extract -------------------
-def classify_and_extract(file_storage, user_category):
-    text = extract_text(file_storage)
-    if not text:
-        return {"predicted_category": "INVALID_DOC",
-                "reason": "Document is empty or text could not be extracted.",
-                "suggested_action": "Please upload a valid document with readable text."}
+CLASSIFY_SAMPLE_PAGES = int(os.getenv("CLASSIFY_SAMPLE_PAGES", "3"))  # 0 = classify the full document
 
-    if pre_filter(text) == "INVALID_DOC":
-        return {"predicted_category": "INVALID_DOC",
-                "reason": "No relevant keywords found for citizen, business, or student legal matters.",
-                "suggested_action": "Please upload a valid legal document."}
+def count_pages(file_storage):
+    """Number of pages in a PDF upload (1 for every other format)."""
+    if not file_storage.filename.lower().endswith(".pdf"):
+        return 1
+    try:
+        with open_pdf(file_storage) as doc:
+            return doc.page_count
+    except Exception:
+        return 1
 
-    smart_prompt = f"""
+def build_classify_prompt(text):
+    return f"""
                       You are an expert legal document classifier. Your primary task is to distinguish between an actual, enforceable legal document and a document that is merely informational or descriptive.
 
                       A **VALID** document can be one of the following categories:
@@ -193,32 +318,115 @@ def classify_and_extract(file_storage, user_category):
                       Document:
                       {text}
                       """
-    
+
+class Classification(BaseModel):
+    predicted_category: Literal["CITIZEN_DOC", "BUSINESS_DOC", "STUDENT_DOC", "INVALID_DOC"]
+    confidence: Literal["high", "medium", "low"] = "medium"
+    reason: str = ""
+    suggested_action: str = ""
+
+def llm_classify(text, token_budget=CLASSIFY_TOKEN_BUDGET):
+    """
+    Ask Gemini for the document category (schema-constrained JSON). Raises StructuredOutputError on bad output.
+    Only a token-budgeted sample (head, tail, keyword-dense windows) of long documents is sent.
+    """
+    sampled_text = sample_for_classification(text, keyword_scorer, token_budget)
+    smart_prompt = build_classify_prompt(sampled_text)
+
+    start = time.time()
+    classification = invoke_structured(llm, smart_prompt, Classification, "classify")
+    latency = time.time() - start
+    record_classification(estimate_tokens(text), estimate_tokens(sampled_text), latency)
+    print(f"[TIMING] Classification LLM call: {latency:.2f} seconds "
+          f"(~{estimate_tokens(sampled_text)} of ~{estimate_tokens(text)} document tokens sent)")
+    return classification.model_dump()
+
+def shadow_check(text, local_label):
+    """Re-classify a locally decided document with Gemini to track the agreement rate."""
     try:
-        llm_response_obj = llm.invoke(smart_prompt)
-        llm_response_text = llm_response_obj.content
-        match = re.search(r"\{.*\}", llm_response_text, re.DOTALL)
-        if match:
-            result = json.loads(match.group())
-        else:
-            raise ValueError("LLM did not return a valid JSON object.")
+        result = llm_classify(text)
+        record_agreement(local_label, result.get("predicted_category", "INVALID_DOC"), shadow=True)
     except Exception as e:
+        print(f"[LocalClassifier] Shadow check failed: {e}")
+
+def classify_and_extract(file_storage, user_category, extract_full=True):
+    """
+    Classify the upload and, if it matches `user_category`, return its extracted text.
+    With extract_full=False the text is only returned when classification already read the
+    whole document (it fits in the sample); otherwise the caller reads it itself (see /pipeline).
+    """
+    start_total = time.time()
+
+    # Phase 1: classify a sample (first N pages + last page); the rest is only read if accepted
+    sampled = CLASSIFY_SAMPLE_PAGES > 0 and count_pages(file_storage) > CLASSIFY_SAMPLE_PAGES + 1
+    text = extract_text(file_storage, sample_pages=CLASSIFY_SAMPLE_PAGES if sampled else None)
+    print(f"[TIMING] {'Sample' if sampled else 'Full'} extraction: {time.time() - start_total:.2f} seconds")
+    if not text:
         return {"predicted_category": "INVALID_DOC",
-                "reason": f"Could not perform semantic analysis. Error: {e}",
-                "suggested_action": "Please try again with a different document."}
+                "reason": "Document is empty or text could not be extracted.",
+                "suggested_action": "Please upload a valid document with readable text."}
+
+    if pre_filter(text) == "INVALID_DOC":
+        return {"predicted_category": "INVALID_DOC",
+                "reason": "No relevant keywords found for citizen, business, or student legal matters.",
+                "suggested_action": "Please upload a valid legal document."}
+
+    # Phase 2 starts speculatively: extract the full document while Gemini classifies the sample
+    full_text_future = None
+    cancel_full = threading.Event()
+    if sampled and extract_full:
+        # The job outlives the request on a mismatch, so it reads its own copy of the upload
+        full_text_future = executor.submit(extract_detached, detach_upload(file_storage), cancel_full)
+
+    result = None
+    local_label = None
+    if local_classifier:
+        # Clear-cut uploads are decided in-process; only ambiguous ones go to Gemini
+        local_label, local_proba = local_classifier.predict(text)
+        bypass = local_proba >= LOCAL_CLASSIFIER_THRESHOLD
+        record_decision(bypass)
+        print(f"[LocalClassifier] {local_label} p={local_proba:.3f} -> {'local' if bypass else 'LLM'}")
+        if bypass:
+            result = {"predicted_category": local_label,
+                      "confidence": "high",
+                      "reason": f"Classified by the local document classifier (probability {local_proba:.2f}).",
+                      "suggested_action": ""}
+            if random.random() < LOCAL_CLASSIFIER_SHADOW_RATE:
+                shadow_executor.submit(shadow_check, text, local_label)
+
+    if result is None:
+        try:
+            result = llm_classify(text)
+        except Exception as e:
+            cancel_full.set()
+            return {"predicted_category": "INVALID_DOC",
+                    "reason": f"Could not perform semantic analysis. Error: {e}",
+                    "suggested_action": "Please try again with a different document."}
+        if local_label:
+            record_agreement(local_label, result.get("predicted_category", "INVALID_DOC"))
 
     llm_predicted_category = result.get("predicted_category", "INVALID_DOC")
     user_selected_category = f"{user_category.upper()}_DOC"
 
     if llm_predicted_category == user_selected_category:
         print("\n LLM confirms the document is valid and matches your category.\n")
+        if full_text_future:
+            text = full_text_future.result() or text
+            print(f"[TIMING] Total classify + full extraction: {time.time() - start_total:.2f} seconds")
         print("--- Extracted Document Text ---\n")
+        accepted = {"predicted_category": llm_predicted_category,
+                    "confidence": result.get("confidence", "medium"),
+                    "reason": result.get("reason", ""),
+                    "suggested_action": "Document processed successfully."}
+        if not extract_full:
+            return accepted if sampled else {**accepted, "extracted_text": text}
         return {"predicted_category": llm_predicted_category,
                 "confidence": result.get("confidence", "medium"),
                 "reason": result.get("reason", ""),
                 "extracted_text": text,
                 "suggested_action": "Document processed successfully."}
     else:
+        cancel_full.set()
         if llm_predicted_category == "INVALID_DOC":
             result["suggested_action"] = "The AI determined this is not a legal document. No text extracted."
         else:
@@ -235,6 +443,22 @@ def active():
 def health():
     return {"status": "ok"}, 200
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "ocr_cache": ocr_cache.stats() if ocr_cache else {"enabled": False},
+        "ocr": ocr_stats(),
+        "local_classifier": classifier_stats(),
+        "classification": classification_stats(),
+        "structured_output": structured_output_stats()
+    })
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    return jsonify({
+        "error": f"File too large. Maximum upload size is {MAX_UPLOAD_BYTES // (1024 * 1024)} MB."
+    }), 413
+
 @app.route("/uploads", methods=["POST"])
 def uploads():
     category = request.form.get("category")
@@ -251,6 +475,68 @@ def uploads():
     # Return JSON directly
     return jsonify(result)
 
+@app.route("/pipeline", methods=["POST"])
+def pipeline():
+    """
+    Classify, extract and summarize in one request. Once the document is accepted its pages are
+    streamed to the summary service as they are extracted, so chunk summaries start before the
+    last page has been OCR'd instead of after the whole text has been collected.
+    """
+    category = request.form.get("category")
+    file = request.files.get("file")
+
+    if not file or not category:
+        return jsonify({
+            "error": "Missing file or category"
+        }), 400
+
+    start_total = time.time()
+    result = classify_and_extract(file, category, extract_full=False)
+    if result.get("predicted_category") != f"{category.upper()}_DOC":
+        return jsonify(result)
+    # Documents that fit in the classification sample were already read in full
+    extracted_text = result.pop("extracted_text", None)
+
+    extraction_errors = []
+
+    def page_lines():
+        fragments = iter([extracted_text]) if extracted_text else iter_text(file)
+        try:
+            for fragment in limit_chars(fragments, MAX_EXTRACT_CHARS):
+                yield (json.dumps({"text": fragment}, ensure_ascii=False) + "\n").encode("utf-8")
+        except Exception as e:
+            extraction_errors.append(e)  # requests may re-raise it wrapped as a connection error
+            raise
+        finally:
+            if not extracted_text:
+                fragments.close()
+
+    try:
+        response = requests.post(
+            f"{SUMMARY_MODEL_URL}/summarize_stream",
+            params={"category": category.strip().lower()},
+            data=page_lines(),
+            headers={"Content-Type": "application/x-ndjson"},
+            timeout=1200,
+        )
+        response.raise_for_status()
+    except Exception as e:
+        if extraction_errors:
+            # Raised by iter_text (PDF/OCR errors) while the request body was being streamed
+            print(f"⚠️ Text extraction failed while streaming: {extraction_errors[0]}")
+            return jsonify({**result, "error": f"Text extraction failed: {extraction_errors[0]}"}), 500
+        if not isinstance(e, requests.RequestException):
+            raise
+        print(f"⚠️ Summary service failed: {e}")
+        return jsonify({**result, "error": f"Summarization failed: {e}"}), 502
+    print(f"[TIMING] Pipeline total: {time.time() - start_total:.2f} seconds")
+
+    try:
+        summary = response.json()
+    except ValueError:
+        summary = response.text
+    return jsonify({**result, "summary": summary})
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8080"))
     app.run(host="0.0.0.0", port=port, threaded=True)
\ No newline at end of file
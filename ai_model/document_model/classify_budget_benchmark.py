@@ -0,0 +1,60 @@
+# --- classify_budget_benchmark.py ---
+# Compares classification with the full-text prompt against the token-budgeted sample
+# (head + tail + keyword-dense windows) on a folder of documents: latency, input tokens
+# reported by Vertex, and whether both prompts agree on the category.
+#
+# Usage: python classify_budget_benchmark.py path/to/documents [token_budget]
+import os
+import re
+import sys
+import json
+import time
+from werkzeug.datastructures import FileStorage
+from app import llm, extract_text, build_classify_prompt, keyword_scorer
+from utils.classify_sampler import CLASSIFY_TOKEN_BUDGET, sample_for_classification
+
+
+def classify(prompt):
+    start = time.time()
+    response = llm.invoke(prompt)
+    latency = time.time() - start
+    usage = getattr(response, "usage_metadata", None) or {}
+    match = re.search(r"\{.*\}", response.content, re.DOTALL)
+    label = json.loads(match.group()).get("predicted_category") if match else None
+    return label, latency, usage.get("input_tokens", 0)
+
+
+def main(documents_dir, token_budget):
+    rows = []
+    for name in sorted(os.listdir(documents_dir)):
+        path = os.path.join(documents_dir, name)
+        if not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            text = extract_text(FileStorage(stream=f, filename=name), max_chars=None)
+        if not text:
+            print(f"⚠️ Skipping {name}: no text extracted")
+            continue
+
+        full = classify(build_classify_prompt(text))
+        budgeted = classify(build_classify_prompt(sample_for_classification(text, keyword_scorer, token_budget)))
+        rows.append((full, budgeted))
+        print(f"{name}: full {full[0]} {full[1]:.2f}s {full[2]} tok | "
+              f"budgeted {budgeted[0]} {budgeted[1]:.2f}s {budgeted[2]} tok")
+
+    if not rows:
+        print("⚠️ No documents classified.")
+        return
+    n = len(rows)
+    print("-" * 80)
+    print(f"Documents           : {n} (token budget {token_budget})")
+    print(f"Avg latency         : {sum(r[0][1] for r in rows) / n:.2f}s -> {sum(r[1][1] for r in rows) / n:.2f}s")
+    print(f"Avg input tokens    : {sum(r[0][2] for r in rows) / n:.0f} -> {sum(r[1][2] for r in rows) / n:.0f}")
+    print(f"Label agreement     : {sum(r[0][0] == r[1][0] for r in rows) / n:.3f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python classify_budget_benchmark.py path/to/documents [token_budget]")
+        sys.exit(1)
+    main(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else CLASSIFY_TOKEN_BUDGET)
@@ -0,0 +1,79 @@
+# --- keyword_scorer_benchmark.py ---
+# Micro-benchmark of the pre_filter keyword scorer on ~1 MB inputs: the previous approach
+# (one substring scan per keyword) against the single-pass Aho-Corasick scorer. Two inputs:
+# "uniform" draws from every keyword list, so each presence check stops early (best case for
+# the substring scans); "rental" uses a handful of citizen keywords like a real agreement, so
+# every absent keyword costs a full scan.
+#
+# Usage: python keyword_scorer_benchmark.py [size_in_mb] [rounds]
+import sys
+import time
+import random
+from utils.keywords import CITIZEN_KEYWORDS, BUSINESS_KEYWORDS, STUDENT_KEYWORDS, KEYWORD_WEIGHTS
+from utils.keyword_scorer import KeywordScorer
+
+FILLER_WORDS = (
+    "the party shall pay within thirty days of receipt and both parties agree that "
+    "this document is governed by the laws of india notwithstanding anything contained herein"
+).split()
+
+
+RENTAL_KEYWORDS = ["rental", "tenancy", "deed", "property", "court", "lease", "notary", "agreement"]
+
+
+def build_text(size_bytes, seed=7, keywords=None, rate=0.02):
+    rng = random.Random(seed)
+    keywords = keywords or CITIZEN_KEYWORDS + BUSINESS_KEYWORDS + STUDENT_KEYWORDS
+    words = []
+    size = 0
+    while size < size_bytes:
+        word = rng.choice(keywords) if rng.random() < rate else rng.choice(FILLER_WORDS)
+        words.append(word.upper() if rng.random() < 0.1 else word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def legacy_scores(text):
+    text_lower = text.lower()
+    return {
+        "CITIZEN_DOC": sum(k in text_lower for k in CITIZEN_KEYWORDS),
+        "BUSINESS_DOC": sum(k in text_lower for k in BUSINESS_KEYWORDS),
+        "STUDENT_DOC": sum(k in text_lower for k in STUDENT_KEYWORDS)
+    }
+
+
+def bench(fn, text, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(size_mb=1.0, rounds=5):
+    start = time.perf_counter()
+    scorer = KeywordScorer(
+        {"CITIZEN_DOC": CITIZEN_KEYWORDS, "BUSINESS_DOC": BUSINESS_KEYWORDS, "STUDENT_DOC": STUDENT_KEYWORDS},
+        weights=KEYWORD_WEIGHTS
+    )
+    build_time = time.perf_counter() - start
+
+    size_bytes = int(size_mb * 1024 * 1024)
+    print(f"Scorer build (import) : {build_time * 1000:.1f} ms")
+    for name, text in (("uniform", build_text(size_bytes)),
+                       ("rental", build_text(size_bytes, keywords=RENTAL_KEYWORDS, rate=0.005))):
+        legacy = bench(legacy_scores, text, rounds)
+        compiled = bench(scorer.score, text, rounds)
+        print("-" * 80)
+        print(f"{name} input ({len(text) / 1024 / 1024:.2f} MB)")
+        print(f"Legacy substring scans: {legacy * 1000:.1f} ms (best of {rounds})")
+        print(f"Aho-Corasick pass     : {compiled * 1000:.1f} ms (best of {rounds})")
+        print(f"Legacy counts         : {legacy_scores(text)}")
+        print(f"Scores (per 1k tokens): {scorer.score(text)['scores']}")
+
+
+if __name__ == "__main__":
+    size = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    main(size, rounds)
@@ -0,0 +1,101 @@
+# --- ocr_parity_check.py ---
+# Compares the legacy OCR input (300 DPI RGB JPEG via pdf2image) against the adaptive
+# preprocessing stage on a folder of sample scans, reporting payload size, Vision latency
+# and text similarity per page.
+#
+# Usage: python ocr_parity_check.py path/to/sample_corpus
+import os
+import re
+import sys
+import time
+import difflib
+from io import BytesIO
+from dotenv import load_dotenv
+import fitz
+from PIL import Image
+from pdf2image import convert_from_bytes
+from google.cloud import vision_v1 as vision
+from utils.ocr_preprocess import render_pdf_page, encode_for_ocr
+
+load_dotenv()
+
+vision_client = vision.ImageAnnotatorClient()
+
+
+def run_vision(content):
+    start = time.time()
+    response = vision_client.document_text_detection(image=vision.Image(content=content))
+    return response.full_text_annotation.text, time.time() - start
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def legacy_pages(path, file_bytes):
+    if path.lower().endswith(".pdf"):
+        pages = convert_from_bytes(file_bytes, dpi=300)
+    else:
+        pages = [Image.open(BytesIO(file_bytes))]
+    for page in pages:
+        with BytesIO() as img_buffer:
+            page.convert("RGB").save(img_buffer, format="JPEG")
+            yield img_buffer.getvalue()
+
+
+def adaptive_pages(path, file_bytes):
+    if path.lower().endswith(".pdf"):
+        with fitz.open(stream=file_bytes, filetype="pdf") as doc:
+            for pdf_page in doc:
+                page, _ = render_pdf_page(pdf_page)
+                yield encode_for_ocr(page)[0]
+    else:
+        yield encode_for_ocr(Image.open(BytesIO(file_bytes)))[0]
+
+
+def main(corpus_dir):
+    files = sorted(
+        f for f in os.listdir(corpus_dir)
+        if f.lower().endswith((".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff"))
+    )
+    if not files:
+        print(f"⚠️ No sample documents found in {corpus_dir}")
+        return
+
+    totals = {"legacy_bytes": 0, "adaptive_bytes": 0, "legacy_latency": 0.0, "adaptive_latency": 0.0}
+    similarities = []
+
+    for name in files:
+        path = os.path.join(corpus_dir, name)
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+
+        for i, (legacy, adaptive) in enumerate(zip(legacy_pages(path, file_bytes), adaptive_pages(path, file_bytes))):
+            legacy_text, legacy_latency = run_vision(legacy)
+            adaptive_text, adaptive_latency = run_vision(adaptive)
+            similarity = difflib.SequenceMatcher(None, normalize(legacy_text), normalize(adaptive_text)).ratio()
+
+            totals["legacy_bytes"] += len(legacy)
+            totals["adaptive_bytes"] += len(adaptive)
+            totals["legacy_latency"] += legacy_latency
+            totals["adaptive_latency"] += adaptive_latency
+            similarities.append(similarity)
+
+            print(f"{name} page {i+1}: "
+                  f"{len(legacy) / 1024:.0f} KB -> {len(adaptive) / 1024:.0f} KB, "
+                  f"{legacy_latency:.2f}s -> {adaptive_latency:.2f}s, "
+                  f"similarity {similarity:.3f}")
+
+    pages = len(similarities)
+    print("-" * 80)
+    print(f"Pages compared      : {pages}")
+    print(f"Avg bytes per page  : {totals['legacy_bytes'] / pages / 1024:.0f} KB -> {totals['adaptive_bytes'] / pages / 1024:.0f} KB")
+    print(f"Avg Vision latency  : {totals['legacy_latency'] / pages:.2f}s -> {totals['adaptive_latency'] / pages:.2f}s")
+    print(f"Mean text similarity: {sum(similarities) / pages:.3f} (min {min(similarities):.3f})")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python ocr_parity_check.py path/to/sample_corpus")
+        sys.exit(1)
+    main(sys.argv[1])
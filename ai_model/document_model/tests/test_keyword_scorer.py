@@ -0,0 +1,52 @@
+import pytest
+from utils.keyword_scorer import KeywordScorer, KEYWORD_MIN_TOKENS
+from utils.keywords import CITIZEN_KEYWORDS, BUSINESS_KEYWORDS, STUDENT_KEYWORDS, KEYWORD_WEIGHTS
+
+
+@pytest.fixture
+def scorer():
+    return KeywordScorer({"A": ["court", "high court", "rent"], "B": ["contract"]}, weights={"high court": 2.0})
+
+
+def test_matches_respect_word_boundaries_and_plurals(scorer):
+    text = "The High Court and courts; rental contracts in the courtyard"
+    assert [keyword for _, _, keyword in scorer.find(text)] == ["high court", "court", "court", "contract"]
+
+
+def test_match_spans_include_the_plural(scorer):
+    text = "two courts"
+    assert list(scorer.find(text)) == [(4, 10, "court")]
+
+
+def test_weighted_hits_and_distribution(scorer):
+    result = scorer.score("The High Court and courts; rental contracts")
+    # "high court" (2.0) also credits "court" (1.0), plus one plural "courts"
+    assert result["raw"] == {"A": 4.0, "B": 1.0}
+    assert result["label"] == "A"
+    assert result["matches"] == 4
+    assert result["distribution"] == {"A": 0.8, "B": 0.2}
+
+
+def test_short_texts_are_scored_against_a_minimum_length(scorer):
+    result = scorer.score("court")
+    assert result["density"]["A"] == pytest.approx(1000 / KEYWORD_MIN_TOKENS)
+    assert 0 < result["scores"]["A"] < 1
+
+
+def test_confidence_grows_with_density(scorer):
+    sparse = scorer.score("court " + "filler " * 2000)
+    dense = scorer.score("court " * 50 + "filler " * 2000)
+    assert dense["scores"]["A"] > sparse["scores"]["A"]
+
+
+def test_no_keywords_is_invalid(scorer):
+    result = scorer.score("nothing relevant here")
+    assert result["label"] == "INVALID_DOC"
+    assert result["matches"] == 0
+    assert result["distribution"] == {"A": 0.0, "B": 0.0}
+
+
+def test_real_keyword_lists_build():
+    scorer = KeywordScorer({"CITIZEN_DOC": CITIZEN_KEYWORDS, "BUSINESS_DOC": BUSINESS_KEYWORDS,
+                            "STUDENT_DOC": STUDENT_KEYWORDS}, weights=KEYWORD_WEIGHTS)
+    assert scorer.score("")["label"] == "INVALID_DOC"
@@ -0,0 +1,82 @@
+# --- train_local_classifier.py ---
+# Trains the local fast-path classifier from a labeled folder of sample documents:
+#
+#   samples/
+#     CITIZEN_DOC/   rental_agreement.pdf, bail_order.txt, ...
+#     BUSINESS_DOC/  nda.docx, invoice.png, ...
+#     STUDENT_DOC/   internship_offer.pdf, ...
+#     INVALID_DOC/   blog_post.txt, ...
+#
+# Usage: python train_local_classifier.py path/to/samples [output.npz]
+import os
+import sys
+import random
+from werkzeug.datastructures import FileStorage
+from utils.local_classifier import LocalClassifier, LOCAL_CLASSIFIER_PATH, LOCAL_CLASSIFIER_THRESHOLD
+
+
+def load_text(path):
+    """Read .txt directly; everything else goes through the same extraction as /uploads."""
+    if path.lower().endswith(".txt"):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    from app import extract_text  # heavy import (Vision / Vertex clients), only needed for binaries
+    with open(path, "rb") as f:
+        return extract_text(FileStorage(stream=f, filename=os.path.basename(path)))
+
+
+def load_corpus(samples_dir):
+    texts, labels = [], []
+    for label in sorted(os.listdir(samples_dir)):
+        label_dir = os.path.join(samples_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        for name in sorted(os.listdir(label_dir)):
+            text = load_text(os.path.join(label_dir, name))
+            if text and text.strip():
+                texts.append(text)
+                labels.append(label)
+            else:
+                print(f"⚠️ Skipping {label}/{name}: no text extracted")
+    return texts, labels
+
+
+def main(samples_dir, output_path):
+    texts, labels = load_corpus(samples_dir)
+    if len(set(labels)) < 2:
+        print("❌ Need at least two labeled sub-folders with documents.")
+        sys.exit(1)
+    print(f"✅ Loaded {len(texts)} documents: " + ", ".join(f"{l}={labels.count(l)}" for l in sorted(set(labels))))
+
+    # Hold out 20% to report accuracy and the expected LLM-bypass rate at the configured threshold
+    order = list(range(len(texts)))
+    random.Random(13).shuffle(order)
+    split = max(1, len(order) // 5)
+    test_idx, train_idx = order[:split], order[split:]
+
+    model = LocalClassifier(sorted(set(labels)))
+    model.fit([texts[i] for i in train_idx], [labels[i] for i in train_idx])
+
+    correct = bypassed = bypassed_correct = 0
+    for i in test_idx:
+        label, proba = model.predict(texts[i])
+        correct += label == labels[i]
+        if proba >= LOCAL_CLASSIFIER_THRESHOLD:
+            bypassed += 1
+            bypassed_correct += label == labels[i]
+    print(f"Holdout accuracy           : {correct / len(test_idx):.3f} ({len(test_idx)} docs)")
+    print(f"Bypass rate @ {LOCAL_CLASSIFIER_THRESHOLD:.2f}          : {bypassed / len(test_idx):.3f}")
+    if bypassed:
+        print(f"Accuracy on bypassed docs  : {bypassed_correct / bypassed:.3f}")
+
+    # Final model is trained on everything
+    model = LocalClassifier(sorted(set(labels))).fit(texts, labels)
+    model.save(output_path)
+    print(f"🎯 Saved model to {output_path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python train_local_classifier.py path/to/samples [output.npz]")
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2] if len(sys.argv) == 3 else LOCAL_CLASSIFIER_PATH)
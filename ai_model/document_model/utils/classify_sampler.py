@@ -0,0 +1,78 @@
+# --- utils/classify_sampler.py ---
+import os
+import threading
+
+# ------------------- Configuration -------------------
+CLASSIFY_TOKEN_BUDGET = int(os.getenv("CLASSIFY_TOKEN_BUDGET", "4000"))  # 0 = send the full text
+CHARS_PER_TOKEN = 4  # rough average for Gemini on English legal text
+WINDOW_CHARS = 1500
+
+HEAD_SHARE = 0.40
+TAIL_SHARE = 0.15  # the remaining 45% goes to keyword-dense windows
+
+GAP_MARKER = "\n\n[...]\n\n"
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def sample_for_classification(text: str, keyword_scorer, token_budget: int = CLASSIFY_TOKEN_BUDGET) -> str:
+    """
+    Build the classifier input from the head, the tail and the most keyword-dense windows
+    of the document, within `token_budget` (estimated) tokens. Short documents pass through unchanged.
+    """
+    budget_chars = token_budget * CHARS_PER_TOKEN
+    if not token_budget or len(text) <= budget_chars:
+        return text
+
+    head_chars = int(budget_chars * HEAD_SHARE)
+    tail_chars = int(budget_chars * TAIL_SHARE)
+    window_budget = budget_chars - head_chars - tail_chars
+    middle_start, middle_end = head_chars, len(text) - tail_chars
+
+    # Weighted keyword hits per fixed-size window of the middle section
+    density = {}
+    for start, _, keyword in keyword_scorer.find(text):
+        if middle_start <= start < middle_end:
+            window = (start - middle_start) // WINDOW_CHARS
+            density[window] = density.get(window, 0.0) + keyword_scorer.weights[keyword]
+
+    chosen = []
+    for window, _ in sorted(density.items(), key=lambda item: item[1], reverse=True):
+        if window_budget < WINDOW_CHARS // 4:
+            break
+        start = middle_start + window * WINDOW_CHARS
+        end = min(start + WINDOW_CHARS, middle_end, start + window_budget)
+        chosen.append((start, end))
+        window_budget -= end - start
+
+    parts = [text[:head_chars]]
+    parts += [text[start:end] for start, end in sorted(chosen)]
+    parts.append(text[-tail_chars:])
+    return GAP_MARKER.join(parts)
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "full_text_tokens": 0, "sent_tokens": 0, "latency_seconds": 0.0}
+
+
+def record_classification(full_text_tokens: int, sent_tokens: int, latency: float) -> None:
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["full_text_tokens"] += full_text_tokens
+        _stats["sent_tokens"] += sent_tokens
+        _stats["latency_seconds"] += latency
+
+
+def classification_stats() -> dict:
+    with _stats_lock:
+        calls = _stats["calls"]
+        return {
+            "token_budget": CLASSIFY_TOKEN_BUDGET,
+            **_stats,
+            "latency_seconds": round(_stats["latency_seconds"], 3),
+            "avg_latency": round(_stats["latency_seconds"] / calls, 3) if calls else 0.0,
+            "token_savings": round(1 - _stats["sent_tokens"] / _stats["full_text_tokens"], 4) if _stats["full_text_tokens"] else 0.0,
+        }
@@ -0,0 +1,64 @@
+# --- utils/keywords.py ---
+# Keyword lists used by pre_filter to reject uploads that are clearly not legal documents.
+
+CITIZEN_KEYWORDS = [
+    # Legal & Court Documents
+    "rental", "lease", "loan", "insurance", "property", "employment",
+    "legal notice", "tenancy", "mortgage","certificate",
+    "agreement", "deed", "judgment", "order", "bail", "court",
+    "petition", "complaint", "fir", "charge sheet", "evidence",
+    "appeal", "writ", "ndps", "narcotics", "seizure", "arrest", "offence",
+    "accused", "petitioner", "respondent", "high court", "session court",
+    "bail application", "criminal case", "ndps act", "union of india",
+    "state", "public prosecutor", "investigation", "enforcement",
+    "gazette", "central bureau of narcotics",
+    "crime", "criminal", "arrest warrant", "summons", "affidavit",
+    "power of attorney", "will", "trust deed", "notary", "divorce",
+    "marriage certificate", "mutation document",
+    "police report",   
+    "court affidavit"
+]
+
+BUSINESS_KEYWORDS = [
+    "contract", "nda", "mou", "policy", "compliance", "invoice", "purchase order",
+    "agreement", "terms and conditions", "partnership", "corporate", "licensing",
+    "confidentiality", "quotation", "tender", "proposal", "rfp", "sow",
+    "memorandum of understanding", "board resolution", "gst invoice",
+    "tax invoice", "debit note", "credit note", "payment receipt",
+    "purchase agreement", "vendor registration", "audit report",
+    "annual report", "business license", "trade license",
+    "certificate of incorporation", 
+    "gst filing", "company registration", "trademark", "patent", "ipo",
+    "share certificate", "stock transfer", "compliance certificate",
+    "employee contract",
+    "resignation letter", "termination letter", "non-compete agreement",
+    "confidentiality agreement", "performance report", "sales report",
+    "import export license","delivery challan", "bank guarantee",
+    "letter of credit", "vendor agreement", "purchase agreement",
+    "project proposal", "financial statement", "budget report"
+]
+
+STUDENT_KEYWORDS = [
+    "admission", "scholarship", "internship", "internship offer", "internship letter",
+    "hostel", "disciplinary", "university", "course", "exam", "student loan",
+    "certificate", "educational", "program", "offer of internship",
+    "letter of recommendation", "bonafide certificate", "transfer certificate",
+    "research paper", "publication", "attendance sheet",
+    "college id card", "admission form", "application form", "fee structure",
+    "syllabus", "prospectus", "placement letter", "training certificate",
+    "campus selection", "offer of admission", "counselling letter", "internship completion",
+    "internship certificate", "academic transcript", "degree certificate",
+    
+]
+
+# Per-keyword weights for the pre_filter scorer (default 1.0). Very generic words that show up
+# in almost any text count for less, specific multi-word document names count for more.
+KEYWORD_WEIGHTS = {
+    "state": 0.25, "will": 0.25, "order": 0.5, "course": 0.5, "program": 0.5,
+    "policy": 0.5, "certificate": 0.5, "agreement": 0.5, "property": 0.75, "evidence": 0.75,
+    "proposal": 0.75, "publication": 0.75, "compliance": 0.75,
+    "legal notice": 2.0, "charge sheet": 2.0, "bail application": 2.0, "power of attorney": 2.0,
+    "memorandum of understanding": 2.0, "certificate of incorporation": 2.0,
+    "non-compete agreement": 2.0, "offer of internship": 2.0, "bonafide certificate": 2.0,
+    "transfer certificate": 2.0, "academic transcript": 2.0, "degree certificate": 2.0,
+}
@@ -0,0 +1,139 @@
+# --- utils/local_classifier.py ---
+import os
+import re
+import zlib
+import threading
+import numpy as np
+
+# ------------------- Configuration -------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOCAL_CLASSIFIER_PATH = os.getenv("LOCAL_CLASSIFIER_PATH", os.path.join(BASE_DIR, "models", "local_classifier.npz"))
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.9"))
+LOCAL_CLASSIFIER_SHADOW_RATE = float(os.getenv("LOCAL_CLASSIFIER_SHADOW_RATE", "0.05"))
+
+HASH_DIM = 2 ** 18
+MAX_FEATURE_CHARS = 20000  # classification never needs more than the opening pages
+
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+# ------------------- Features -------------------
+def featurize(text: str, dim: int = HASH_DIM) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed word unigrams + bigrams with log term frequency, L2-normalised.
+    Returns sparse (indices, values). crc32 is used because Python's hash() is salted per process.
+    """
+    tokens = _TOKEN.findall(text[:MAX_FEATURE_CHARS].lower())
+    grams = tokens + [a + " " + b for a, b in zip(tokens, tokens[1:])]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+    indices = np.fromiter((zlib.crc32(g.encode("utf-8")) % dim for g in grams), dtype=np.int64, count=len(grams))
+    unique, counts = np.unique(indices, return_counts=True)
+    values = (1.0 + np.log(counts)).astype(np.float32)
+    values /= np.linalg.norm(values)
+    return unique, values
+
+
+# ------------------- Model -------------------
+class LocalClassifier:
+    """Softmax (multinomial logistic) regression over hashed n-gram features."""
+
+    def __init__(self, labels: list[str], dim: int = HASH_DIM, weights=None, bias=None):
+        self.labels = list(labels)
+        self.dim = dim
+        self.W = weights if weights is not None else np.zeros((len(labels), dim), dtype=np.float32)
+        self.b = bias if bias is not None else np.zeros(len(labels), dtype=np.float32)
+
+    def _proba(self, indices, values):
+        logits = self.W[:, indices] @ values + self.b
+        logits -= logits.max()
+        exp = np.exp(logits)
+        return exp / exp.sum()
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """Returns (label, probability) for the most likely label."""
+        proba = self._proba(*featurize(text, self.dim))
+        best = int(proba.argmax())
+        return self.labels[best], float(proba[best])
+
+    def fit(self, texts: list[str], labels: list[str], epochs: int = 20, lr: float = 0.5, l2: float = 1e-5, seed: int = 13):
+        """Plain SGD with sparse updates; corpora here are hundreds of documents, not millions."""
+        features = [featurize(t, self.dim) for t in texts]
+        targets = np.array([self.labels.index(label) for label in labels])
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            step = lr / (1 + epoch)
+            for i in rng.permutation(len(features)):
+                indices, values = features[i]
+                error = self._proba(indices, values)
+                error[targets[i]] -= 1.0
+                self.W[:, indices] -= step * (np.outer(error, values) + l2 * self.W[:, indices])
+                self.b -= step * error
+        return self
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(path, labels=np.array(self.labels), dim=self.dim, W=self.W, b=self.b)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalClassifier":
+        data = np.load(path, allow_pickle=False)
+        return cls([str(label) for label in data["labels"]], int(data["dim"]), data["W"], data["b"])
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"decisions": 0, "bypassed": 0, "routed_compared": 0, "routed_agreed": 0, "shadow_compared": 0, "shadow_agreed": 0}
+
+
+def record_decision(bypassed: bool) -> None:
+    with _stats_lock:
+        _stats["decisions"] += 1
+        _stats["bypassed"] += int(bypassed)
+
+
+def record_agreement(local_label: str, llm_label: str, shadow: bool = False) -> None:
+    """
+    Compare the local prediction with the LLM label.
+    `shadow` marks confident local decisions that were re-checked by the LLM in the background;
+    the others are ambiguous documents that were routed to the LLM anyway.
+    """
+    prefix = "shadow" if shadow else "routed"
+    with _stats_lock:
+        _stats[f"{prefix}_compared"] += 1
+        _stats[f"{prefix}_agreed"] += int(local_label == llm_label)
+
+
+def _rate(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else 0.0
+
+
+def classifier_stats() -> dict:
+    with _stats_lock:
+        return {
+            "loaded": local_classifier is not None,
+            "threshold": LOCAL_CLASSIFIER_THRESHOLD,
+            "shadow_rate": LOCAL_CLASSIFIER_SHADOW_RATE,
+            **_stats,
+            "llm_bypass_rate": _rate(_stats["bypassed"], _stats["decisions"]),
+            "routed_agreement_rate": _rate(_stats["routed_agreed"], _stats["routed_compared"]),
+            "shadow_agreement_rate": _rate(_stats["shadow_agreed"], _stats["shadow_compared"]),
+        }
+
+
+def _load_default():
+    if not os.path.exists(LOCAL_CLASSIFIER_PATH):
+        print(f"[LocalClassifier] No model at {LOCAL_CLASSIFIER_PATH}; every document goes to the LLM.")
+        return None
+    try:
+        model = LocalClassifier.load(LOCAL_CLASSIFIER_PATH)
+        print(f"[LocalClassifier] Loaded {LOCAL_CLASSIFIER_PATH} with labels {model.labels}")
+        return model
+    except Exception as e:
+        print(f"[LocalClassifier] Failed to load {LOCAL_CLASSIFIER_PATH}: {e}")
+        return None
+
+
+local_classifier = _load_default()
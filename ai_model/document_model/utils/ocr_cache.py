@@ -0,0 +1,122 @@
+# --- utils/ocr_cache.py ---
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ------------------- Configuration -------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", os.path.join(BASE_DIR, ".ocr_cache"))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256 MB
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() != "false"
+
+# Bump when the OCR call changes (feature type, language hints...) so old text is not reused.
+OCR_CACHE_VERSION = "vision-document-text-v1"
+
+
+class OCRCache:
+    """
+    Persistent cache of per-page OCR text, keyed by a hash of the page content.
+
+    Entries live in a small SQLite file so they survive worker restarts. When the total
+    stored text exceeds `max_bytes`, the least recently used pages are evicted first.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "ocr_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_access ON pages (last_access)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ------------------- Keys -------------------
+    @staticmethod
+    def key_for_bytes(data: bytes) -> str:
+        """Key for a raw image stream (e.g. an uploaded JPEG/PNG)."""
+        digest = hashlib.blake2b(data, digest_size=20)
+        digest.update(OCR_CACHE_VERSION.encode("utf-8"))
+        return "raw:" + digest.hexdigest()
+
+    @staticmethod
+    def key_for_image(image) -> str:
+        """Key for a rendered PIL page, hashed over its mode, size and raster."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+        digest.update(image.tobytes())
+        digest.update(OCR_CACHE_VERSION.encode("utf-8"))
+        return "raster:" + digest.hexdigest()
+
+    # ------------------- Lookup / Store -------------------
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM pages WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, text: str) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages (key, text, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, size, time.time())
+            )
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        """Drop least recently used pages until the cache fits in `max_bytes`."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM pages ORDER BY last_access ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    # ------------------- Metrics -------------------
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+ocr_cache = OCRCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES) if OCR_CACHE_ENABLED else None
@@ -0,0 +1,106 @@
+# --- utils/ocr_preprocess.py ---
+import os
+import math
+import threading
+from io import BytesIO
+from PIL import Image
+import fitz
+
+# ------------------- Configuration -------------------
+OCR_DPI_DENSE = int(os.getenv("OCR_DPI_DENSE", "300"))     # small / dense print
+OCR_DPI_SPARSE = int(os.getenv("OCR_DPI_SPARSE", "200"))   # letters, forms, large print
+OCR_DPI_MIN = int(os.getenv("OCR_DPI_MIN", "150"))
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", str(12_000_000)))
+OCR_DENSE_INK_RATIO = float(os.getenv("OCR_DENSE_INK_RATIO", "0.06"))
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "80"))
+OCR_BILEVEL_RATIO = float(os.getenv("OCR_BILEVEL_RATIO", "0.97"))
+
+PREVIEW_DPI = 36
+
+
+# ------------------- DPI Selection -------------------
+def ink_ratio(gray_image) -> float:
+    """Fraction of dark pixels in a grayscale image, used as a cheap text-density estimate."""
+    hist = gray_image.histogram()
+    total = sum(hist) or 1
+    return sum(hist[:128]) / total
+
+
+def choose_dpi(width_in: float, height_in: float, density: float) -> int:
+    """
+    Pick a render DPI from the page size and its ink density.
+    Dense pages keep full resolution; sparse pages drop to OCR_DPI_SPARSE, and oversized
+    pages are capped so the raster never exceeds OCR_MAX_PIXELS.
+    """
+    dpi = OCR_DPI_DENSE if density >= OCR_DENSE_INK_RATIO else OCR_DPI_SPARSE
+    area_in = max(width_in * height_in, 1e-6)
+    pixel_cap_dpi = math.sqrt(OCR_MAX_PIXELS / area_in)
+    return int(max(OCR_DPI_MIN, min(dpi, pixel_cap_dpi)))
+
+
+def render_pdf_page(page):
+    """Render a fitz page straight to a grayscale PIL image at an adaptive DPI."""
+    width_in = page.rect.width / 72
+    height_in = page.rect.height / 72
+
+    preview = page.get_pixmap(dpi=PREVIEW_DPI, colorspace=fitz.csGRAY)
+    preview_img = Image.frombytes("L", (preview.width, preview.height), preview.samples)
+    dpi = choose_dpi(width_in, height_in, ink_ratio(preview_img))
+
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY)
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples), dpi
+
+
+# ------------------- Encoding -------------------
+def is_bilevel(gray_image) -> bool:
+    """True for scans that are essentially black ink on white paper."""
+    hist = gray_image.histogram()
+    total = sum(hist) or 1
+    return (sum(hist[:32]) + sum(hist[224:])) / total >= OCR_BILEVEL_RATIO
+
+
+def encode_for_ocr(image) -> tuple[bytes, str]:
+    """
+    Convert an image to grayscale, cap its pixel count and encode it for Vision.
+    Bilevel scans go out as 1-bit PNG; everything else as tuned JPEG.
+    Returns (content_bytes, format).
+    """
+    gray = image if image.mode == "L" else image.convert("L")
+
+    pixels = gray.size[0] * gray.size[1]
+    if pixels > OCR_MAX_PIXELS:
+        scale = math.sqrt(OCR_MAX_PIXELS / pixels)
+        gray = gray.resize((int(gray.size[0] * scale), int(gray.size[1] * scale)), Image.LANCZOS)
+
+    with BytesIO() as img_buffer:
+        if is_bilevel(gray):
+            gray.convert("1", dither=Image.NONE).save(img_buffer, format="PNG", optimize=True)
+            fmt = "PNG"
+        else:
+            gray.save(img_buffer, format="JPEG", quality=OCR_JPEG_QUALITY, optimize=True)
+            fmt = "JPEG"
+        return img_buffer.getvalue(), fmt
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"pages": 0, "bytes_sent": 0, "latency_seconds": 0.0, "png_pages": 0, "jpeg_pages": 0}
+
+
+def record_ocr_call(bytes_sent: int, latency: float, fmt: str) -> None:
+    with _stats_lock:
+        _stats["pages"] += 1
+        _stats["bytes_sent"] += bytes_sent
+        _stats["latency_seconds"] += latency
+        _stats["png_pages" if fmt == "PNG" else "jpeg_pages"] += 1
+
+
+def ocr_stats() -> dict:
+    with _stats_lock:
+        pages = _stats["pages"]
+        return {
+            **_stats,
+            "latency_seconds": round(_stats["latency_seconds"], 3),
+            "avg_bytes_per_page": int(_stats["bytes_sent"] / pages) if pages else 0,
+            "avg_latency_per_page": round(_stats["latency_seconds"] / pages, 3) if pages else 0.0,
+        }
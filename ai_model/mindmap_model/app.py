@@ -245,10 +245,10 @@ import warnings
 warnings.filterwarnings("ignore", category=FutureWarning)
 import os
 import json
-import re
+import time
 import logging
 import uuid # For generating unique node IDs
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from dotenv import load_dotenv
 
 # --- Core AI Libraries ---
@@ -256,6 +256,12 @@ import vertexai
 from langchain_core.prompts import PromptTemplate
 from langchain_google_vertexai import ChatVertexAI, HarmBlockThreshold, HarmCategory
 from requests.exceptions import RequestException
+from utils.mindmap_cache import mindmap_cache
+from utils.json_repair import parse_tolerant, record_generation, generation_stats
+from utils.structured_output import invoke_structured, structured_output_stats, StructuredOutputError
+from pydantic import BaseModel, Field
+from utils.mindmap_builder import build_mindmap, polish_labels, assign_ids
+from utils.mindmap_stream import NodeStreamParser, tree_patches
 
 # --- Configuration ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(funcName)s] - %(message)s')
@@ -322,13 +328,23 @@ Your response MUST start with {{ and end with }}.
 
 **Node Generation Rules (Critical):**
 1.  **Root Node:** The 'Document_Name' must be the 'label' for the root node (id: 'root'). 'details' should be a 1-sentence summary of the 'Purpose'.
-2.  **Hierarchy:** Create a logical hierarchy from the summary.
+2.  **Hierarchy:** Create a logical hierarchy from the summary, at most 5 levels deep including the root.
 3.  **LABELS MUST BE SHORT:** The 'label' field MUST be a short, 2-4 word conceptual title (e.g., "Payment Terms", "Risk Level").
 4.  **DETAILS MUST BE SUMMARIZED:** Put the long explanatory text from the input into the 'details' field, but you **MUST summarize it** into a concise, 1-2 sentence max 10-15 words explanation. Do not just copy the full long paragraph.
 5.  **Informative Data:** Use the 'icon', 'status', and 'secondaryLabel' fields for at-a-glance context.
 6.  **Language:** All text fields MUST be in the language of the input summary.
 """
 
+# Part of the mind map cache key; bump whenever the prompts below change so cached maps are regenerated.
+MINDMAP_PROMPT_VERSION = "mindmap-v2"
+# Node levels in the response schema, root included; keep in line with rule 2 of the prompt
+MINDMAP_SCHEMA_DEPTH = 5
+
+# "rules" builds the tree from the summary JSON (utils/mindmap_builder.py); "llm" asks Gemini to re-shape it.
+MINDMAP_DEFAULT_MODE = os.getenv("MINDMAP_DEFAULT_MODE", "rules")
+# One extra LLM pass that only shortens labels/details of the rule-based tree
+MINDMAP_POLISH_LABELS = os.getenv("MINDMAP_POLISH_LABELS", "false").lower() == "true"
+
 # --- Category-Specific Prompt Templates ---
 category_templates = {
     "business": f"""
@@ -374,84 +390,77 @@ category_templates = {
 
 
 # ---------- Step 2: Generate Mind Map Data from LLM ----------
+class MindMapNode(BaseModel):
+    """One node of the hierarchical mind map (see 'Output JSON Schema' in the prompt)."""
+    id: str = ""  # replaced by path ids ('root', 'root-0', ...) once the reply is parsed
+    label: str
+    details: str = "N/A"
+    icon: str = "info"
+    status: str = "info"
+    secondaryLabel: str = ""
+    children: list["MindMapNode"] = Field(default_factory=list)
+
+def _with_path_ids(mindmap_node: MindMapNode) -> dict:
+    """Model-written ids may be missing or repeated; use the same path ids as the rule-based builder."""
+    mindmap = mindmap_node.model_dump()
+    assign_ids(mindmap, "root")
+    return mindmap
+
+def build_mindmap_prompt(summary_json_str: str, category: str) -> str:
+    prompt_template = category_templates.get(category.lower(), category_templates["citizen"])
+    return PromptTemplate(input_variables=["text"], template=prompt_template).format(text=summary_json_str)
+
 def generate_mindmap_data(llm_client, summary_json_str: str, category: str) -> dict | None:
     """
     Takes a document summary JSON string and category, and uses the LLM
     to generate a HIERARCHICAL JSON structure.
     """
     
-    prompt_template = category_templates.get(category.lower(), category_templates["citizen"])
-    formatted_prompt = PromptTemplate(input_variables=["text"], template=prompt_template).format(text=summary_json_str)
+    formatted_prompt = build_mindmap_prompt(summary_json_str, category)
 
     logging.info(f"Generating mind map data from LLM for category: {category}...")
 
+    # The reply is constrained by the MindMapNode schema. If it still fails to parse or validate
+    # (e.g. truncated at max_output_tokens) the repair parser recovers it locally; the model is
+    # only re-invoked when nothing usable can be recovered.
     max_retries = 3
     for attempt in range(1, max_retries + 1):
         try:
-            response = llm_client.invoke(formatted_prompt)
-            raw_output = response.content.strip()
+            mindmap_node = invoke_structured(llm_client, formatted_prompt, MindMapNode, "mindmap",
+                                             max_depth=MINDMAP_SCHEMA_DEPTH)
+            logging.info(f"Mind map JSON parsed successfully on attempt {attempt}.")
+            record_generation(attempt, repaired=False, ok=True)
+            return _with_path_ids(mindmap_node)
+        except StructuredOutputError as e:
+            raw_output = e.raw
         except Exception as e:
             logging.error(f"LLM invocation failed (attempt {attempt}): {e}", exc_info=True)
             if attempt == max_retries:
+                record_generation(attempt, repaired=False, ok=False)
                 return None
             continue
 
-        # --- Robust JSON Cleaning ---
-        if raw_output.startswith("```"):
-            raw_output = re.sub(r"^```[json]*\n", "", raw_output, flags=re.MULTILINE)
-            raw_output = re.sub(r"\n```$", "", raw_output, flags=re.MULTILINE)
-        raw_output = raw_output.strip()
-
-        # Remove newlines inside quoted strings (to avoid unterminated string errors)
-        def clean_newlines_in_strings(text):
-            # Replace newlines inside double quotes with a space
-            def replacer(match):
-                return match.group(0).replace('\n', ' ')
-            return re.sub(r'"(.*?)"', replacer, text, flags=re.DOTALL)
-
-        cleaned_output = clean_newlines_in_strings(raw_output)
-        cleaned_output = re.sub(r",\s*(\]|})", r"\1", cleaned_output) # Fix trailing commas
-
         try:
-            mindmap_data = json.loads(cleaned_output)
-            logging.info(f"Mind map JSON parsed successfully on attempt {attempt}.")
-            if "label" not in mindmap_data:
-                logging.error(f"Generated JSON is missing root 'label' key (attempt {attempt}).")
-                if attempt == max_retries:
-                    return None
-                continue
-            return mindmap_data
-        except json.JSONDecodeError as e:
-            logging.error(f"Model output was not valid JSON (attempt {attempt}). Error: {e}")
-            logging.error(f"--- Raw Output ---:\n{cleaned_output}")
-            # Try partial recovery: find last closing bracket
-            last_brace = cleaned_output.rfind('}')
-            if last_brace != -1:
-                partial = cleaned_output[:last_brace+1]
-                try:
-                    mindmap_data = json.loads(partial)
-                    logging.info(f"Partial mind map JSON parsed successfully on attempt {attempt}.")
-                    if "label" not in mindmap_data:
-                        logging.error(f"Partial JSON missing root 'label' key (attempt {attempt}).")
-                        if attempt == max_retries:
-                            return None
-                        continue
-                    return mindmap_data
-                except Exception as e2:
-                    logging.error(f"Partial JSON recovery failed (attempt {attempt}): {e2}")
+            mindmap_data, _ = parse_tolerant(raw_output)
+            mindmap_node = MindMapNode.model_validate(mindmap_data)
+        except ValueError as e:  # includes pydantic ValidationError
+            logging.error(f"Model output could not be parsed or repaired (attempt {attempt}). Error: {e}")
+            logging.error(f"--- Raw Output ---:\n{raw_output}")
             if attempt == max_retries:
+                record_generation(attempt, repaired=False, ok=False)
                 return None
             continue
 
+        logging.info(f"Mind map JSON repaired locally on attempt {attempt}.")
+        record_generation(attempt, repaired=True, ok=True)
+        return _with_path_ids(mindmap_node)
+
 # ---------- Step 3: Create Flask App and Endpoint ----------
 app = Flask(__name__)
 
 @app.route("/generate_mindmap", methods=['POST'])
 def generate_mindmap_api():
 
-    if not llm:
-        return jsonify({"error": "LLM client not initialized."}), 503
-
     try:
         data = request.get_json()
         if not data:
@@ -460,23 +469,151 @@ def generate_mindmap_api():
         summary_json_obj = data.get("summary_json") 
         summary_json_str = json.dumps(summary_json_obj) 
         category = data.get("category", "citizen").lower()
+        mode = data.get("mode", MINDMAP_DEFAULT_MODE).lower()
+        polish = bool(data.get("polish", MINDMAP_POLISH_LABELS))
 
         if not summary_json_str or category not in ["business", "citizen", "student"]:
             return jsonify({"error": "Missing 'summary_json' or invalid 'category'."}), 400
+        if mode not in ["rules", "llm"]:
+            return jsonify({"error": "Invalid 'mode'; use 'rules' or 'llm'."}), 400
             
     except Exception as e:
         return jsonify({"error": f"Invalid request format: {e}"}), 400
 
-    # --- 1. Generate the HIERARCHICAL JSON ---
-    hierarchical_data = generate_mindmap_data(llm, summary_json_str, category)
-    
+    # --- 0. Repeat views of the same summary are served from the cache ---
+    cache_key = None
+    if mindmap_cache:
+        version = f"{MINDMAP_PROMPT_VERSION}:{mode}{':polish' if polish and mode == 'rules' else ''}"
+        cache_key = mindmap_cache.key_for(summary_json_obj, category, version)
+        cached_data = mindmap_cache.get(cache_key)
+        if cached_data is not None:
+            logging.info(f"Mind map served from cache for category: {category}.")
+            return jsonify(cached_data), 200
+
+    # --- 1. Build the HIERARCHICAL JSON from the summary's fixed category structure ---
+    hierarchical_data = None
+    if mode == "rules":
+        start = time.time()
+        try:
+            hierarchical_data = build_mindmap(summary_json_obj, category)
+        except (ValueError, TypeError) as e:  # e.g. summary_json is a string that is not valid JSON
+            logging.warning(f"Rule-based mind map failed ({e}); falling back to the LLM.")
+            hierarchical_data = None
+        if hierarchical_data:
+            logging.info(f"Rule-based mind map built in {(time.time() - start) * 1000:.1f} ms.")
+            if polish and llm:
+                hierarchical_data = polish_labels(llm, hierarchical_data)
+        else:
+            logging.info("Summary does not follow the category template; falling back to the LLM.")
+
+    # --- 1b. Otherwise let Gemini re-shape it ---
+    if hierarchical_data is None:
+        if not llm:
+            return jsonify({"error": "LLM client not initialized."}), 503
+        hierarchical_data = generate_mindmap_data(llm, summary_json_str, category)
+
     if not hierarchical_data:
         logging.error("Failed to generate hierarchical JSON from LLM.")
         return jsonify({"error": "Failed to generate mind map data from LLM."}), 500
+
+    if cache_key:
+        mindmap_cache.put(cache_key, hierarchical_data)
         
     # --- 2. Return the HIERARCHICAL JSON directly ---
     return jsonify(hierarchical_data), 200
 
+@app.route("/generate_mindmap_stream", methods=['POST'])
+def generate_mindmap_stream_api():
+    """
+    Same request body as /generate_mindmap, answered as NDJSON patches so the frontend can render
+    the tree while Gemini is still generating it:
+        {"parent_id": null, "node": {"id": "root", "label": ...}}
+        {"parent_id": "root", "node": {"id": "root-0", ...}}
+        ...
+        {"done": true, "node_count": 42}
+    Parents always arrive before their children. Cached and rule-based maps are streamed at once.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({"error": "Request must be JSON."}), 400
+
+        summary_json_obj = data.get("summary_json")
+        summary_json_str = json.dumps(summary_json_obj)
+        category = data.get("category", "citizen").lower()
+        mode = data.get("mode", MINDMAP_DEFAULT_MODE).lower()
+
+        if not summary_json_str or category not in ["business", "citizen", "student"]:
+            return jsonify({"error": "Missing 'summary_json' or invalid 'category'."}), 400
+        if mode not in ["rules", "llm"]:
+            return jsonify({"error": "Invalid 'mode'; use 'rules' or 'llm'."}), 400
+    except Exception as e:
+        return jsonify({"error": f"Invalid request format: {e}"}), 400
+
+    def ndjson(obj):
+        return json.dumps(obj, ensure_ascii=False) + "\n"
+
+    def generate():
+        # Streamed LLM maps are assembled node by node without schema validation, so they are cached apart from /generate_mindmap's
+        cache_key = mindmap_cache.key_for(summary_json_obj, category, f"{MINDMAP_PROMPT_VERSION}:{mode}:stream") if mindmap_cache else None
+        hierarchical_data = mindmap_cache.get(cache_key) if cache_key else None
+        if hierarchical_data is None and mode == "rules":
+            try:
+                hierarchical_data = build_mindmap(summary_json_obj, category)
+            except (ValueError, TypeError) as e:  # the response has started: fall back, never abort
+                logging.warning(f"Rule-based mind map failed ({e}); falling back to the LLM.")
+
+        if hierarchical_data is not None:
+            patches = tree_patches(hierarchical_data)
+            for patch in patches:
+                yield ndjson(patch)
+            if cache_key:
+                mindmap_cache.put(cache_key, hierarchical_data)
+            yield ndjson({"done": True, "node_count": len(patches)})
+            return
+
+        if not llm:
+            yield ndjson({"error": "LLM client not initialized."})
+            return
+
+        # JSON mode without a response schema: Vertex orders schema properties alphabetically,
+        # which would put "children" before a node's own fields and hold back every parent.
+        parser = NodeStreamParser()
+        node_count = 0
+        start = time.time()
+        try:
+            for chunk in llm.stream(build_mindmap_prompt(summary_json_str, category), response_mime_type="application/json"):
+                for patch in parser.feed(chunk.content if isinstance(chunk.content, str) else ""):
+                    if node_count == 0:
+                        logging.info(f"First mind map node streamed after {time.time() - start:.2f} seconds.")
+                    node_count += 1
+                    yield ndjson(patch)
+        except Exception as e:
+            logging.error(f"Mind map stream failed after {node_count} nodes: {e}", exc_info=True)
+        for patch in parser.finish():
+            node_count += 1
+            yield ndjson(patch)
+
+        hierarchical_data = parser.tree()
+        record_generation(1, repaired=False, ok=hierarchical_data is not None)
+        if hierarchical_data is None:
+            yield ndjson({"error": "Failed to generate mind map data from LLM."})
+            return
+        if cache_key:
+            mindmap_cache.put(cache_key, hierarchical_data)
+        logging.info(f"Streamed {node_count} mind map nodes in {time.time() - start:.2f} seconds.")
+        yield ndjson({"done": True, "node_count": node_count})
+
+    return Response(generate(), mimetype="application/x-ndjson")
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "mindmap_cache": mindmap_cache.stats() if mindmap_cache else None,
+        "generation": generation_stats(),
+        "structured_output": structured_output_stats(),
+    }), 200
+
 # ---------- Main Execution (for local testing) ----------
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8080"))
@@ -0,0 +1,49 @@
+import json
+import pytest
+from utils.json_repair import repair_json, parse_tolerant
+
+
+def test_valid_json_is_not_repaired():
+    assert parse_tolerant('```json\n{"a": 1}\n```') == ({"a": 1}, False)
+
+
+def test_prose_trailing_commas_and_python_literals():
+    data, repaired = parse_tolerant('Here you go: {"a": [1, 2,], "b": True, "c": None} thanks')
+    assert repaired
+    assert data == {"a": [1, 2], "b": True, "c": None}
+
+
+def test_raw_newlines_and_inner_quotes_are_escaped():
+    assert json.loads(repair_json('{"label": "line1\nline2"}')) == {"label": "line1\nline2"}
+    assert json.loads(repair_json('{"label": "he said "hi" there", "details": "y"}')) == {
+        "label": 'he said "hi" there', "details": "y"}
+
+
+@pytest.mark.parametrize("text", [
+    '{"label": "x" "details": "y"}',
+    '{"label": "x"\n  "details": "y"}',
+    '{"label": "x""details": "y"}',
+])
+def test_missing_comma_before_next_key(text):
+    assert json.loads(repair_json(text)) == {"label": "x", "details": "y"}
+
+
+def test_missing_comma_in_nested_nodes():
+    text = '{"label": "Root", "children": [{"label": "A" "icon": "law"}]}'
+    assert json.loads(repair_json(text)) == {"label": "Root", "children": [{"label": "A", "icon": "law"}]}
+
+
+def test_truncated_output_is_closed():
+    assert json.loads(repair_json('{"a": {"b": "trunc')) == {"a": {"b": "trunc"}}
+    assert json.loads(repair_json('{"children": [{"label": "A"}, {"label": "B"')) == {
+        "children": [{"label": "A"}, {"label": "B"}]}
+
+
+def test_dangling_key_is_dropped():
+    assert json.loads(repair_json('{"a": 1, "b":')) == {"a": 1}
+    assert json.loads(repair_json('{"a": 1, "lab')) == {"a": 1}
+
+
+def test_no_json_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_tolerant("no json here")
@@ -0,0 +1,62 @@
+import json
+from utils.mindmap_stream import NodeStreamParser, tree_patches
+
+MINDMAP = {
+    "label": "Rental Agreement", "details": "Flat on rent", "icon": "document",
+    "children": [
+        {"label": "Parties", "icon": "people", "children": [
+            {"label": "Landlord", "details": "Owner"},
+            {"label": "Tenant", "details": "Occupant"},
+        ]},
+        {"label": "Rent", "icon": "money", "secondaryLabel": "15000", "children": []},
+    ],
+}
+
+
+def stream(text, chunk_size):
+    parser = NodeStreamParser()
+    patches = []
+    for i in range(0, len(text), chunk_size):
+        patches += parser.feed(text[i:i + chunk_size])
+    patches += parser.finish()
+    return parser, patches
+
+
+def test_nodes_get_path_ids_and_parents_come_first():
+    for chunk_size in (1, 7, 10_000):
+        parser, patches = stream(json.dumps(MINDMAP), chunk_size)
+        ids = [p["node"]["id"] for p in patches]
+        assert ids == ["root", "root-0", "root-0-0", "root-0-1", "root-1"]
+        for i, patch in enumerate(patches):
+            assert patch["parent_id"] is None or patch["parent_id"] in ids[:i]
+        assert [c["label"] for c in parser.tree()["children"]] == ["Parties", "Rent"]
+
+
+def test_node_is_released_at_its_children_key():
+    parser = NodeStreamParser()
+    patches = parser.feed('{"label": "Root", "details": "d", "children": [')
+    assert [p["node"]["label"] for p in patches] == ["Root"]
+    assert patches[0]["node"]["icon"] == "info"  # default for a missing field
+
+
+def test_truncated_stream_keeps_complete_fields():
+    parser, patches = stream('{"label": "Root", "children": [{"label": "A", "details": "cut of', 5)
+    assert [(p["node"]["id"], p["node"]["label"]) for p in patches] == [("root", "Root"), ("root-0", "A")]
+    assert parser.tree()["children"][0]["details"] == "cut of"
+
+
+def test_label_less_nodes_are_dropped():
+    parser, patches = stream('{"l', 10)
+    assert patches == [] and parser.tree() is None
+
+    parser, patches = stream('{"label": "Root", "children": [{"label": "A"}, {"lab', 10)
+    assert [p["node"]["id"] for p in patches] == ["root", "root-0"]
+    assert [c["id"] for c in parser.tree()["children"]] == ["root-0"]
+
+
+def test_tree_patches_round_trip():
+    tree = {"id": "root", "label": "R", "children": [{"id": "root-0", "label": "A", "children": []}]}
+    assert tree_patches(tree) == [
+        {"parent_id": None, "node": {"id": "root", "label": "R"}},
+        {"parent_id": "root", "node": {"id": "root-0", "label": "A"}},
+    ]
@@ -0,0 +1,256 @@
+# --- utils/json_repair.py ---
+import re
+import json
+import threading
+
+# Characters that end a bare (unquoted) token
+_DELIMITERS = set('{}[]:,"') | set(" \t\r\n")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+_LITERALS = {"true": "true", "false": "false", "null": "null",
+             "True": "true", "False": "false", "None": "null"}
+_CONTROL_ESCAPES = {"\n": "\\n", "\r": "\\r", "\t": "\\t", "\b": "\\b", "\f": "\\f"}
+_VALUE_START = set('"{[-0123456789tfnTFN')
+# A quoted key and its colon: after a closing quote it means the comma between members is missing
+_NEXT_KEY = re.compile(r'\s*"(?:[^"\\\n]|\\.)*"\s*:')
+
+
+def _next_significant(text: str, i: int) -> str:
+    """First non-whitespace character at or after `i` ("" at end of text)."""
+    n = len(text)
+    while i < n and text[i] in " \t\r\n":
+        i += 1
+    return text[i] if i < n else ""
+
+
+def _closes_string(text: str, i: int) -> bool:
+    """
+    Decide whether the quote at `i` ends the current string or is an unescaped quote inside it.
+    A closing quote is followed by a structural character (or the end of the output), or by
+    the next `"key":` when the comma before it is missing.
+    """
+    nxt = _next_significant(text, i + 1)
+    if nxt in ("", ":", "}", "]"):
+        return True
+    if nxt == '"':
+        return bool(_NEXT_KEY.match(text, i + 1))
+    if nxt == ",":
+        after = _next_significant(text, text.index(",", i + 1) + 1)
+        return after in _VALUE_START or after in ("", "}", "]")
+    return False
+
+
+def _tokenize(text: str):
+    """
+    Yield (kind, value, complete) tokens. kind is one of "{", "}", "[", "]", ":", ",", "string", "bare".
+    String values are returned already escaped for JSON; `complete` is False only for a
+    string or bare token cut off by the end of the text.
+    """
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in " \t\r\n":
+            i += 1
+        elif ch in "{}[]:,":
+            yield ch, ch, True
+            i += 1
+        elif ch == '"':
+            body = []
+            i += 1
+            while i < n:
+                ch = text[i]
+                if ch == "\\":
+                    nxt = text[i + 1] if i + 1 < n else ""
+                    if nxt in '"\\/bfnrt' and nxt:
+                        body.append(ch + nxt)
+                        i += 2
+                    elif nxt == "u" and re.match(r"[0-9a-fA-F]{4}", text[i + 2:i + 6]):
+                        body.append(text[i:i + 6])
+                        i += 6
+                    else:
+                        body.append("\\\\")  # stray backslash
+                        i += 1
+                elif ch == '"':
+                    if _closes_string(text, i):
+                        break
+                    body.append('\\"')
+                    i += 1
+                elif ch in _CONTROL_ESCAPES:
+                    body.append(_CONTROL_ESCAPES[ch])
+                    i += 1
+                elif ord(ch) < 0x20:
+                    body.append(f"\\u{ord(ch):04x}")
+                    i += 1
+                else:
+                    body.append(ch)
+                    i += 1
+            complete = i < n
+            yield "string", "".join(body), complete
+            i += 1
+        else:
+            start = i
+            while i < n and text[i] not in _DELIMITERS:
+                i += 1
+            yield "bare", text[start:i], i < n
+
+
+def _bare_value(token: str, complete: bool) -> str | None:
+    """Literal / number as JSON; other bare words become strings. None if truncated mid-token."""
+    if token in _LITERALS:
+        return _LITERALS[token]
+    if _NUMBER.match(token):
+        return token
+    if not complete:
+        return None
+    return json.dumps(token, ensure_ascii=False)
+
+
+def strip_fences(text: str) -> str:
+    text = text.strip()
+    text = re.sub(r"^```[a-zA-Z]*\s*", "", text)
+    return re.sub(r"\s*```$", "", text)
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite almost-JSON model output into valid JSON text.
+
+    Handles markdown fences and prose around the object, raw newlines and unescaped quotes
+    inside strings, trailing or missing commas, Python literals, bare words,
+    and output truncated mid-string / mid-object (open containers are closed and a dangling
+    key without a value is dropped).
+    """
+    text = strip_fences(text)
+    starts = [i for i in (text.find("{"), text.find("[")) if i != -1]
+    if not starts:
+        raise ValueError("No JSON object or array found in model output.")
+    text = text[min(starts):]
+
+    out = []
+    # Frame: [kind, state, key_at]; kind "{" or "[", state is what the frame expects next
+    # ("key", "colon", "value" or "comma"), key_at is where the current member starts in `out`.
+    stack = []
+
+    def begin_member(frame):
+        frame[2] = len(out)
+        if frame[1] == "comma":
+            out.append(",")
+            frame[1] = "key" if frame[0] == "{" else "value"
+
+    def close_top():
+        frame = stack.pop()
+        if frame[0] == "{" and frame[1] in ("colon", "value"):
+            del out[frame[2]:]  # key without a value
+        out.append("}" if frame[0] == "{" else "]")
+        if stack:
+            stack[-1][1] = "comma"
+
+    def emit_value(value):
+        if stack:
+            stack[-1][1] = "comma"
+        out.append(value)
+
+    for kind, value, complete in _tokenize(text):
+        frame = stack[-1] if stack else None
+        if frame is None and out:
+            break  # top-level value finished; ignore trailing prose
+
+        if kind in ("}", "]"):
+            if not stack:
+                break
+            close_top()
+            if not stack:
+                break
+            continue
+
+        if kind == ",":
+            continue  # commas are re-inserted by begin_member, which drops trailing ones
+
+        if kind == ":":
+            if frame is not None and frame[0] == "{" and frame[1] == "colon":
+                out.append(":")
+                frame[1] = "value"
+            continue
+
+        # A value or key starts here
+        if frame is not None:
+            if frame[1] == "comma":
+                begin_member(frame)
+            elif frame[1] == "key" or frame[0] == "[":
+                frame[2] = len(out)
+            elif frame[1] == "colon":
+                out.append(":")  # missing colon
+                frame[1] = "value"
+
+        if frame is not None and frame[0] == "{" and frame[1] == "key":
+            if kind == "string" and complete:
+                out.append('"' + value + '"')
+                frame[1] = "colon"
+            elif kind == "bare" and complete:
+                out.append(json.dumps(value, ensure_ascii=False))
+                frame[1] = "colon"
+            elif kind in ("{", "["):
+                continue  # a container cannot be a key
+            else:
+                del out[frame[2]:]  # key cut off by the end of the output
+                break
+            continue
+
+        if kind in ("{", "["):
+            out.append(kind)
+            stack.append([kind, "key" if kind == "{" else "value", len(out)])
+        elif kind == "string":
+            emit_value('"' + value + '"')
+        else:
+            bare = _bare_value(value, complete)
+            if bare is None:
+                if frame is not None:
+                    del out[frame[2]:]  # value cut off by the end of the output
+                    frame[1] = "comma"
+                break
+            emit_value(bare)
+
+    while stack:
+        close_top()
+    return "".join(out)
+
+
+def parse_tolerant(text: str) -> tuple[object, bool]:
+    """
+    Parse model output as JSON, repairing it locally if needed.
+    Returns (data, repaired). Raises ValueError if nothing usable can be recovered.
+    """
+    try:
+        return json.loads(strip_fences(text)), False
+    except json.JSONDecodeError:
+        pass
+    try:
+        return json.loads(repair_json(text)), True
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Could not repair model output: {e}") from e
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"generations": 0, "llm_calls": 0, "clean_parses": 0, "repaired_parses": 0, "failures": 0}
+
+
+def record_generation(llm_calls: int, repaired: bool, ok: bool) -> None:
+    with _stats_lock:
+        _stats["generations"] += 1
+        _stats["llm_calls"] += llm_calls
+        if not ok:
+            _stats["failures"] += 1
+        elif repaired:
+            _stats["repaired_parses"] += 1
+        else:
+            _stats["clean_parses"] += 1
+
+
+def generation_stats() -> dict:
+    with _stats_lock:
+        generations = _stats["generations"]
+        return {
+            **_stats,
+            "retry_rate": round((_stats["llm_calls"] - generations) / generations, 4) if generations else 0.0,
+            "repair_rate": round(_stats["repaired_parses"] / generations, 4) if generations else 0.0,
+        }
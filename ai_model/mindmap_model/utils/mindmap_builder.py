@@ -0,0 +1,227 @@
+# --- utils/mindmap_builder.py ---
+import re
+import json
+import logging
+from pydantic import BaseModel
+from utils.mindmap_layouts import (
+    MINDMAP_LAYOUTS, ROOT_SKIP_KEYS, ITEM_LABEL_KEYS, ITEM_DETAILS_KEYS, ITEM_SECONDARY_KEYS, FIELD_ICONS
+)
+from utils.structured_output import invoke_structured
+
+LABEL_WORDS = 5
+DETAILS_WORDS = 15
+SECONDARY_CHARS = 12
+MIN_BRANCHES = 2  # fewer recognised branches means the summary does not follow a category template
+
+_EMPTY = (None, "", "N/A", "n/a", [], {})
+
+
+# ------------------- Text helpers -------------------
+def humanize(key: str) -> str:
+    return re.sub(r"\s+", " ", key.replace("_", " ")).strip()
+
+
+def shorten(text, max_words: int) -> str:
+    """First sentence of `text`, cut to `max_words` words."""
+    text = re.sub(r"\s+", " ", str(text)).strip()
+    sentence = re.split(r"(?<=[.!?।])\s", text, maxsplit=1)[0]
+    words = sentence.split(" ")
+    return sentence if len(words) <= max_words else " ".join(words[:max_words]) + "…"
+
+
+def _field_icon(key: str, default: str = "info") -> str:
+    lowered = key.lower()
+    for word, icon in FIELD_ICONS.items():
+        if word in lowered:
+            return icon
+    return default
+
+
+def _node(label, details="N/A", icon="info", status="info", secondary="", children=None):
+    return {"id": "", "label": label, "details": details, "icon": icon, "status": status,
+            "secondaryLabel": secondary, "children": children or []}
+
+
+# ------------------- Values -> nodes -------------------
+def _leaf(key: str, value) -> dict:
+    text = str(value).strip()
+    node = _node(humanize(key), shorten(text, DETAILS_WORDS), icon=_field_icon(key))
+    if len(text) <= SECONDARY_CHARS:
+        node["secondaryLabel"] = text
+
+    lowered_key, lowered_value = key.lower(), text.lower()
+    if "risk_level" in lowered_key or lowered_key == "risk":
+        level = "high" if "high" in lowered_value else "low" if "low" in lowered_value else "medium"
+        node.update(icon="risk_high" if level == "high" else "risk_low",
+                    status={"high": "negative", "low": "positive"}.get(level, "neutral"))
+    elif "confidence" in lowered_key and re.fullmatch(r"\d+(\.\d+)?", text):
+        node.update(icon="star", secondaryLabel=f"{text}/10" if float(text) <= 10 else f"{text}%")
+    elif lowered_key.startswith("is_") and lowered_value in ("yes", "no"):
+        node.update(icon="check" if lowered_value == "yes" else "risk_high",
+                    status="positive" if lowered_value == "yes" else "negative")
+    return node
+
+
+def _item_node(item) -> dict | None:
+    """One element of a list: a clause/act/issue object or a plain recommendation string."""
+    if isinstance(item, dict):
+        label_key = next((k for k in ITEM_LABEL_KEYS if item.get(k) not in _EMPTY), None)
+        details_key = next((k for k in ITEM_DETAILS_KEYS if item.get(k) not in _EMPTY), None)
+        if label_key is None:
+            first = next(((k, v) for k, v in item.items() if isinstance(v, str) and v.strip()), None)
+            if first is None:
+                return None
+            label_key = first[0]
+        node = _node(shorten(item[label_key], LABEL_WORDS),
+                     shorten(item[details_key], DETAILS_WORDS) if details_key else "N/A",
+                     icon=_field_icon(label_key))
+        secondary_key = next((k for k in ITEM_SECONDARY_KEYS if item.get(k) not in _EMPTY), None)
+        if secondary_key:
+            node["secondaryLabel"] = f"{secondary_key[:3]}. {item[secondary_key]}"
+        if label_key == "Issue":
+            node["status"] = "negative"
+        return node
+    if item in _EMPTY:
+        return None
+    return _node(shorten(item, 4), shorten(item, DETAILS_WORDS), icon="recommendation")
+
+
+def _value_node(key: str, value) -> dict | None:
+    if value in _EMPTY:
+        return None
+    if isinstance(value, dict):
+        children = [c for c in (_value_node(k, v) for k, v in value.items()) if c]
+        return _node(humanize(key), icon=_field_icon(key), children=children) if children else None
+    if isinstance(value, list):
+        children = [c for c in (_item_node(item) for item in value) if c]
+        return _node(humanize(key), icon=_field_icon(key), children=children) if children else None
+    return _leaf(key, value)
+
+
+def _branch_children(summary: dict, keys: list[str]) -> list[dict]:
+    """Dicts contribute one child per field, lists one child per item, scalars a single leaf."""
+    children = []
+    for key in keys:
+        value = summary.get(key)
+        if value in _EMPTY:
+            continue
+        if isinstance(value, dict):
+            children += [c for c in (_value_node(k, v) for k, v in value.items()) if c]
+        elif isinstance(value, list):
+            children += [c for c in (_item_node(item) for item in value) if c]
+        else:
+            children.append(_leaf(key, value))
+    return children
+
+
+def assign_ids(node: dict, node_id: str) -> None:
+    """Path-based ids ('root', 'root-2', 'root-2-0'): stable for the same summary."""
+    node["id"] = node_id
+    for i, child in enumerate(node["children"]):
+        assign_ids(child, f"{node_id}-{i}")
+
+
+# ------------------- Builder -------------------
+def normalize_summary(summary_obj) -> dict:
+    """Unwrap the shapes summary_model returns: [{"DocumentSummary": {...}}], {"DocumentSummary": {...}} or the bare fields."""
+    if isinstance(summary_obj, str):
+        summary_obj = json.loads(summary_obj)
+    if isinstance(summary_obj, list) and summary_obj:
+        summary_obj = summary_obj[0]
+    if isinstance(summary_obj, dict) and isinstance(summary_obj.get("DocumentSummary"), dict):
+        summary_obj = summary_obj["DocumentSummary"]
+    return summary_obj if isinstance(summary_obj, dict) else {}
+
+
+def build_mindmap(summary_obj, category: str) -> dict | None:
+    """
+    Build the hierarchical mind map straight from the summary JSON using MINDMAP_LAYOUTS.
+    Returns None if the summary does not follow a category template (the caller can fall back to the LLM).
+    """
+    summary = normalize_summary(summary_obj)
+    layout = MINDMAP_LAYOUTS.get(category.lower(), MINDMAP_LAYOUTS["citizen"])
+    header = summary.get("Header") if isinstance(summary.get("Header"), dict) else {}
+
+    root = _node(
+        shorten(header.get("Document_Name") or header.get("Document_Type") or header.get("Type") or "Document", LABEL_WORDS),
+        shorten(header.get("Purpose") or summary.get("Overview") or "N/A", DETAILS_WORDS),
+        icon="document",
+    )
+
+    mapped = set(ROOT_SKIP_KEYS)
+    for branch in layout:
+        mapped.update(branch["keys"])
+        children = _branch_children(summary, branch["keys"])
+        if not children:
+            continue
+        node = _node(branch["label"], icon=branch["icon"], children=children)
+        risk = next((c for c in children if c["icon"] == "risk_high" and c["status"] == "negative"
+                     and "risk" in c["label"].lower()), None)
+        if risk:
+            node.update(icon="risk_high", status="negative", secondaryLabel=risk["secondaryLabel"])
+        root["children"].append(node)
+
+    if len(root["children"]) < MIN_BRANCHES:
+        return None
+
+    # Fields the layout does not know about still get a branch, so nothing is silently dropped
+    for key, value in summary.items():
+        if key not in mapped:
+            node = _value_node(key, value)
+            if node:
+                root["children"].append(node)
+
+    assign_ids(root, "root")
+    return root
+
+
+# ------------------- Optional LLM label polish -------------------
+class PolishedNode(BaseModel):
+    id: str
+    label: str
+    details: str = ""
+
+
+class PolishedNodes(BaseModel):
+    nodes: list[PolishedNode]
+
+
+def _flatten(node: dict, out: list) -> list:
+    out.append({"id": node["id"], "label": node["label"], "details": node["details"]})
+    for child in node["children"]:
+        _flatten(child, out)
+    return out
+
+
+def polish_labels(llm, mindmap: dict) -> dict:
+    """
+    One LLM pass that only rewrites `label`/`details` text (2-4 word labels, one short sentence
+    of details). The tree structure, ids, icons and statuses stay rule-based; if the call fails
+    the unpolished map is returned.
+    """
+    nodes = _flatten(mindmap, [])
+    prompt = (
+        "You are editing the node texts of a legal-document mind map.\n"
+        "For every node, rewrite 'label' as a short 2-4 word title and 'details' as ONE concise sentence "
+        "(max 15 words). Keep the language of the input, keep the same 'id' values, keep 'N/A' as is, "
+        "and do not add or remove nodes.\n\n"
+        f"Nodes (JSON):\n{json.dumps(nodes, ensure_ascii=False)}"
+    )
+    try:
+        polished = invoke_structured(llm, prompt, PolishedNodes, "mindmap_polish")
+    except Exception as e:  # StructuredOutputError or a failed call
+        logging.warning(f"Label polish failed, returning rule-based labels: {e}")
+        return mindmap
+
+    by_id = {node.id: node for node in polished.nodes}
+
+    def apply(node):
+        update = by_id.get(node["id"])
+        if update and update.label.strip():
+            node["label"] = update.label.strip()
+            node["details"] = update.details.strip() or node["details"]
+        for child in node["children"]:
+            apply(child)
+
+    apply(mindmap)
+    return mindmap
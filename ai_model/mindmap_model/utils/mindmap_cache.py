@@ -0,0 +1,153 @@
+# --- utils/mindmap_cache.py ---
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ------------------- Configuration -------------------
+MINDMAP_CACHE_ENABLED = os.getenv("MINDMAP_CACHE_ENABLED", "true").lower() != "false"
+MINDMAP_CACHE_MAX_ENTRIES = int(os.getenv("MINDMAP_CACHE_MAX_ENTRIES", "512"))
+MINDMAP_CACHE_TTL_SECONDS = int(os.getenv("MINDMAP_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))  # 7 days
+# Optional second tier that survives restarts; empty = memory only
+MINDMAP_CACHE_DIR = os.getenv("MINDMAP_CACHE_DIR", "")
+MINDMAP_CACHE_DISK_MAX_ENTRIES = int(os.getenv("MINDMAP_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+
+def canonical_summary(summary_obj) -> str:
+    """Serialise the summary so that key order and whitespace do not change the cache key."""
+    return json.dumps(summary_obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+class MindmapCache:
+    """
+    Cache of generated mind maps, keyed by the canonical summary JSON, category and prompt version.
+
+    The memory tier is an LRU dict capped at `max_entries`; every entry expires after `ttl_seconds`.
+    If `disk_dir` is set, entries are also written to a SQLite file that is consulted on a memory
+    miss, so repeat views survive worker restarts and redeploys.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, disk_dir: str = "", disk_max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expires_at, mindmap)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+        self._conn = None
+        self.disk_max_entries = disk_max_entries
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(disk_dir, "mindmap_cache.sqlite3"), check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS mindmaps ("
+                " key TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mindmaps_last_access ON mindmaps (last_access)")
+            self._conn.execute("DELETE FROM mindmaps WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    # ------------------- Keys -------------------
+    @staticmethod
+    def key_for(summary_obj, category: str, prompt_version: str) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(canonical_summary(summary_obj).encode("utf-8"))
+        digest.update(f"\0{category.lower()}\0{prompt_version}".encode("utf-8"))
+        return digest.hexdigest()
+
+    # ------------------- Lookup / Store -------------------
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            stale = False
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, mindmap = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return mindmap
+                del self._memory[key]
+                stale = True
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT data, expires_at FROM mindmaps WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    self._conn.execute("UPDATE mindmaps SET last_access = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+                    mindmap = json.loads(row[0])
+                    self._remember_locked(key, row[1], mindmap)
+                    self.disk_hits += 1
+                    return mindmap
+                if row is not None:
+                    self._conn.execute("DELETE FROM mindmaps WHERE key = ?", (key,))
+                    self._conn.commit()
+                    stale = True
+
+            self.expired += int(stale)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, mindmap: dict) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        with self._lock:
+            self._remember_locked(key, expires_at, mindmap)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO mindmaps (key, data, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(mindmap, ensure_ascii=False), expires_at, now)
+                )
+                self._evict_disk_locked()
+                self._conn.commit()
+
+    def _remember_locked(self, key, expires_at, mindmap) -> None:
+        self._memory[key] = (expires_at, mindmap)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk_locked(self) -> None:
+        """Drop expired rows, then the least recently used ones beyond `disk_max_entries`."""
+        self._conn.execute("DELETE FROM mindmaps WHERE expires_at < ?", (time.time(),))
+        overflow = self._conn.execute("SELECT COUNT(*) FROM mindmaps").fetchone()[0] - self.disk_max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM mindmaps WHERE key IN (SELECT key FROM mindmaps ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    # ------------------- Metrics -------------------
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            disk_entries = self._conn.execute("SELECT COUNT(*) FROM mindmaps").fetchone()[0] if self._conn else None
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expired": self.expired,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+mindmap_cache = MindmapCache(
+    MINDMAP_CACHE_MAX_ENTRIES, MINDMAP_CACHE_TTL_SECONDS, MINDMAP_CACHE_DIR, MINDMAP_CACHE_DISK_MAX_ENTRIES
+) if MINDMAP_CACHE_ENABLED else None
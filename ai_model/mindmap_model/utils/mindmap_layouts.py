@@ -0,0 +1,54 @@
+# --- utils/mindmap_layouts.py ---
+# Branch layout of the rule-based mind map per summary category. Keys are the DocumentSummary
+# fields produced by summary_model's category templates (summary_model/utils/model.py).
+# A branch lists one or more summary keys; dict values become child nodes per field,
+# lists become one child per item, and scalars become a single leaf.
+
+MINDMAP_LAYOUTS = {
+    "business": [
+        {"label": "Header", "keys": ["Header"], "icon": "document"},
+        {"label": "Parties Involved", "keys": ["Parties_Involved"], "icon": "people"},
+        {"label": "Clause Insights", "keys": ["Clause_Insights"], "icon": "info"},
+        {"label": "Key Terms", "keys": ["Key_Terms"], "icon": "info"},
+        {"label": "Applicable Laws", "keys": ["Applicable_Laws", "Applicable_Laws_and_Acts"], "icon": "law"},
+        {"label": "Risk & Compliance", "keys": ["Confidence_Score", "Risk_Level", "Risk_and_Compliance"], "icon": "risk_low"},
+        {"label": "Recommendations", "keys": ["Recommendations"], "icon": "recommendation"},
+    ],
+    "citizen": [
+        {"label": "Header", "keys": ["Header"], "icon": "document"},
+        {"label": "Parties Involved", "keys": ["Parties_Involved"], "icon": "people"},
+        {"label": "Key Terms", "keys": ["Key_Terms"], "icon": "info"},
+        {"label": "Rights & Obligations", "keys": ["Rights_and_Obligations"], "icon": "people"},
+        {"label": "Applicable Laws", "keys": ["Applicable_Laws_and_Acts", "Applicable_Laws"], "icon": "law"},
+        {"label": "Validation Status", "keys": ["Validation_Status"], "icon": "check"},
+        {"label": "Risk & Compliance", "keys": ["Confidence_and_Risk_Score", "Risk_and_Compliance"], "icon": "risk_low"},
+        {"label": "Recommendations", "keys": ["Recommendations"], "icon": "recommendation"},
+    ],
+    "student": [
+        {"label": "Header", "keys": ["Header"], "icon": "document"},
+        {"label": "Parties Involved", "keys": ["Parties_Involved"], "icon": "people"},
+        {"label": "Key Terms", "keys": ["Key_Terms"], "icon": "info"},
+        {"label": "Rights and Fairness", "keys": ["Rights_and_Fairness"], "icon": "people"},
+        {"label": "Applicable Laws", "keys": ["Applicable_Laws_and_Acts", "Applicable_Laws"], "icon": "law"},
+        {"label": "Risk & Compliance", "keys": ["Confidence_and_Risk_Score", "Risk_and_Compliance"], "icon": "risk_low"},
+        {"label": "Recommendations", "keys": ["Recommendations"], "icon": "recommendation"},
+    ],
+}
+
+# Summary fields that are not branches: the root node uses them or they repeat other content
+ROOT_SKIP_KEYS = {"Category", "Overview", "Simple_Summary"}
+
+# For a list of objects (clauses, acts, issues...), the first present field names the child
+# node and the first present details field explains it.
+ITEM_LABEL_KEYS = ["Topic", "Act", "Issue", "Name", "Title", "Party", "Clause"]
+ITEM_DETAILS_KEYS = ["Explanation", "Relevance", "Reason", "Recommendation", "Description", "Details"]
+ITEM_SECONDARY_KEYS = ["Section"]
+
+# Icons for leaf fields, matched on words in the field name
+FIELD_ICONS = {
+    "payment": "money", "stipend": "money", "consideration": "money", "fee": "money",
+    "duration": "time", "tenure": "time", "date": "time", "termination": "time",
+    "party": "people", "relationship": "people", "rights": "people",
+    "confidence": "star", "jurisdiction": "law", "act": "law",
+    "issue": "risk_high", "recommendation": "recommendation",
+}
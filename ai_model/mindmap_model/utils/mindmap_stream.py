@@ -0,0 +1,159 @@
+# --- utils/mindmap_stream.py ---
+import json
+from utils.json_repair import parse_tolerant
+
+NODE_FIELDS = ("label", "details", "icon", "status", "secondaryLabel")
+NODE_DEFAULTS = {"details": "N/A", "icon": "info", "status": "info", "secondaryLabel": ""}
+
+
+def _node_fields(data, node_id: str) -> dict | None:
+    """Node with defaults for missing fields, or None when there is no label (e.g. cut off mid-key)."""
+    data = data if isinstance(data, dict) else {}
+    node = {"id": node_id}
+    for field in NODE_FIELDS:
+        value = data.get(field)
+        node[field] = str(value) if value not in (None, "") else NODE_DEFAULTS.get(field, "")
+    if not node["label"]:
+        node["label"] = str(data.get("name") or "")
+    return node if node["label"] else None
+
+
+class NodeStreamParser:
+    """
+    Incremental parser for a mind map JSON tree arriving as LLM token chunks.
+
+    `feed()` returns patches {"parent_id": ..., "node": {...}} for every node whose own fields are
+    complete: at its "children" key when the fields come first (the prompt's order), otherwise when
+    its object closes. Node ids are path-based ('root', 'root-0', 'root-0-1') so they are unique
+    whatever the model writes, and a node is never released before its parent.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.in_string = False
+        self.escape = False
+        self.string_start = None
+        self.last_string = None  # (start, end) of the last completed string
+        self.stack = []          # frames: {"kind", "start", "node_id", "key", "child_count", "emitted"}
+        self.released = set()
+        self.waiting = {}        # parent_id -> patches waiting for their parent
+        self.nodes = {}          # node_id -> node with "children", to rebuild the full tree
+
+    # ------------------- Scanning -------------------
+    def feed(self, text: str) -> list[dict]:
+        self.buffer += text
+        out = []
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            i, ch = self.pos, buffer[self.pos]
+            self.pos += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    self.last_string = (self.string_start, i + 1)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_start = i
+            elif ch == ":" and self.stack and self.stack[-1]["kind"] == "{" and self.last_string:
+                frame = self.stack[-1]
+                try:
+                    frame["key"] = json.loads(buffer[self.last_string[0]:self.last_string[1]])
+                except json.JSONDecodeError:
+                    frame["key"] = None
+                if frame["key"] == "children" and frame["node_id"] and not frame["emitted"]:
+                    # Fields written before "children" are complete; emit if they include the label
+                    fragment = buffer[frame["start"]:self.last_string[0]].rstrip().rstrip(",") + "}"
+                    data = self._parse(fragment)
+                    if isinstance(data, dict) and data.get("label"):
+                        out += self._emit(frame, data)
+            elif ch == "{":
+                node_id = self._child_node_id()
+                self.stack.append({"kind": "{", "start": i, "node_id": node_id, "key": None,
+                                   "child_count": 0, "emitted": False})
+            elif ch == "[":
+                owner = self.stack[-1] if self.stack else None
+                self.stack.append({"kind": "[", "start": i, "node_id": None,
+                                   "key": owner["key"] if owner and owner["kind"] == "{" else None,
+                                   "owner": owner, "child_count": 0, "emitted": False})
+            elif ch in "}]" and self.stack:
+                frame = self.stack.pop()
+                if frame["kind"] == "{" and frame["node_id"] and not frame["emitted"]:
+                    out += self._emit(frame, self._parse(buffer[frame["start"]:i + 1]))
+        return out
+
+    def _child_node_id(self):
+        """Path id for an object that starts here, or None if it is not a mind map node."""
+        if not self.stack:
+            return "root"
+        array = self.stack[-1]
+        owner = array.get("owner")
+        if array["kind"] != "[" or array["key"] != "children" or not owner or not owner["node_id"]:
+            return None
+        node_id = f"{owner['node_id']}-{owner['child_count']}"
+        owner["child_count"] += 1
+        return node_id
+
+    @staticmethod
+    def _parse(fragment: str):
+        try:
+            return parse_tolerant(fragment)[0]
+        except ValueError:
+            return {}
+
+    # ------------------- Emission -------------------
+    def _emit(self, frame, data) -> list[dict]:
+        frame["emitted"] = True
+        node_id = frame["node_id"]
+        parent_id = node_id.rsplit("-", 1)[0] if "-" in node_id else None
+        node = _node_fields(data, node_id)
+        if node is None:
+            return []
+        self.nodes[node_id] = {**node, "children": []}
+        return self._release({"parent_id": parent_id, "node": node})
+
+    def _release(self, patch) -> list[dict]:
+        parent_id = patch["parent_id"]
+        if parent_id is not None and parent_id not in self.released:
+            self.waiting.setdefault(parent_id, []).append(patch)
+            return []
+        out = [patch]
+        self.released.add(patch["node"]["id"])
+        for child in self.waiting.pop(patch["node"]["id"], []):
+            out += self._release(child)
+        return out
+
+    def finish(self) -> list[dict]:
+        """Emit nodes left open by a truncated stream, then anything still waiting on a missing parent."""
+        out = []
+        while self.stack:
+            frame = self.stack.pop()
+            if frame["kind"] == "{" and frame["node_id"] and not frame["emitted"]:
+                out += self._emit(frame, self._parse(self.buffer[frame["start"]:]))
+        for parent_id in list(self.waiting):
+            for patch in self.waiting.pop(parent_id, []):
+                out += self._release({**patch, "parent_id": None})
+        return out
+
+    def tree(self) -> dict | None:
+        """Full hierarchical mind map assembled from the emitted nodes."""
+        for node_id in sorted(self.nodes, key=lambda n: [int(p) for p in n.split("-")[1:]]):
+            if "-" in node_id:
+                parent = self.nodes.get(node_id.rsplit("-", 1)[0])
+                if parent is not None:
+                    parent["children"].append(self.nodes[node_id])
+        return self.nodes.get("root")
+
+
+def tree_patches(node: dict, parent_id: str | None = None) -> list[dict]:
+    """Patches for an already built tree (cache hits and the rule-based builder), parents first."""
+    patches = [{"parent_id": parent_id, "node": {k: v for k, v in node.items() if k != "children"}}]
+    for child in node.get("children", []):
+        patches += tree_patches(child, node["id"])
+    return patches
@@ -5,6 +5,9 @@ import json
 from utils.model import llm, category_templates
 from utils.rag_utils import predict_law_from_doc, verify_laws, build_verified_context
 from utils.indiankanoon_utils import verify_with_indiankanoon
+from utils.structured_output import invoke_structured, structured_output_stats, StructuredOutputError
+from utils.chunking import chunk_text, StreamingChunker
+from pydantic import BaseModel, ConfigDict, RootModel
 import re
 
 app = Flask(__name__)
@@ -48,26 +51,41 @@ def clean_llm_response(text: str) -> str:
     return s
 
 
+class SummaryEnvelope(BaseModel):
+    """Every category template wraps its fields in a top-level 'DocumentSummary' object."""
+    model_config = ConfigDict(extra="allow")
+    DocumentSummary: dict
+
+# The student merge prompt asks for a one-element array, the others for a bare object
+SummaryOutput = RootModel[SummaryEnvelope | list[SummaryEnvelope]]
+
+
+def invoke_summary(prompt, endpoint):
+    """
+    Final summaries are requested in JSON mode (no response schema: each category template
+    defines its own structure) and checked for the DocumentSummary envelope. If the check fails
+    the cleaned raw text is returned as before, and the failure is counted per endpoint.
+    """
+    try:
+        result = invoke_structured(llm, prompt, SummaryOutput, endpoint, send_schema=False)
+        return json.dumps(result.model_dump(), ensure_ascii=False)
+    except StructuredOutputError as e:
+        print(f"⚠️ {e}")
+        return clean_llm_response(e.raw)
+
+
 def detect_language(text):
     """Detect whether the text is Hindi or English based on script characters."""
     
     hindi_chars = re.findall(r'[\u0900-\u097F]', text)
     return "hindi" if len(hindi_chars) > len(text) * 0.2 else "english"
 
-def chunk_text(text, chunk_size=6000, overlap=200):  # Increased chunk size for fewer chunks
-    
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = min(start + chunk_size, len(text))
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
-
+SHORT_DOC_CHARS = 3500  # below this, one verified LLM call instead of chunking
 
 # ---------------------- SINGLE CHUNK SUMMARIZER ----------------------
 def summarize_chunk(i, chunk, total, template_text, lang):
-    
+    # total is None when chunks are cut from a page stream and the final count is not known yet
+    part_label = f"{i}/{total}" if total else f"{i}"
     strict_prompt = f"""
         You are a professional and precise document summarizer trained to produce highly structured, human-readable summaries.
 
@@ -103,7 +121,7 @@ def summarize_chunk(i, chunk, total, template_text, lang):
         FORMAT TO FOLLOW:
         {template_text}
 
-        DOCUMENT TEXT (PART {i}/{total}):
+        DOCUMENT TEXT (PART {part_label}):
         {chunk}
     """
 
@@ -117,82 +135,50 @@ def summarize_chunk(i, chunk, total, template_text, lang):
     response = llm.invoke(strict_prompt)
     return clean_llm_response(response.content)
 
-@app.route("/", methods=["GET"])
-def home():
-    return render_template("index.html")
+# ---------------------- SHORT DOCUMENT SUMMARIZER ----------------------
+def summarize_short(doc_text, template_text, lang, start_total):
+    """Single verified LLM call for documents under SHORT_DOC_CHARS."""
+    predicted_text = predict_law_from_doc(doc_text)
+    predicted_act = predicted_text.split("Act Name:")[-1].split("\n")[0].strip() if "Act Name:" in predicted_text else ""
+    predicted_category = predicted_text.split("Category:")[-1].split("\n")[0].strip() if "Category:" in predicted_text else ""
 
-@app.route("/active", methods=["GET"])
-def active():
-    return "active"
+    future_laws = executor.submit(verify_laws, predicted_act, predicted_category)
+    future_kanoon = executor.submit(verify_with_indiankanoon, predicted_act, predicted_category)
 
-@app.route("/summarize", methods=["POST"])
-def summarize():
-    category = request.form.get("category", "").strip().lower()
-    doc_text = request.form.get("document_text", "").strip()
-    # Normalize whitespace (replace multiple spaces/newlines/tabs with single space)
-    doc_text = re.sub(r"\s+", " ", doc_text)
+    verified_laws = future_laws.result()
+    indiankanoon_cases = future_kanoon.result()
 
-    lang = detect_language(doc_text)
+    verification_status = (
+        " No external verification found — analyzed using Gemini’s internal reasoning."
+        if not verified_laws and not indiankanoon_cases
+        else " Verified using Indian Legal Database (Pinecone + IndianKanoon)"
+    )
 
-    template_text = category_templates.get(category, "{text}")
+    verified_prompt = build_verified_context(doc_text, template_text, predicted_text, verified_laws)
 
-    start_total = time.time()
-    if not doc_text:
-        return jsonify({"error": "Empty document_text"}), 400
-
-    if len(doc_text) < 3500:
-        predicted_text = predict_law_from_doc(doc_text)
-        predicted_act = predicted_text.split("Act Name:")[-1].split("\n")[0].strip() if "Act Name:" in predicted_text else ""
-        predicted_category = predicted_text.split("Category:")[-1].split("\n")[0].strip() if "Category:" in predicted_text else ""
+    if indiankanoon_cases:
+        verified_prompt += "\n\nThird-Party Legal Verification (IndianKanoon):\n"
+        for case in indiankanoon_cases:
+            verified_prompt += f"- {case['title']} ({case['citation']}) → {case['link']}\n"
 
-        future_laws = executor.submit(verify_laws, predicted_act, predicted_category)
-        future_kanoon = executor.submit(verify_with_indiankanoon, predicted_act, predicted_category)
+    verified_prompt += f"\n\nVerification Status: {verification_status}\n"
 
-        verified_laws = future_laws.result()
-        indiankanoon_cases = future_kanoon.result()
-
-        verification_status = (
-            " No external verification found — analyzed using Gemini’s internal reasoning."
-            if not verified_laws and not indiankanoon_cases
-            else " Verified using Indian Legal Database (Pinecone + IndianKanoon)"
+    if lang == "hindi":
+        verified_prompt += (
+            "\nThe input document is in Hindi — output the ENTIRE summary in Hindi.\n"
+            "Translate all headings, labels, and explanatory sentences.\n"
+            "Keep Act names and section numbers in English.\n"
         )
-
-        verified_prompt = build_verified_context(doc_text, template_text, predicted_text, verified_laws)
-
-        if indiankanoon_cases:
-            verified_prompt += "\n\nThird-Party Legal Verification (IndianKanoon):\n"
-            for case in indiankanoon_cases:
-                verified_prompt += f"- {case['title']} ({case['citation']}) → {case['link']}\n"
-
-        verified_prompt += f"\n\nVerification Status: {verification_status}\n"
-
-        if lang == "hindi":
-            verified_prompt += (
-                "\nThe input document is in Hindi — output the ENTIRE summary in Hindi.\n"
-                "Translate all headings, labels, and explanatory sentences.\n"
-                "Keep Act names and section numbers in English.\n"
-            )
-        start_llm = time.time()
-        response = llm.invoke(verified_prompt)
-        summary_text = clean_llm_response(response.content)
-        end_llm = time.time()
-        print(f"[TIMING] Short doc LLM call: {end_llm - start_llm:.2f} seconds")
-        print(f"[TIMING] Total short doc: {end_llm - start_total:.2f} seconds")
-        return summary_text, 200, {'Content-Type': 'application/json; charset=utf-8'}
-
-    start_chunking = time.time()
-    chunks = chunk_text(doc_text)
-    print(f"[TIMING] Number of chunks: {len(chunks)}")
-    start_parallel = time.time()
-    futures = [
-        executor.submit(summarize_chunk, i + 1, chunk, len(chunks), template_text, lang)
-        for i, chunk in enumerate(chunks)
-    ]
-    # Collect results in order for better merging and less overhead
-    summaries = [f.result() for f in futures]
-    end_parallel = time.time()
-    print(f"[TIMING] Parallel chunk summarization: {end_parallel - start_parallel:.2f} seconds")
-
+    start_llm = time.time()
+    summary_text = invoke_summary(verified_prompt, "summarize_short")
+    end_llm = time.time()
+    print(f"[TIMING] Short doc LLM call: {end_llm - start_llm:.2f} seconds")
+    print(f"[TIMING] Total short doc: {end_llm - start_total:.2f} seconds")
+    return summary_text
+
+# ---------------------- MERGE CHUNK SUMMARIES ----------------------
+def merge_summaries(summaries, category, lang, start_total):
+    """Merge part-wise chunk summaries into the final category JSON."""
     combined_summaries = "\n\n".join(summaries)
 
     if category == "student":
@@ -424,16 +410,111 @@ def summarize():
         """
 
     start_merge = time.time()
-    final_response = llm.invoke(merge_prompt)
-    summary_text = clean_llm_response(final_response.content)
+    summary_text = invoke_summary(merge_prompt, "summarize_merge")
     end_merge = time.time()
     end_total = time.time()
     print(f"[TIMING] Merge LLM call: {end_merge - start_merge:.2f} seconds")
     print(f"[TIMING] Total long doc: {end_total - start_total:.2f} seconds")
 
+    return summary_text
+
+@app.route("/", methods=["GET"])
+def home():
+    return render_template("index.html")
+
+@app.route("/active", methods=["GET"])
+def active():
+    return "active"
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "structured_output": structured_output_stats()
+    })
+
+@app.route("/summarize", methods=["POST"])
+def summarize():
+    category = request.form.get("category", "").strip().lower()
+    doc_text = request.form.get("document_text", "").strip()
+    # Normalize whitespace (replace multiple spaces/newlines/tabs with single space)
+    doc_text = re.sub(r"\s+", " ", doc_text)
+
+    lang = detect_language(doc_text)
+
+    template_text = category_templates.get(category, "{text}")
+
+    start_total = time.time()
+    if not doc_text:
+        return jsonify({"error": "Empty document_text"}), 400
+
+    if len(doc_text) < SHORT_DOC_CHARS:
+        summary_text = summarize_short(doc_text, template_text, lang, start_total)
+        return summary_text, 200, {'Content-Type': 'application/json; charset=utf-8'}
+
+    start_chunking = time.time()
+    chunks = chunk_text(doc_text)
+    print(f"[TIMING] Number of chunks: {len(chunks)}")
+    start_parallel = time.time()
+    futures = [
+        executor.submit(summarize_chunk, i + 1, chunk, len(chunks), template_text, lang)
+        for i, chunk in enumerate(chunks)
+    ]
+    # Collect results in order for better merging and less overhead
+    summaries = [f.result() for f in futures]
+    end_parallel = time.time()
+    print(f"[TIMING] Parallel chunk summarization: {end_parallel - start_parallel:.2f} seconds")
+
+    summary_text = merge_summaries(summaries, category, lang, start_total)
     # return summary_text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
     return summary_text, 200, {'Content-Type': 'application/json; charset=utf-8'}
 
+@app.route("/summarize_stream", methods=["POST"])
+def summarize_stream():
+    """
+    Same result as /summarize, but the document arrives as a chunked NDJSON body with one
+    {"text": "..."} line per extracted page. Each chunk is sent for summarization as soon as it is
+    complete, so chunk summaries run while later pages are still being extracted/OCR'd.
+    """
+    category = request.args.get("category", "").strip().lower()
+    template_text = category_templates.get(category, "{text}")
+    start_total = time.time()
+
+    chunker = StreamingChunker()
+    futures = []
+    lang = None
+
+    def submit(chunk):
+        nonlocal lang
+        # Language is decided on the first chunk; later chunks follow it
+        lang = lang or detect_language(chunk)
+        futures.append(executor.submit(summarize_chunk, len(futures) + 1, chunk, None, template_text, lang))
+
+    for line in request.stream:
+        if not line.strip():
+            continue
+        page_text = re.sub(r"\s+", " ", json.loads(line).get("text", "")).strip()
+        if not page_text:
+            continue
+        for chunk in chunker.feed(" " + page_text if chunker.total_chars else page_text):
+            submit(chunk)
+
+    if not futures and chunker.total_chars < SHORT_DOC_CHARS:
+        doc_text = chunker.buffer
+        if not doc_text:
+            return jsonify({"error": "Empty document_text"}), 400
+        summary_text = summarize_short(doc_text, template_text, detect_language(doc_text), start_total)
+        return summary_text, 200, {'Content-Type': 'application/json; charset=utf-8'}
+
+    for chunk in chunker.flush():
+        submit(chunk)
+    print(f"[TIMING] Stream received ({len(futures)} chunks): {time.time() - start_total:.2f} seconds")
+
+    summaries = [f.result() for f in futures]
+    print(f"[TIMING] Streamed chunk summarization: {time.time() - start_total:.2f} seconds")
+
+    summary_text = merge_summaries(summaries, category, lang, start_total)
+    return summary_text, 200, {'Content-Type': 'application/json; charset=utf-8'}
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8080"))
     app.run(host="0.0.0.0", port=port, threaded=True)
\ No newline at end of file
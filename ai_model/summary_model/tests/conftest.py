@@ -0,0 +1,5 @@
+# Tests import service modules the way app.py does (`from utils.x import y`)
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+import random
+import pytest
+from utils.chunking import chunk_text, StreamingChunker
+
+
+def streamed_chunks(pieces, chunk_size, overlap):
+    chunker = StreamingChunker(chunk_size, overlap)
+    chunks = []
+    for piece in pieces:
+        chunks += chunker.feed(piece)
+    return chunks + chunker.flush(), chunker
+
+
+@pytest.mark.parametrize("length", [0, 1, 99, 100, 101, 180, 181, 1000, 1234])
+def test_streamed_chunks_match_chunk_text(length):
+    text = "".join(random.Random(length).choice("abcdefgh ") for _ in range(length))
+    rng = random.Random(length + 1)
+    pieces, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 250)
+        pieces.append(text[i:i + size])
+        i += size
+    chunks, chunker = streamed_chunks(pieces, chunk_size=100, overlap=20)
+    assert chunks == chunk_text(text, chunk_size=100, overlap=20)
+    assert chunker.total_chars == length
+
+
+def test_chunks_are_released_as_soon_as_complete():
+    chunker = StreamingChunker(chunk_size=10, overlap=2)
+    assert chunker.feed("a" * 9) == []
+    assert chunker.feed("b") == ["a" * 9 + "b"]
+    assert chunker.feed("c" * 8) == ["ab" + "c" * 8]
+
+
+def test_overlap_is_repeated_between_chunks():
+    chunks, _ = streamed_chunks(["0123456789abcdef"], chunk_size=10, overlap=3)
+    # Like chunk_text(), a chunk starts every chunk_size - overlap characters, so the tail repeats
+    assert chunks == ["0123456789", "789abcdef", "ef"] == chunk_text("0123456789abcdef", 10, 3)
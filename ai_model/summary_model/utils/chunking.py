@@ -0,0 +1,39 @@
+# --- utils/chunking.py ---
+
+
+def chunk_text(text, chunk_size=6000, overlap=200):  # Increased chunk size for fewer chunks
+    
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        chunks.append(text[start:end])
+        start += chunk_size - overlap
+    return chunks
+
+
+class StreamingChunker:
+    """
+    Cuts the same chunks as chunk_text() from text that arrives piece by piece,
+    so each chunk can be summarized as soon as it is complete.
+    """
+
+    def __init__(self, chunk_size=6000, overlap=200):
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.buffer = ""
+        self.total_chars = 0
+
+    def feed(self, text):
+        """Add text and return every chunk that is now complete."""
+        self.buffer += text
+        self.total_chars += len(text)
+        chunks = []
+        while len(self.buffer) >= self.chunk_size:
+            chunks.append(self.buffer[:self.chunk_size])
+            self.buffer = self.buffer[self.chunk_size - self.overlap:]
+        return chunks
+
+    def flush(self):
+        """Return the trailing chunk(s) once the stream ends, exactly as chunk_text() would cut them."""
+        return chunk_text(self.buffer, self.chunk_size, self.overlap)
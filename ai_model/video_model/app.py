@@ -11,9 +11,15 @@ import vertexai
 from langchain_google_vertexai import ChatVertexAI, HarmBlockThreshold, HarmCategory
 from requests.exceptions import RequestException
 from utils.script import create_script_and_image_prompts, generate_script_and_image_prompts
-from utils.image_generation import generate_images_for_prompts
-from utils.audio_generation import generate_tts_audio_with_timing
-from utils.video_generation import build_video_from_pipeline_output
+from utils.image_generation import generate_images_for_prompts, pexels_client, image_fetch_stats
+from utils.image_assets import image_asset_store
+from utils.audio_generation import generate_tts_audio_with_timing, tts_stats
+from utils.video_generation import build_video_from_pipeline_output, upload_video_to_gcs, cleanup_render_inputs
+from utils.pipeline_dag import PipelineDAG, StageFailed, record_run, pipeline_stats
+from utils.video_jobs import video_jobs, render_slots
+from utils.text_layers import text_layer_cache
+from utils.render_profiles import get_profile, render_profile_stats
+from utils.structured_output import structured_output_stats
 
 # from utils.image_generation import generate_images_for_prompts
 load_dotenv()
@@ -52,39 +58,130 @@ app = Flask(__name__)
 
 
 # Video Generation Pipeline
-def generate_video_pipeline(summary_text, language="en", category="business"):
-    print("Script Parts: ", language, category)
-    script_parts, image_prompts, ssml_text = generate_script_and_image_prompts(summary_text, language, category)
-    print("Script Parts: ", ssml_text)
-    audio_filepath, mark_timings = None, None
-    if ssml_text:
-
+def build_video_dag(language="en", keep_inputs=False, profile=None, image_deadline=None):
+    """
+    script -> (audio, images) -> render -> upload
+    TTS and image generation only depend on the script, so they run concurrently.
+    keep_inputs: keep audio/images when the render fails so a job retry can reuse them.
+    profile: render profile name (draft / standard / high).
+    image_deadline: seconds to wait for images before falling back (default IMAGE_DEADLINE_SECONDS).
+    """
+    def script_stage(summary_text, category):
+        script_parts, image_prompts, ssml_text = generate_script_and_image_prompts(summary_text, language, category)
+        if not ssml_text:
+            raise StageFailed("Script generation failed, cannot generate audio.")
+        return {"script_parts": script_parts, "image_prompts": image_prompts, "ssml_text": ssml_text}
+
+    def audio_stage(script):
         audio_filepath, mark_timings = generate_tts_audio_with_timing(
-            script_text=ssml_text,
+            script_text=script["ssml_text"],
             language_code=language
         )
-    else:
-        logging.error("Script generation failed, cannot generate audio.")
-
-    use_ai_flags = [True] * len(image_prompts)  # For simplicity, use AI for all prompts
-    graphic_filepaths = generate_images_for_prompts(
-        image_prompts=image_prompts,
-        use_ai_flags=use_ai_flags,
-        language=language
-    )
+        if not audio_filepath:
+            raise StageFailed("TTS generation failed.")
+        return {"audio_filepath": audio_filepath, "mark_timings": mark_timings}
+
+    def images_stage(script):
+        image_prompts = script["image_prompts"]
+        use_ai_flags = [True] * len(image_prompts)  # For simplicity, use AI for all prompts
+        return generate_images_for_prompts(
+            image_prompts=image_prompts,
+            use_ai_flags=use_ai_flags,
+            language=language,
+            deadline_seconds=image_deadline
+        )
 
-    pipeline_input = {
-        "audio_filepath": audio_filepath,
-        "graphic_filepaths": graphic_filepaths,
-        "script_parts_text": script_parts,
-        "mark_timings": mark_timings
-    }
-    video_path = build_video_from_pipeline_output(pipeline_input)
+    def render_stage(script, audio, images):
+        pipeline_input = {
+            "audio_filepath": audio["audio_filepath"],
+            "graphic_filepaths": images,
+            "script_parts_text": script["script_parts"],
+            "mark_timings": audio["mark_timings"]
+        }
+        report = {}
+        with render_slots:
+            video_path = build_video_from_pipeline_output(
+                pipeline_input, upload=False, cleanup_inputs=not keep_inputs, profile=profile, report=report
+            )
+        if not video_path:
+            raise StageFailed("Video render failed.")
+        if keep_inputs:
+            cleanup_render_inputs(images, audio["audio_filepath"])
+        return {"video_path": video_path, "report": report}
+
+    def upload_stage(render):
+        video_path = render["video_path"]
+        gcs_url = upload_video_to_gcs(video_path, os.path.basename(video_path))
+        if not gcs_url:
+            logging.error("Video upload to GCS failed; returning the local file.")
+            return video_path
+        try:
+            os.remove(video_path)
+        except OSError:
+            pass
+        return gcs_url
+
+    dag = PipelineDAG(max_workers=4)
+    dag.add("script", script_stage, ["summary_text", "category"])
+    dag.add("audio", audio_stage, ["script"])
+    dag.add("images", images_stage, ["script"])
+    dag.add("render", render_stage, ["script", "audio", "images"])
+    dag.add("upload", upload_stage, ["render"])
+    return dag
+
+def generate_video_pipeline(summary_text, language="en", category="business", profile=None, image_deadline=None):
+    print("Script Parts: ", language, category)
+    dag = build_video_dag(language, profile=profile, image_deadline=image_deadline)
+    results, timings = dag.run(initial={"summary_text": summary_text, "category": category})
+    record_run(timings)
+    print("[TIMING] Video pipeline: " + ", ".join(
+        f"{name} {timing['seconds']:.2f}s" for name, timing in timings.items() if not timing.get("resumed")))
 
     return {
-        'video_path': video_path
+        'video_path': results.get("upload"),
+        'render': (results.get("render") or {}).get("report"),
+        'timings': timings
     }
 
+def resumable_checkpoint(checkpoint):
+    """Drop checkpointed stages whose local files are gone (and the stages built on them)."""
+    checkpoint = dict(checkpoint)
+    if "upload" in checkpoint:
+        return checkpoint
+    if "render" in checkpoint:
+        if os.path.exists(checkpoint["render"]["video_path"]):
+            return checkpoint  # audio/images were consumed by the render
+        del checkpoint["render"]
+    audio = checkpoint.get("audio")
+    if audio and not os.path.exists(audio["audio_filepath"]):
+        del checkpoint["audio"]
+    images = checkpoint.get("images")
+    if images is not None and not all(os.path.exists(p) for p in images if p):
+        del checkpoint["images"]
+    return checkpoint
+
+def run_video_job(params, checkpoint, on_stage, cancel_event):
+    dag = build_video_dag(params.get("language", "en"), keep_inputs=True, profile=params.get("profile"),
+                          image_deadline=params.get("image_deadline_seconds"))
+    initial = {"summary_text": params["summary_text"], "category": params["category"], **checkpoint}
+    results, timings = dag.run(initial=initial, on_stage=on_stage, cancel_event=cancel_event)
+    record_run(timings)
+    return results, timings
+
+video_jobs.start(run_video_job, resumable_checkpoint)
+
+def parse_deadline(value):
+    """Optional deadline in seconds from a request field; None keeps the configured default."""
+    if value in (None, ""):
+        return None
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid deadline '{value}', expected a number of seconds")
+    if seconds < 0:
+        raise ValueError("Deadline must not be negative")
+    return seconds
+
 # --- Flask API Router ---
 
 @app.route("/health", methods=["GET"])
@@ -96,18 +193,70 @@ def uploads():
     category = request.form.get("category")
     summary_text = request.form.get("summary_text")
     language = request.form.get("language", "en")
+    profile = request.form.get("profile")  # draft | standard | high
 
     if not summary_text or not category or not language:
         return jsonify({
             "error": "Missing summary_text, category, or language"
         }), 400
-    
+    try:
+        get_profile(profile)
+        image_deadline = parse_deadline(request.form.get("image_deadline_seconds"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Call your existing function
-    result = generate_video_pipeline(summary_text, language, category)
+    result = generate_video_pipeline(summary_text, language, category, profile, image_deadline)
 
     # Return JSON directly
     return jsonify(result)
 
+# --- Video Jobs: submit / poll / cancel / retry ---
+@app.route('/video_jobs', methods=['POST'])
+def submit_video_job():
+    data = request.get_json(silent=True) or request.form
+    category = data.get("category")
+    summary_text = data.get("summary_text")
+    language = data.get("language", "en")
+    profile = data.get("profile")
+
+    if not summary_text or not category or not language:
+        return jsonify({
+            "error": "Missing summary_text, category, or language"
+        }), 400
+    try:
+        profile = get_profile(profile)["name"]
+        image_deadline = parse_deadline(data.get("image_deadline_seconds"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job = video_jobs.submit({"summary_text": summary_text, "category": category, "language": language,
+                             "profile": profile, "image_deadline_seconds": image_deadline})
+    return jsonify(job), 202
+
+@app.route('/video_jobs/<job_id>', methods=['GET'])
+def get_video_job(job_id):
+    job = video_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/video_jobs/<job_id>/cancel', methods=['POST'])
+def cancel_video_job(job_id):
+    job = video_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/video_jobs/<job_id>/retry', methods=['POST'])
+def retry_video_job(job_id):
+    job = video_jobs.retry(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] != "queued":
+        return jsonify({"error": f"Only failed, cancelled or stalled running jobs can be retried (status: {job['status']})"}), 409
+    return jsonify(job), 202
+
 @app.route('/generate_script', methods=['POST'])
 def generate_script_api():
     category = request.form.get("category")
@@ -144,13 +293,18 @@ def generate_images_api():
          return jsonify({"error": "image_queries must contain only strings."}), 400
     if not all(isinstance(f, bool) for f in use_ai_flags):
          return jsonify({"error": "use_ai_flags must contain only booleans."}), 400
+    try:
+        deadline_seconds = parse_deadline(data.get("deadline_seconds"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
         # Call the main orchestrator function
     result_paths = generate_images_for_prompts(
         image_prompts=image_prompts,
         use_ai_flags=use_ai_flags,
         language=language,
-        fallback_image_path=fallback_img_path
+        fallback_image_path=fallback_img_path,
+        deadline_seconds=deadline_seconds
     )
 
     # Return the full list including None/fallbacks
@@ -182,6 +336,17 @@ def generate_video_api():
     part_timings = data.get("mark_timings")
     font_path = data.get("font_path", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
     base_output_path = data.get("output_path", "output_video.mp4")
+    engine = data.get("engine")  # "moviepy" | "ffmpeg"; default VIDEO_RENDER_ENGINE
+    if engine not in (None, "moviepy", "ffmpeg"):
+        return jsonify({"error": "engine must be 'moviepy' or 'ffmpeg'"}), 400
+    segment_workers = data.get("segment_workers")  # processes for segment-parallel rendering; default VIDEO_SEGMENT_WORKERS
+    if segment_workers is not None and (not isinstance(segment_workers, int) or segment_workers < 0):
+        return jsonify({"error": "segment_workers must be a non-negative integer"}), 400
+    profile = data.get("profile")  # draft | standard | high
+    try:
+        get_profile(profile)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     # Validate required fields
     if not audio_filepath or not graphic_filepaths or not script_parts_text:
@@ -193,14 +358,31 @@ def generate_video_api():
         "script_parts_text": script_parts_text,
         "mark_timings": part_timings
     }
-    video_path = build_video_from_pipeline_output(
-        pipeline_input,
-        font_path=font_path,
-        base_output_path=base_output_path
-    )
+    report = {}
+    # Same render bound as the job pipeline; the upload happens after the slot is released
+    with render_slots:
+        video_path = build_video_from_pipeline_output(
+            pipeline_input,
+            font_path=font_path,
+            base_output_path=base_output_path,
+            upload=False,
+            engine=engine,
+            segment_workers=segment_workers,
+            profile=profile,
+            report=report
+        )
 
     if video_path:
-        return jsonify({"video_path": video_path})
+        gcs_url = upload_video_to_gcs(video_path, os.path.basename(video_path))
+        if gcs_url:
+            try:
+                os.remove(video_path)
+            except OSError:
+                pass
+            video_path = gcs_url
+        else:
+            logging.error("Video upload to GCS failed; returning the local file.")
+        return jsonify({"video_path": video_path, "render": report})
     else:
         return jsonify({"error": "Video generation failed"}), 500
 
@@ -208,6 +390,20 @@ def generate_video_api():
 def active():
     return jsonify({"status": "active"})
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "structured_output": structured_output_stats(),
+        "pipeline": pipeline_stats(),
+        "jobs": video_jobs.stats(),
+        "text_layers": text_layer_cache.stats(),
+        "render_profiles": render_profile_stats(),
+        "image_assets": image_asset_store.stats(),
+        "stock_images": pexels_client.stats(),
+        "image_fetch": image_fetch_stats(),
+        "tts": tts_stats()
+    })
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", "8080"))
     app.run(host="0.0.0.0", port=port, threaded=True)
\ No newline at end of file
@@ -0,0 +1,78 @@
+# --- image_normalize_benchmark.py ---
+# Measures what the one-time image normalization stage saves: per-frame render cost and peak
+# memory with the raw 2K graphics vs. graphics pre-resized to their on-screen box, for both
+# render engines. Every variant runs in a fresh child process so peak RSS is not shared.
+#
+# Usage: python image_normalize_benchmark.py [parts] [seconds]
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import tempfile
+import subprocess
+from render_benchmark import make_inputs, CAPTION
+
+FPS = 24
+
+
+def child(engine, normalize, workdir, parts, seconds):
+    from utils.video_generation import assemble_video_with_titles
+    images = sorted(os.path.join(workdir, n) for n in os.listdir(workdir) if n.startswith("graphic_"))
+    audio = os.path.join(workdir, "narration.mp3")
+    marks = [(f"part_{i}_end", seconds * (i + 1) / parts) for i in range(parts)]
+
+    start = time.time()
+    output = assemble_video_with_titles(
+        graphic_filepaths=images, audio_filepath=audio, script_parts_text=[CAPTION] * parts,
+        part_timings=marks, base_output_path=os.path.join(workdir, "bench.mp4"),
+        upload=False, cleanup_inputs=False, engine=engine, segment_workers=0, normalize_images=normalize,
+    )
+    wall = time.time() - start
+    if not output:
+        raise RuntimeError(f"{engine} render failed")
+    os.remove(output)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps({"wall": wall, "frames": seconds * FPS, "peak_mb": own, "ffmpeg_peak_mb": children}))
+
+
+def main(parts, seconds):
+    workdir = tempfile.mkdtemp(prefix="normalize_bench_")
+    try:
+        make_inputs(workdir, parts, seconds)
+        results = {}
+        for engine in ("moviepy", "ffmpeg"):
+            for normalize in (False, True):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", engine, str(int(normalize)), workdir, str(parts), str(seconds)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results[(engine, normalize)] = result
+                print(f"{engine:8s} {'normalized' if normalize else 'raw 2K':10s}: "
+                      f"{1000 * result['wall'] / result['frames']:.1f} ms/frame, {result['wall']:.2f}s, "
+                      f"peak {result['peak_mb']:.0f} MB (python) / {result['ffmpeg_peak_mb']:.0f} MB (ffmpeg)")
+
+        print("-" * 80)
+        print(f"Timeline            : {parts} parts of 2048x2048 graphics, {seconds}s at {FPS} fps")
+        for engine in ("moviepy", "ffmpeg"):
+            raw, norm = results[(engine, False)], results[(engine, True)]
+            print(f"{engine:8s} per frame   : {1000 * raw['wall'] / raw['frames']:.1f} -> "
+                  f"{1000 * norm['wall'] / norm['frames']:.1f} ms")
+            print(f"{engine:8s} peak memory : {max(raw['peak_mb'], raw['ffmpeg_peak_mb']):.0f} -> "
+                  f"{max(norm['peak_mb'], norm['ffmpeg_peak_mb']):.0f} MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 7 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3] == "1", sys.argv[4], int(sys.argv[5]), int(sys.argv[6]))
+    elif len(sys.argv) <= 3:
+        args = [int(a) for a in sys.argv[1:]]
+        main(*(args + [5, 30][len(args):]))
+    else:
+        print("Usage: python image_normalize_benchmark.py [parts] [seconds]")
+        sys.exit(1)
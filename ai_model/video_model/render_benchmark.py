@@ -0,0 +1,98 @@
+# --- render_benchmark.py ---
+# Renders the same synthetic timeline (2K images like Imagen returns, title cards, captions,
+# fades, TTS-length audio) with the MoviePy compositor and the ffmpeg filtergraph renderer,
+# each in one pass and segment-parallel (one process per part), and reports wall time,
+# CPU time (this process + children) and output size per mode.
+#
+# Usage: python render_benchmark.py [parts] [seconds] [runs] [segment_workers]
+import os
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import subprocess
+from PIL import Image, ImageDraw
+from utils.ffmpeg_render import FFMPEG_BINARY
+from utils.video_generation import assemble_video_with_titles
+
+CAPTION = ("Under the Rent Control Act, the tenant must receive written notice "
+           "at least thirty days before the landlord can end the agreement.")
+
+
+def make_inputs(workdir, parts, seconds):
+    images = []
+    for i in range(parts):
+        path = os.path.join(workdir, f"graphic_{i}.png")
+        image = Image.new("RGB", (2048, 2048), (40 * i % 255, 90, 160))
+        draw = ImageDraw.Draw(image)
+        for y in range(0, 2048, 64):
+            draw.line([(0, y), (2048, 2048 - y)], fill=(255, 255 - y // 8, 60), width=12)
+        image.save(path)
+        images.append(path)
+
+    audio = os.path.join(workdir, "narration.mp3")
+    subprocess.run([FFMPEG_BINARY, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"sine=frequency=220:duration={seconds}", "-ac", "1", audio], check=True)
+    marks = [(f"part_{i}_end", seconds * (i + 1) / parts) for i in range(parts)]
+    return images, audio, marks
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def render(engine, workers, images, audio, marks, workdir):
+    start_wall, start_cpu = time.time(), cpu_seconds()
+    output = assemble_video_with_titles(
+        graphic_filepaths=list(images),
+        audio_filepath=audio,
+        script_parts_text=[CAPTION] * len(images),
+        part_timings=marks,
+        base_output_path=os.path.join(workdir, f"bench_{engine}.mp4"),
+        upload=False,
+        cleanup_inputs=False,
+        engine=engine,
+        segment_workers=workers,
+    )
+    wall, cpu = time.time() - start_wall, cpu_seconds() - start_cpu
+    if not output:
+        raise RuntimeError(f"{engine} render failed")
+    size = os.path.getsize(output)
+    os.remove(output)
+    return wall, cpu, size
+
+
+def main(parts, seconds, runs, workers):
+    workdir = tempfile.mkdtemp(prefix="render_bench_")
+    try:
+        images, audio, marks = make_inputs(workdir, parts, seconds)
+        results = {}
+        for engine in ("moviepy", "ffmpeg"):
+            for mode_workers in (0, workers):
+                mode = f"{engine}" + (f"+{mode_workers}seg" if mode_workers > 1 else "")
+                if mode in results:
+                    continue
+                rows = [render(engine, mode_workers, images, audio, marks, workdir) for _ in range(runs)]
+                results[mode] = [sum(r[k] for r in rows) / runs for k in range(3)]
+                print(f"{mode:14s}: {results[mode][0]:.2f}s wall, {results[mode][1]:.2f}s CPU, "
+                      f"{results[mode][2] / 1e6:.2f} MB")
+
+        baseline = results["moviepy"]
+        print("-" * 80)
+        print(f"Timeline            : {parts} parts, {seconds}s, {runs} run(s) per mode, {os.cpu_count()} CPUs")
+        for mode, (wall, cpu, _) in results.items():
+            print(f"{mode:20s}: {wall:.2f}s wall ({baseline[0] / wall:.1f}x), {cpu:.2f}s CPU, "
+                  f"realtime factor {seconds / wall:.1f}x")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 5:
+        print("Usage: python render_benchmark.py [parts] [seconds] [runs] [segment_workers]")
+        sys.exit(1)
+    args = [int(a) for a in sys.argv[1:]]
+    main(*(args + [5, 60, 1, os.cpu_count() or 1][len(args):]))
@@ -0,0 +1,9 @@
+# Tests import service modules the way app.py does (`from utils.x import y`)
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# utils/video_jobs.py opens its queue at import; keep it out of the source tree
+os.environ.setdefault("VIDEO_JOBS_DIR", tempfile.mkdtemp(prefix="video_jobs_test_"))
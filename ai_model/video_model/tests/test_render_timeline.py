@@ -0,0 +1,75 @@
+import shutil
+import pytest
+from PIL import Image
+from utils.render_timeline import CAPTION_TOP_RATIO, build_timeline, part_end_times, text_position
+from utils.ffmpeg_render import FFMPEG_BINARY, build_ffmpeg_command, render_timeline_ffmpeg
+
+
+@pytest.fixture
+def graphics(tmp_path):
+    paths = []
+    for i, color in enumerate(("red", "blue")):
+        path = tmp_path / f"graphic_{i}.png"
+        Image.new("RGB", (64, 48), color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def test_part_end_times_from_marks_or_even_split():
+    parts = ["a", "b", "c"]
+    assert part_end_times(parts, [("part_0_end", 3.0), ("part_2_end", 9.5)], 12.0) == [3.0, None, 9.5]
+    assert part_end_times(parts, None, 12.0) == [4.0, 8.0, 12.0]
+
+
+def test_build_timeline_layers(graphics):
+    layers = build_timeline(graphics, ["first", "second"], [("part_0_end", 5.0), ("part_1_end", 9.0)], 10.0)
+    assert [(l["kind"], l["part"]) for l in layers] == [
+        ("title", 0), ("graphic", 0), ("caption", 0), ("title", 1), ("graphic", 1), ("caption", 1)]
+    title, backdrop, caption, title_2, graphic_2, caption_2 = layers
+    assert (title["start"], title["duration"], title["text"]) == (0.0, 2.0, "Part 1")
+    # The first graphic is the backdrop for the rest of the video
+    assert (backdrop["start"], backdrop["duration"]) == (2.0, 8.0)
+    assert (caption["start"], caption["duration"], caption["text"]) == (2.0, 3.0, "first")
+    assert title_2["start"] == 5.0
+    assert (graphic_2["start"], graphic_2["duration"]) == (7.0, 2.0)
+    # A missing end mark runs the last part to the end of the audio
+    layers = build_timeline(graphics, ["first", "second"], [("part_0_end", 5.0)], 10.0)
+    assert layers[-1]["duration"] == 3.0
+
+
+def test_missing_graphics_are_left_out(graphics, tmp_path):
+    layers = build_timeline([str(tmp_path / "gone.png")], ["first", "second"], None, 8.0)
+    assert [l["kind"] for l in layers] == ["title", "caption", "title", "caption"]
+
+
+def test_text_position():
+    assert text_position("title", (200, 100), (1280, 720)) == (540, 310)
+    assert text_position("caption", (200, 100), (1280, 720)) == (540, int(720 * CAPTION_TOP_RATIO))
+    assert text_position("caption", (200, 300), (1280, 720)) == (540, 420)  # moved up to fit
+
+
+def test_ffmpeg_command_has_one_input_and_overlay_per_layer(graphics):
+    layers = build_timeline(graphics, ["first", "second"], None, 6.0, title_duration=1.0)
+    layers = [l for l in layers if l["kind"] == "graphic"]
+    args = build_ffmpeg_command(layers, "speech.mp3", 6.0, "out.mp4", size=(320, 180), fps=10)
+    graph = args[args.index("-filter_complex") + 1]
+    assert args.count("-i") == 2 + len(layers)  # background, audio, one per layer
+    assert graph.count("overlay=") == len(layers)
+    assert graph.endswith("[vout]")
+    assert args[-1] == "out.mp4" and "-an" not in args
+
+    silent = build_ffmpeg_command(layers, None, 6.0, "out.mp4", size=(320, 180), fps=10)
+    assert "-an" in silent and "1:a" not in silent
+
+
+@pytest.mark.skipif(shutil.which(FFMPEG_BINARY) is None, reason="ffmpeg is not installed")
+def test_render_timeline_ffmpeg_writes_a_video(graphics, tmp_path):
+    caption = tmp_path / "caption.png"
+    Image.new("RGBA", (120, 20), (0, 0, 0, 200)).save(caption)
+    layers = [l for l in build_timeline(graphics, ["first", "second"], None, 2.0, title_duration=0.5)
+              if l["kind"] == "graphic"]
+    layers.append({"kind": "caption", "part": 0, "start": 0.5, "duration": 1.0,
+                   "path": str(caption), "size": (120, 20)})
+    output = tmp_path / "out.mp4"
+    render_timeline_ffmpeg(layers, None, 2.0, str(output), size=(160, 90), fps=10, preset="ultrafast")
+    assert output.stat().st_size > 0
@@ -0,0 +1,133 @@
+import time
+import sqlite3
+import threading
+import pytest
+from utils.video_jobs import VideoJobQueue, VIDEO_STAGES
+
+
+def expire_lease(queue, job_id):
+    with queue._lock:
+        queue._conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ?", (time.time() - 1, job_id))
+        queue._conn.commit()
+
+
+def recover(queue):
+    with queue._lock:
+        queue._recover_locked()
+
+
+def finished_runner(params, checkpoint, on_stage, cancel_event):
+    timings = {}
+    for name in VIDEO_STAGES:
+        if name in checkpoint:
+            continue
+        on_stage(name, "running")
+        on_stage(name, "done", {"stage": name})
+        timings[name] = {"status": "done", "seconds": 0.0}
+    return {"upload": "https://videos/out.mp4"}, timings
+
+
+def wait_for(queue, job_id, status, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    pytest.fail(f"job stayed {queue.get(job_id)['status']}, expected {status}")
+
+
+def test_live_lease_is_not_recovered_by_another_process(tmp_path):
+    owner = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    other = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    job = owner.submit({"summary_text": "x"})
+    assert owner._claim()["id"] == job["id"]
+
+    recover(other)
+    assert other.get(job["id"])["status"] == "running"
+    assert other._claim() is None
+
+
+def test_expired_lease_is_requeued(tmp_path):
+    owner = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    other = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    job = owner.submit({})
+    owner._claim()
+
+    expire_lease(owner, job["id"])
+    claimed = other._claim()  # claiming recovers first
+    assert claimed["id"] == job["id"]
+    assert claimed["attempts"] == 2
+    assert other.recovered == 1
+
+
+def test_heartbeat_renews_the_lease(tmp_path):
+    queue = VideoJobQueue(str(tmp_path), workers=0, lease_seconds=0.2)
+    job = queue.submit({})
+    queue._claim()
+    threading.Thread(target=queue._heartbeat, daemon=True).start()
+    time.sleep(0.5)  # longer than the lease, renewed every 0.05s
+    recover(queue)
+    assert queue.get(job["id"])["status"] == "running"
+
+
+def test_rows_without_a_lease_are_requeued(tmp_path):
+    queue = VideoJobQueue(str(tmp_path), workers=1)
+    job = queue.submit({})
+    with queue._lock:
+        queue._conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (job["id"],))
+        queue._conn.commit()
+    recover(queue)
+    assert queue.get(job["id"])["status"] == "queued"
+
+
+def test_retry_only_takes_stalled_running_jobs(tmp_path):
+    queue = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    job = queue.submit({})
+    queue._claim()
+    assert queue.retry(job["id"])["status"] == "running"
+    expire_lease(queue, job["id"])
+    assert queue.retry(job["id"])["status"] == "queued"
+
+
+def test_worker_that_lost_its_lease_does_not_overwrite_the_job(tmp_path):
+    owner = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    other = VideoJobQueue(str(tmp_path), workers=1, lease_seconds=60)
+    job = owner.submit({})
+    owner._runner = finished_runner
+    claimed = owner._claim()
+
+    expire_lease(owner, job["id"])
+    assert other._claim()["id"] == job["id"]
+
+    owner._run(claimed)  # stops at its first stage and its result is discarded
+    assert owner.completed == owner.cancelled == owner.failed == 0
+    row = other.get(job["id"])
+    assert row["status"] == "running" and row["progress"] == 0
+
+
+def test_jobs_run_to_completion(tmp_path):
+    queue = VideoJobQueue(str(tmp_path), workers=1, poll_seconds=0.05)
+    queue.start(finished_runner)
+    job = wait_for(queue, queue.submit({})["id"], "done")
+    assert job["progress"] == 1.0
+    assert job["video_path"] == "https://videos/out.mp4"
+    assert queue.stats()["completed"] == 1
+
+
+def test_job_files_from_before_leases_are_migrated(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "video_jobs.sqlite3"))
+    conn.execute(
+        "CREATE TABLE jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, params TEXT NOT NULL, stages TEXT NOT NULL,"
+        " checkpoint TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0,"
+        " cancel_requested INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO jobs (id, status, params, stages, checkpoint, created_at, updated_at) "
+                 "VALUES ('old', 'running', '{}', '{}', '{\"script\": 1}', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    queue = VideoJobQueue(str(tmp_path), workers=1)
+    recover(queue)
+    claimed = queue._claim()
+    assert claimed["id"] == "old" and claimed["checkpoint"] == {"script": 1}
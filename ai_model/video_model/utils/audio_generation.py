@@ -9,6 +9,10 @@ import requests # Use requests library for direct API calls
 import json
 import base64
 import shutil
+import time
+import threading
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
 from google.auth.transport.requests import Request
 from google.oauth2 import service_account # For authentication
 from requests.exceptions import HTTPError, RequestException
@@ -32,6 +36,93 @@ if SERVICE_ACCOUNT_FILE and os.path.exists(SERVICE_ACCOUNT_FILE):
 else:
     logging.critical(f"FATAL: SERVICE_ACCOUNT_CREDENTIALS env var not set or file does not exist at path: {SERVICE_ACCOUNT_FILE}")
 
+TTS_REST_API_URL = "https://texttospeech.googleapis.com/v1beta1/text:synthesize"
+# Tokens are refreshed in the background once less than this is left (Google tokens live ~1h)
+TTS_TOKEN_REFRESH_MARGIN_SECONDS = int(os.getenv("TTS_TOKEN_REFRESH_MARGIN_SECONDS", "300"))
+TTS_POOL_SIZE = int(os.getenv("TTS_POOL_SIZE", "4"))
+
+# One keep-alive session for the token endpoint and texttospeech.googleapis.com
+tts_session = requests.Session()
+tts_session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=TTS_POOL_SIZE))
+
+
+# ------------------- Access token cache -------------------
+class CachedToken:
+    """
+    Access token for `creds`, refreshed only when it is about to expire. Inside the refresh
+    margin the current (still valid) token is returned and one background thread renews it, so
+    a TTS call only blocks on the token endpoint for the very first token or after a long idle.
+    """
+
+    def __init__(self, creds, session, refresh_margin_seconds: int = TTS_TOKEN_REFRESH_MARGIN_SECONDS):
+        self.creds = creds
+        self.request = Request(session=session)
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.sync_refreshes = 0
+        self.background_refreshes = 0
+
+    def _seconds_left(self) -> float:
+        if not self.creds.token or not self.creds.expiry:
+            return 0.0
+        return (self.creds.expiry - datetime.now(timezone.utc).replace(tzinfo=None)).total_seconds()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._lock:
+                if self._seconds_left() > self.refresh_margin_seconds:
+                    return
+                self.creds.refresh(self.request)
+                self.background_refreshes += 1
+        except Exception as e:
+            logging.warning(f"Background token refresh failed, will retry on next call: {e}")
+        finally:
+            self._refreshing = False
+
+    def get(self, force_refresh: bool = False) -> str:
+        left = self._seconds_left()
+        if force_refresh or left <= 30:  # expired or too close to expiry to send
+            with self._lock:
+                if force_refresh or self._seconds_left() <= 30:
+                    self.creds.refresh(self.request)
+                    self.sync_refreshes += 1
+                return self.creds.token
+        if left <= self.refresh_margin_seconds and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self._refresh_in_background, name="tts-token-refresh", daemon=True).start()
+        return self.creds.token
+
+
+token_cache = CachedToken(credentials, tts_session) if credentials else None
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "auth_seconds": 0.0, "max_auth_seconds": 0.0, "synthesize_seconds": 0.0, "unauthorized_retries": 0}
+
+
+def record_tts_call(auth_seconds: float, synthesize_seconds: float, unauthorized_retry: bool = False) -> None:
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["auth_seconds"] += auth_seconds
+        _stats["max_auth_seconds"] = max(_stats["max_auth_seconds"], auth_seconds)
+        _stats["synthesize_seconds"] += synthesize_seconds
+        _stats["unauthorized_retries"] += int(unauthorized_retry)
+
+
+def tts_stats() -> dict:
+    with _stats_lock:
+        calls = _stats["calls"]
+        return {
+            "calls": calls,
+            "avg_auth_ms": round(1000 * _stats["auth_seconds"] / calls, 1) if calls else 0.0,
+            "max_auth_ms": round(1000 * _stats["max_auth_seconds"], 1),
+            "avg_synthesize_ms": round(1000 * _stats["synthesize_seconds"] / calls, 1) if calls else 0.0,
+            "unauthorized_retries": _stats["unauthorized_retries"],
+            "token_refreshes": token_cache.sync_refreshes if token_cache else 0,
+            "background_token_refreshes": token_cache.background_refreshes if token_cache else 0,
+        }
+
 
 # --- Main TTS Function using REST API ---
 def generate_tts_audio_with_timing(
@@ -43,7 +134,7 @@ def generate_tts_audio_with_timing(
     Generates audio and SSML mark timings using the Google Cloud TTS REST API v1beta1.
     Returns the path to the *temporary* audio file and a list of (mark_name, time_seconds) tuples.
     """
-    if not credentials:
+    if not token_cache:
         logging.error("Google Cloud credentials not available. Cannot make REST API call.")
         return None, None
     if not script_text or not script_text.strip():
@@ -73,19 +164,18 @@ def generate_tts_audio_with_timing(
     else:
         request_body["voice"]["ssmlGender"] = "NEUTRAL"
         logging.info(f"No specific default for {language_code}, letting API choose NEUTRAL.")
-    # --- Prepare for API Call ---
+    # --- Prepare for API Call (cached token; only blocks when none is valid) ---
+    auth_start = time.time()
     try:
-        credentials.refresh(Request()) # Refresh token
+        auth_token = token_cache.get()
     except Exception as auth_err:
         logging.error(f"Failed to refresh auth token: {auth_err}", exc_info=True)
         return None, None
-
-    auth_token = credentials.token
+    auth_seconds = time.time() - auth_start
     headers = {
         "Authorization": f"Bearer {auth_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
-    rest_api_url = "https://texttospeech.googleapis.com/v1beta1/text:synthesize"
 
     # --- Generate Unique Filename in test_audio Directory ---
     unique_id = uuid.uuid4().hex[:8]
@@ -101,8 +191,16 @@ def generate_tts_audio_with_timing(
 
     try:
         # --- Make the REST API Call ---
-        logging.debug(f"Sending POST request to {rest_api_url}")
-        response = requests.post(rest_api_url, headers=headers, json=request_body, timeout=60)
+        logging.debug(f"Sending POST request to {TTS_REST_API_URL}")
+        synthesize_start = time.time()
+        response = tts_session.post(TTS_REST_API_URL, headers=headers, json=request_body, timeout=60)
+        unauthorized_retry = response.status_code == 401
+        if unauthorized_retry:  # token revoked or clock skew: renew once and retry
+            auth_start = time.time()
+            headers["Authorization"] = f"Bearer {token_cache.get(force_refresh=True)}"
+            auth_seconds += time.time() - auth_start
+            response = tts_session.post(TTS_REST_API_URL, headers=headers, json=request_body, timeout=60)
+        record_tts_call(auth_seconds, time.time() - synthesize_start, unauthorized_retry)
         response.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
 
         response_data = response.json()
@@ -0,0 +1,125 @@
+# --- utils/ffmpeg_render.py ---
+# Renders a render_timeline layer list with a single ffmpeg invocation. Every still image is
+# decoded and scaled once, then looped as a frame that ffmpeg fades and overlays natively,
+# so no frame ever passes through Python.
+import os
+import json
+import logging
+import subprocess
+from utils.render_timeline import FADE_SECONDS, GRAPHIC_HEIGHT_RATIO, text_position
+
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+
+
+def probe_duration(media_path: str) -> float:
+    """Duration in seconds from the container header."""
+    output = subprocess.run(
+        [FFPROBE_BINARY, "-v", "error", "-show_entries", "format=duration", "-of", "json", media_path],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return float(json.loads(output)["format"]["duration"])
+
+
+def _fades(layer) -> str:
+    # MoviePy's FadeIn/FadeOut fade the colour from/to black and leave the mask alone,
+    # so `fade` is only ever applied to colour planes (it would fade alpha on rgba input)
+    duration = layer["duration"]
+    fade = min(FADE_SECONDS, duration / 2)
+    fades = []
+    if layer.get("fade_in", True):
+        fades.append(f"fade=t=in:st=0:d={fade:.3f}")
+    if layer.get("fade_out", True):
+        fades.append(f"fade=t=out:st={max(0.0, duration - fade):.3f}:d={fade:.3f}")
+    return ",".join(fades) or "null"
+
+
+def build_ffmpeg_command(layers, audio_filepath, total_duration, output_path,
+                         size=(1280, 720), fps=24, threads=4, preset="medium", crf=None):
+    """
+    `layers` come from build_timeline(); title/caption layers must already carry the
+    rasterized "path" and "size" of their PNG. With audio_filepath=None the video is silent.
+    Returns the ffmpeg argv.
+    """
+    width, height = size
+    args = [FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"color=c=white:s={width}x{height}:r={fps}:d={total_duration:.3f}"]
+    if audio_filepath:
+        args += ["-i", audio_filepath]
+    first_layer_input = 2 if audio_filepath else 1
+    filters = []
+    base = "0:v"
+    graphic_height = int(height * GRAPHIC_HEIGHT_RATIO)
+
+    for n, layer in enumerate(layers):
+        index = n + first_layer_input
+        start, duration = layer["start"], layer["duration"]
+        frames = max(1, round(duration * fps))
+        args += ["-i", layer["path"]]
+
+        # Scale the single decoded frame first, then repeat it for the layer's duration
+        repeat = f"loop=loop={frames - 1}:size=1:start=0,setpts=N/{fps}/TB"
+        if layer["kind"] == "graphic":
+            # Normalized graphics are already at their on-screen size
+            scale = "" if layer.get("normalized") else f"scale=-2:{graphic_height}:flags=bicubic,"
+            filters.append(
+                f"[{index}:v]{scale}format=rgb24,{repeat},"
+                f"{_fades(layer)},setpts=PTS+{start:.3f}/TB[l{n}]"
+            )
+            x, y = "(W-w)/2", "(H-h)/2"
+        else:
+            # Text PNGs are RGBA: fade the colour, then put the untouched alpha mask back
+            filters.append(f"[{index}:v]format=rgba,{repeat},split[c{n}][a{n}]")
+            filters.append(f"[a{n}]alphaextract[m{n}]")
+            filters.append(
+                f"[c{n}]format=rgb24,{_fades(layer)}[f{n}];"
+                f"[f{n}][m{n}]alphamerge,setpts=PTS+{start:.3f}/TB[l{n}]"
+            )
+            x, y = text_position(layer["kind"], layer["size"], size)
+        filters.append(
+            f"[{base}][l{n}]overlay=x={x}:y={y}:eof_action=pass:"
+            f"enable='between(t,{start:.3f},{start + duration:.3f})'[b{n}]"
+        )
+        base = f"b{n}"
+
+    filters.append(f"[{base}]format=yuv420p[vout]")
+    args += ["-filter_complex", ";".join(filters), "-map", "[vout]",
+             "-c:v", "libx264", "-preset", preset, "-r", str(fps), "-threads", str(threads)]
+    if crf is not None:
+        args += ["-crf", str(crf)]
+    args += ["-map", "1:a", "-c:a", "aac"] if audio_filepath else ["-an"]
+    args += ["-t", f"{total_duration:.3f}", "-movflags", "+faststart", output_path]
+    return args
+
+
+def _run(args, what: str) -> None:
+    result = subprocess.run(args, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg {what} failed ({result.returncode}): {result.stderr.strip()[-2000:]}")
+
+
+def render_timeline_ffmpeg(layers, audio_filepath, total_duration, output_path, **encode_options) -> str:
+    """Run the filtergraph render; raises RuntimeError with ffmpeg's stderr on failure."""
+    args = build_ffmpeg_command(layers, audio_filepath, total_duration, output_path, **encode_options)
+    logging.info(f"Rendering {len(layers)} layers with ffmpeg → {output_path}")
+    _run(args, "render")
+    return output_path
+
+
+def concat_segments(segment_paths, audio_filepath, total_duration, output_path) -> str:
+    """
+    Join silent H.264 segments with the concat demuxer (stream copy, no re-encode) and mux the
+    narration once, so there are no AAC priming gaps at the segment joins.
+    """
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, "w") as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+    try:
+        _run([FFMPEG_BINARY, "-y", "-hide_banner", "-loglevel", "error",
+              "-f", "concat", "-safe", "0", "-i", list_path, "-i", audio_filepath,
+              "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac",
+              "-t", f"{total_duration:.3f}", "-movflags", "+faststart", output_path], "concat")
+    finally:
+        os.remove(list_path)
+    return output_path
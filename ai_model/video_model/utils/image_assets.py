@@ -0,0 +1,214 @@
+# --- utils/image_assets.py ---
+# Content-addressed store for generated and stock images. The same legal concepts ("rental
+# agreement", "court") come back in most videos, so an image is generated or downloaded once and
+# every later render reads the stored file directly.
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+
+# ------------------- Configuration -------------------
+IMAGE_ASSET_DIR = os.getenv("IMAGE_ASSET_DIR", os.path.join(tempfile.gettempdir(), "know_your_terms_image_assets"))
+IMAGE_ASSET_CACHE_MAX_MB = int(os.getenv("IMAGE_ASSET_CACHE_MAX_MB", "1024"))
+# Assets used more recently than this are never evicted: a queued render may still read them
+IMAGE_ASSET_MIN_AGE_SECONDS = int(os.getenv("IMAGE_ASSET_MIN_AGE_SECONDS", "1800"))
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "over", "under", "showing", "image", "photo",
+    "picture", "illustration", "realistic", "photorealistic", "style", "high", "quality", "detailed", "background",
+}
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(str(text).split())
+
+
+def prompt_keywords(text: str) -> list[str]:
+    """Content words of a prompt or query, in order, without duplicates or style filler."""
+    words = re.findall(r"[^\W\d_]{3,}", str(text).lower())
+    return list(dict.fromkeys(w for w in words if w not in _STOPWORDS))
+
+
+class ImageAssetStore:
+    """
+    Image files named by a hash of what produced them: (prompt, model, size) for AI images and
+    (query, locale) for stock photos. Renders reference the stored file; nothing is copied.
+
+    Least recently used assets are evicted beyond `max_bytes`, except those used within
+    `min_age_seconds`. Concurrent requests for the same key wait for a single producer instead
+    of generating the image twice. The prompt or query behind each asset is kept next to it
+    (`<key>.txt`), so a render that cannot wait for a new image can reuse a similar one.
+    """
+
+    def __init__(self, store_dir: str, max_bytes: int, min_age_seconds: int = IMAGE_ASSET_MIN_AGE_SECONDS):
+        self.store_dir = os.path.abspath(store_dir)
+        self.max_bytes = max_bytes
+        self.min_age_seconds = min_age_seconds
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(64)]  # striped single-flight locks
+        self._entries = OrderedDict()  # key -> (path, bytes, last_used, keywords)
+        self._stats = {kind: {"hits": 0, "misses": 0, "failures": 0, "produce_seconds": 0.0} for kind in ("ai", "stock")}
+        self.evictions = 0
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        # Re-index assets left by earlier runs; mtime is refreshed on every hit, so it is the last use
+        files = []
+        for name in os.listdir(self.store_dir):
+            match = re.fullmatch(r"([0-9a-f]{40})\.(png|jpg)", name)
+            if match:
+                path = os.path.join(self.store_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, match.group(1), path, stat.st_size))
+        for mtime, key, path, nbytes in sorted(files):
+            self._entries[key] = (path, nbytes, mtime, self._read_keywords(key))
+
+    @staticmethod
+    def _key(*parts) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps(parts, ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def ai_key(cls, prompt: str, model: str, size: str) -> str:
+        return cls._key("ai", _normalize_text(prompt), model, size)
+
+    @classmethod
+    def stock_key(cls, query: str, locale: str) -> str:
+        return cls._key("stock", _normalize_text(query).lower(), (locale or "").lower())
+
+    def _read_keywords(self, key: str) -> frozenset:
+        try:
+            with open(os.path.join(self.store_dir, f"{key}.txt"), encoding="utf-8") as f:
+                return frozenset(prompt_keywords(f.read()))
+        except OSError:
+            return frozenset()
+
+    def owns(self, path: str | None) -> bool:
+        """True for files inside the store; these are shared and must not be deleted by a render."""
+        return bool(path) and os.path.dirname(os.path.abspath(path)) == self.store_dir
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(entry[0]):
+                del self._entries[key]
+                return None
+            now = time.time()
+            self._entries[key] = (entry[0], entry[1], now, entry[3])
+            self._entries.move_to_end(key)
+        try:
+            os.utime(entry[0], (now, now))
+        except OSError:
+            pass
+        return entry[0]
+
+    def fetch(self, key: str, ext: str, produce, kind: str = "ai", text: str | None = None) -> str | None:
+        """
+        Stored path for `key`, or run `produce(tmp_path) -> bool` to create it. The producer
+        writes to a temporary file that is renamed into place only on success. `text` is the
+        prompt or query, recorded for find_similar().
+        """
+        with self._key_locks[int(key[:8], 16) % len(self._key_locks)]:
+            path = self.get(key)
+            if path:
+                with self._lock:
+                    self._stats[kind]["hits"] += 1
+                return path
+
+            path = os.path.join(self.store_dir, f"{key}{ext}")
+            tmp_path = os.path.join(self.store_dir, f"{key}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+            start = time.time()
+            try:
+                ok = produce(tmp_path) and os.path.exists(tmp_path) and os.path.getsize(tmp_path) > 100
+                if ok:
+                    if text:
+                        with open(os.path.join(self.store_dir, f"{key}.txt"), "w", encoding="utf-8") as f:
+                            f.write(_normalize_text(text))
+                    os.replace(tmp_path, path)  # atomic: readers never see a partial file
+            except Exception as e:
+                logging.error(f"Image asset producer failed for {key}: {e}", exc_info=True)
+                ok = False
+            finally:
+                if os.path.exists(tmp_path):
+                    try: os.remove(tmp_path)
+                    except OSError: pass
+
+            with self._lock:
+                stats = self._stats[kind]
+                stats["misses"] += 1
+                if not ok:
+                    stats["failures"] += 1
+                    return None
+                stats["produce_seconds"] += time.time() - start
+                self._entries[key] = (path, os.path.getsize(path), time.time(), frozenset(prompt_keywords(text or "")))
+                self._entries.move_to_end(key)
+                self._evict_locked()
+            return path
+
+    def _evict_locked(self) -> None:
+        total = sum(entry[1] for entry in self._entries.values())
+        cutoff = time.time() - self.min_age_seconds
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            path, nbytes, last_used, _ = self._entries[key]
+            if last_used > cutoff:
+                break  # the rest are even more recent
+            del self._entries[key]
+            total -= nbytes
+            self.evictions += 1
+            for stale in (path, os.path.join(self.store_dir, f"{key}.txt")):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def find_similar(self, text: str, min_score: float) -> str | None:
+        """
+        Stored image whose prompt/query shares the most keywords with `text` (Jaccard score of at
+        least `min_score`), or None. Used as a stand-in when a new image is not ready in time.
+        """
+        keywords = set(prompt_keywords(text))
+        if not keywords:
+            return None
+        with self._lock:
+            best_key, best_score = None, min_score
+            for key, entry in self._entries.items():
+                if entry[3]:
+                    score = len(keywords & entry[3]) / len(keywords | entry[3])
+                    if score >= best_score:
+                        best_key, best_score = key, score
+        return self.get(best_key) if best_key else None
+
+    # ------------------- Metrics -------------------
+    def stats(self) -> dict:
+        with self._lock:
+            per_kind = {}
+            for kind, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                produced = stats["misses"] - stats["failures"]
+                per_kind[kind] = {
+                    "hits": stats["hits"],
+                    "misses": stats["misses"],
+                    "failures": stats["failures"],
+                    "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+                    "avg_produce_seconds": round(stats["produce_seconds"] / produced, 2) if produced else 0.0,
+                }
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(entry[1] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+                **per_kind,
+            }
+
+
+image_asset_store = ImageAssetStore(IMAGE_ASSET_DIR, IMAGE_ASSET_CACHE_MAX_MB * 1024 * 1024)
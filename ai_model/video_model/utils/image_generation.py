@@ -1,19 +1,17 @@
 # --- image_generation.py ---
 import os
-import re
 import logging
-import requests
 from PIL import Image
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
 import vertexai
 from langchain_google_vertexai import ChatVertexAI, HarmBlockThreshold, HarmCategory
 from requests.exceptions import RequestException
 from google import genai
 from google.genai.types import GenerateImagesConfig
-import tempfile
-import uuid
-import shutil
+from utils.image_assets import image_asset_store, prompt_keywords
+from utils.stock_images import PexelsClient
 
 load_dotenv()
 
@@ -49,16 +47,20 @@ genai_client = genai.Client(
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
 if not PEXELS_API_KEY:
     logging.warning("PEXELS_API_KEY environment variable not set. Stock image search will be disabled.")
+pexels_client = PexelsClient(PEXELS_API_KEY)
 
+# Part of the asset key: a different model or size is a different image
+IMAGEN_MODEL = os.getenv("IMAGEN_MODEL", "imagen-4.0-generate-001")
+IMAGEN_IMAGE_SIZE = os.getenv("IMAGEN_IMAGE_SIZE", "2K")
+
+# Per-video budget for image generation; outstanding prompts then fall back (0 = wait for all)
+IMAGE_DEADLINE_SECONDS = float(os.getenv("IMAGE_DEADLINE_SECONDS", "90"))
+# Extra time allowed for stock searches that replace AI images missed by the deadline
+IMAGE_STOCK_FALLBACK_SECONDS = float(os.getenv("IMAGE_STOCK_FALLBACK_SECONDS", "15"))
+# Minimum keyword overlap (Jaccard) for a stored image to stand in for a different prompt
+IMAGE_SIMILAR_MIN_SCORE = float(os.getenv("IMAGE_SIMILAR_MIN_SCORE", "0.3"))
+IMAGE_SOURCES = ("generated", "similar_cached", "stock", "placeholder", "failed")
 
-# --- Temporary Image Directory ---
-IMAGE_TEMP_DIR = os.path.join(tempfile.gettempdir(), f"know_your_terms_images_{uuid.uuid4().hex[:6]}")
-try:
-    os.makedirs(IMAGE_TEMP_DIR, exist_ok=True)
-    logging.info(f"Using temp directory for images: {IMAGE_TEMP_DIR}")
-except OSError as e:
-    logging.critical(f"FATAL: Could not create image temp directory {IMAGE_TEMP_DIR}: {e}")
-    IMAGE_TEMP_DIR = "." # Fallback to current directory
 
 # --- Ensure default placeholder image exists ---
 def ensure_default_placeholder():
@@ -90,10 +92,10 @@ def generate_ai_image(prompt: str, output_filepath: str) -> str | None:
     logging.info(f"Generating AI image for prompt: '{prompt[:70]}...' -> {os.path.basename(output_filepath)}")
     try:
         image_response = genai_client.models.generate_images(
-            model="imagen-4.0-generate-001",
+            model=IMAGEN_MODEL,
             prompt=prompt,
             config=GenerateImagesConfig(
-                image_size="2K",
+                image_size=IMAGEN_IMAGE_SIZE,
             ),
         )
         if image_response.generated_images:
@@ -117,24 +119,12 @@ def generate_ai_image(prompt: str, output_filepath: str) -> str | None:
         return None
 
 def search_stock_images(query: str, num_images: int = 1, language: str = "en") -> list[str]:
-    """Searches Pexels API for images."""
+    """Searches Pexels API for images (pooled session, cached per query/locale/count)."""
     logging.info(f"Searching Pexels for query: '{query}', lang: {language}")
     image_urls = []
-    if not PEXELS_API_KEY:
-        logging.error("PEXELS_API_KEY not set. Cannot search stock images.")
-        return image_urls
     try:
-        headers = {"Authorization": PEXELS_API_KEY}
-        params = {"query": query, "per_page": num_images, "locale": language}
-        response = requests.get("https://api.pexels.com/v1/search", headers=headers, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        photos = data.get("photos", [])
-        if photos:
-            image_urls = [p.get("src", {}).get("large") or p.get("src", {}).get("original")
-                          for p in photos if p.get("src")]
-            image_urls = [url for url in image_urls if url]
-        else:
+        image_urls = pexels_client.search(query, per_page=num_images, locale=language)
+        if not image_urls:
             logging.warning(f"No Pexels images found for query: '{query}'")
     except RequestException as e:
         logging.error(f"Network error searching Pexels for '{query}': {e}")
@@ -144,20 +134,11 @@ def search_stock_images(query: str, num_images: int = 1, language: str = "en") -
     return image_urls
 
 def download_image(image_url: str, output_filepath: str) -> bool:
-    """Downloads a single image from URL to a local temporary path."""
+    """Downloads a single image from URL to a local path (streamed, size-capped)."""
     logging.info(f"Downloading image from URL: {image_url} -> {os.path.basename(output_filepath)}")
     try:
-        response = requests.get(image_url, stream=True, timeout=30)
-        response.raise_for_status()
-        content_type = response.headers.get('content-type', '').lower()
-        if not content_type.startswith('image/'):
-            logging.warning(f"URL content is not an image (Content-Type: {content_type}): {image_url}")
+        if not pexels_client.download(image_url, output_filepath):
             return False
-        
-        with open(output_filepath, 'wb') as f:
-            response.raw.decode_content = True
-            shutil.copyfileobj(response.raw, f)
-            
         if os.path.exists(output_filepath) and os.path.getsize(output_filepath) > 100:
             logging.info(f"Successfully downloaded image: {os.path.basename(output_filepath)}")
             return True
@@ -167,6 +148,9 @@ def download_image(image_url: str, output_filepath: str) -> bool:
             return False
     except RequestException as e:
         logging.error(f"Network error downloading {image_url}: {e}")
+        if os.path.exists(output_filepath):
+            try: os.remove(output_filepath)
+            except OSError: pass
         return False
     except Exception as e:
         logging.error(f"Exception downloading {image_url}: {e}", exc_info=True)
@@ -176,46 +160,80 @@ def download_image(image_url: str, output_filepath: str) -> bool:
         return False
 
 # --- Worker Function for ThreadPoolExecutor ---
-def fetch_image_worker(query: str, use_ai: bool, language: str, output_dir: str) -> str | None:
+def fetch_image_worker(query: str, use_ai: bool, language: str) -> str | None:
     """
     Worker function to either generate an AI image or fetch a stock image.
-    Returns the path to the *temporary* local file, or None on failure.
+    Returns the path of the shared asset from the image store, or None on failure.
     """
-    unique_id = uuid.uuid4().hex[:8]
-    file_extension = ".png" if use_ai else ".jpg"
-    safe_query_part = "".join(filter(str.isalnum, query.split()[:5]))[:40].lower()
-    filename = f"{safe_query_part}_{unique_id}{file_extension}"
-    output_filepath = os.path.join(output_dir, filename)
-
-    # Directory for persistent images
-    test_images_dir = os.path.join(os.path.dirname(__file__), "..", "test_images")
-    os.makedirs(test_images_dir, exist_ok=True)
-    test_images_path = os.path.join(test_images_dir, filename)
-
-    result_path = None
     if use_ai:
-        result_path = generate_ai_image(prompt=query, output_filepath=output_filepath)
-    else:
+        key = image_asset_store.ai_key(query, IMAGEN_MODEL, IMAGEN_IMAGE_SIZE)
+        return image_asset_store.fetch(
+            key, ".png", lambda path: generate_ai_image(prompt=query, output_filepath=path) is not None,
+            kind="ai", text=query
+        )
+
+    def download_stock(path):
         image_urls = search_stock_images(query, num_images=1, language=language)
-        if image_urls:
-            if download_image(image_urls[0], output_filepath=output_filepath):
-                result_path = output_filepath
-            else:
-                logging.warning(f"Failed to download stock image for query: '{query}'")
-        else:
+        if not image_urls:
             logging.warning(f"No stock images found for query: '{query}'")
+            return False
+        if not download_image(image_urls[0], output_filepath=path):
+            logging.warning(f"Failed to download stock image for query: '{query}'")
+            return False
+        return True
 
-    # If image was successfully created/downloaded, copy to test_images and return that path
-    if result_path and os.path.exists(result_path) and os.path.getsize(result_path) > 100:
-        try:
-            import shutil
-            shutil.copy2(result_path, test_images_path)
-            logging.info(f"Copied image to test_images: {test_images_path}")
-            return test_images_path
-        except Exception as copy_err:
-            logging.warning(f"Could not copy image to test_images: {copy_err}")
-            return result_path  # fallback to temp path if copy fails
-    return None
+    return image_asset_store.fetch(image_asset_store.stock_key(query, language), ".jpg", download_stock,
+                                   kind="stock", text=query)
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"runs": 0, "deadline_hits": 0, **{source: 0 for source in IMAGE_SOURCES}}
+
+
+def record_image_sources(sources: list[str], deadline_hit: bool) -> None:
+    with _stats_lock:
+        _stats["runs"] += 1
+        _stats["deadline_hits"] += int(deadline_hit)
+        for source in sources:
+            _stats[source] += 1
+
+
+def image_fetch_stats() -> dict:
+    with _stats_lock:
+        images = sum(_stats[source] for source in IMAGE_SOURCES)
+        return {
+            **_stats,
+            "images": images,
+            "deadline_hit_rate": round(_stats["deadline_hits"] / _stats["runs"], 4) if _stats["runs"] else 0.0,
+            "fallback_rates": {
+                source: round(_stats[source] / images, 4) if images else 0.0 for source in IMAGE_SOURCES[1:]
+            },
+        }
+
+
+def _stock_fallbacks(prompts: dict, language: str, timeout: float, max_workers: int) -> dict:
+    """{index: path} of stock photos found within `timeout` for the prompts' keywords."""
+    found = {}
+    if not prompts or timeout <= 0:
+        return found
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {
+        executor.submit(fetch_image_worker, " ".join(prompt_keywords(prompt)[:6]) or prompt, False, language): idx
+        for idx, prompt in prompts.items()
+    }
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            try:
+                path = future.result()
+                if path:
+                    found[futures[future]] = path
+            except Exception as e:
+                logging.warning(f"Stock fallback failed for prompt index {futures[future]}: {e}")
+    except FuturesTimeout:
+        logging.warning(f"Stock fallback budget of {timeout:g}s reached, {len(prompts) - len(found)} prompt(s) left")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return found
 
 # --- Main Orchestrator Function (Optimized Parallel Handling) ---
 def generate_images_for_prompts(
@@ -223,11 +241,15 @@ def generate_images_for_prompts(
     use_ai_flags: list[bool],
     language: str = "en",
     max_workers: int = 5,
-    fallback_image_path: str | None = None
+    fallback_image_path: str | None = None,
+    deadline_seconds: float | None = None
 ) -> list[str | None]:
     """
     Generates/fetches images in parallel for a list of prompts.
-    Returns a list of paths to the *temporary* local image files, or None for failures.
+    Returns a list of paths into the shared image asset store, or None for failures.
+    deadline_seconds: time budget for the whole batch (default IMAGE_DEADLINE_SECONDS, 0 = none).
+    Prompts that fail or miss it get a similar stored image, then a stock photo, then the
+    placeholder, so the call returns within deadline + IMAGE_STOCK_FALLBACK_SECONDS.
     """
     if len(image_prompts) != len(use_ai_flags):
         logging.error("Mismatched lengths for image_prompts and use_ai_flags.")
@@ -251,45 +273,61 @@ def generate_images_for_prompts(
             valid_fallback_path = None # Explicitly set to None if no valid fallback
 
     image_filepaths_ordered: list[str | None] = [None] * len(image_prompts)
-    logging.info(f"Starting image processing for {len(image_prompts)} prompts (max_workers={max_workers}).")
+    sources: list[str] = ["failed"] * len(image_prompts)
+    deadline_seconds = IMAGE_DEADLINE_SECONDS if deadline_seconds is None else deadline_seconds
+    logging.info(f"Starting image processing for {len(image_prompts)} prompts (max_workers={max_workers}, "
+                 f"deadline={deadline_seconds or 'none'}s).")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_index = {
-            executor.submit(fetch_image_worker, prompt, use_ai, language, IMAGE_TEMP_DIR): idx
-            for idx, (prompt, use_ai) in enumerate(zip(image_prompts, use_ai_flags))
-        }
-
-        processed_count = 0
-        for future in as_completed(future_to_index):
+    # Not a `with` block: on the deadline the pool is shut down without waiting. Abandoned
+    # generations still finish in the background and land in the asset store for later videos.
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    future_to_index = {
+        executor.submit(fetch_image_worker, prompt, use_ai, language): idx
+        for idx, (prompt, use_ai) in enumerate(zip(image_prompts, use_ai_flags))
+    }
+    deadline_hit = False
+    processed_count = 0
+    try:
+        for future in as_completed(future_to_index, timeout=deadline_seconds or None):
             idx = future_to_index[future]
             prompt_for_log = image_prompts[idx]
             try:
-                result_path = future.result() # This is the local temp path or None
-                
+                result_path = future.result() # Asset store path or None
+
                 if result_path and os.path.exists(result_path) and os.path.getsize(result_path) > 100:
                     image_filepaths_ordered[idx] = result_path
+                    sources[idx] = "generated"
                     logging.debug(f"Success for prompt index {idx} ('{prompt_for_log[:30]}...') -> {os.path.basename(result_path)}")
-                elif valid_fallback_path:
-                    image_filepaths_ordered[idx] = valid_fallback_path
-                    logging.warning(f"Failed to get image for prompt index {idx} ('{prompt_for_log[:30]}...'), using fallback.")
                 else:
-                    image_filepaths_ordered[idx] = None
-                    logging.error(f"Failed to get image for prompt index {idx} ('{prompt_for_log[:30]}...') and no valid fallback available.")
+                    logging.warning(f"Failed to get image for prompt index {idx} ('{prompt_for_log[:30]}...'), trying fallbacks.")
             except Exception as e:
                 logging.error(f"Exception from future for prompt index {idx} ('{prompt_for_log[:30]}...'): {e}", exc_info=True)
-                if valid_fallback_path:
-                    image_filepaths_ordered[idx] = valid_fallback_path
-                    logging.warning(f"Exception for prompt index {idx}, using fallback.")
-                else:
-                    image_filepaths_ordered[idx] = None
-                    logging.error(f"Exception for prompt index {idx} and no valid fallback available.")
             processed_count += 1
             logging.info(f"Processed {processed_count}/{len(image_prompts)} image tasks.")
+    except FuturesTimeout:
+        deadline_hit = True
+        logging.warning(f"Image deadline of {deadline_seconds:g}s reached, abandoning "
+                        f"{len(image_prompts) - processed_count} outstanding image task(s).")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-    # Final tally for logging
-    valid_count = sum(1 for p in image_filepaths_ordered if p and p != valid_fallback_path)
-    fallback_applied_count = sum(1 for p in image_filepaths_ordered if p == valid_fallback_path)
-    failed_count = sum(1 for p in image_filepaths_ordered if p is None)
+    # Progressive fallback: similar stored image -> stock photo (AI prompts only) -> placeholder
+    missing = [idx for idx, path in enumerate(image_filepaths_ordered) if not path]
+    for idx in missing:
+        similar = image_asset_store.find_similar(image_prompts[idx], IMAGE_SIMILAR_MIN_SCORE)
+        if similar:
+            image_filepaths_ordered[idx], sources[idx] = similar, "similar_cached"
+    stock_prompts = {idx: image_prompts[idx] for idx in missing if not image_filepaths_ordered[idx] and use_ai_flags[idx]}
+    for idx, path in _stock_fallbacks(stock_prompts, language, IMAGE_STOCK_FALLBACK_SECONDS, max_workers).items():
+        image_filepaths_ordered[idx], sources[idx] = path, "stock"
+    for idx in missing:
+        if not image_filepaths_ordered[idx] and valid_fallback_path:
+            image_filepaths_ordered[idx], sources[idx] = valid_fallback_path, "placeholder"
+        elif not image_filepaths_ordered[idx]:
+            logging.error(f"No image or fallback available for prompt index {idx} ('{image_prompts[idx][:30]}...').")
+    record_image_sources(sources, deadline_hit)
 
-    logging.info(f"Image processing complete. Generated/Fetched: {valid_count}. Fallback used: {fallback_applied_count}. Failed (None): {failed_count}.")
-    return image_filepaths_ordered
\ No newline at end of file
+    # Final tally for logging
+    tally = ", ".join(f"{source}: {sources.count(source)}" for source in IMAGE_SOURCES)
+    logging.info(f"Image processing complete. {tally}.")
+    return image_filepaths_ordered
@@ -0,0 +1,52 @@
+# --- utils/image_normalize.py ---
+# One-time normalization of the graphics before the timeline is built: every image is decoded
+# once and resized to the exact box it occupies in the frame, so neither render engine has to
+# keep 2K Imagen output in memory or scale it.
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+VIDEO_NORMALIZE_IMAGES = os.getenv("VIDEO_NORMALIZE_IMAGES", "true").lower() != "false"
+
+
+def normalize_image(src_path: str, dst_path: str, box_height: int, max_width: int) -> str:
+    """
+    Resize to `box_height` (aspect kept) with Lanczos and center-crop anything wider than the
+    frame, which would be off-screen anyway. Transparency is flattened onto the white background.
+    """
+    with Image.open(src_path) as image:
+        image.draft("RGB", (1, box_height))  # JPEG: decode at the smallest DCT scale still >= box height
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        width = max(1, round(image.width * box_height / image.height))
+        # reducing_gap: cheap integer box reduction first, Lanczos only for the last <3x step
+        image = image.resize((width, box_height), Image.LANCZOS, reducing_gap=3.0)
+        if width > max_width:
+            left = (width - max_width) // 2
+            image = image.crop((left, 0, left + max_width, box_height))
+        image.save(dst_path, format="PNG", compress_level=1)
+    return dst_path
+
+
+def normalize_graphics(graphic_filepaths, box_height: int, max_width: int, out_dir: str, workers: int = 4) -> dict:
+    """Normalize every existing graphic in parallel; returns {original_path: normalized_path}."""
+    sources = sorted({p for p in graphic_filepaths or [] if p and os.path.exists(p)})
+    workers = max(1, min(workers, os.cpu_count() or 1))  # each decoded 2K image is ~12-16 MB
+
+    def work(index_path):
+        index, path = index_path
+        try:
+            return path, normalize_image(path, os.path.join(out_dir, f"graphic_{index:03d}.png"), box_height, max_width)
+        except Exception as e:
+            logging.error(f"Could not normalize '{path}', using the original: {e}")
+            return path, None
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return {path: normalized for path, normalized in executor.map(work, enumerate(sources)) if normalized}
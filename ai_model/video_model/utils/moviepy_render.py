@@ -0,0 +1,64 @@
+# --- utils/moviepy_render.py ---
+# Renders a render_timeline layer list by compositing every frame with MoviePy v2.x.
+import logging
+from moviepy import CompositeVideoClip, ImageClip, AudioFileClip, ColorClip
+from moviepy.video.fx import FadeIn, FadeOut
+from utils.render_timeline import FADE_SECONDS, GRAPHIC_HEIGHT_RATIO, text_position
+
+
+def render_timeline_moviepy(layers, audio_filepath, total_duration, output_path,
+                            size=(1280, 720), fps=24, threads=4, preset="medium", crf=None) -> str:
+    """
+    Same contract as render_timeline_ffmpeg(): title/caption layers carry the rasterized "path"
+    and "size" of their PNG; with audio_filepath=None a silent video is written.
+    """
+    all_clips_to_composite = []
+    audio_clip = None
+    final_clip = None
+    try:
+        # Always use white background
+        all_clips_to_composite.append(ColorClip(size=size, color=(255, 255, 255), duration=total_duration))
+
+        for layer in layers:
+            try:
+                clip = ImageClip(layer["path"]).with_duration(layer["duration"]).with_start(layer["start"])
+            except Exception as img_err:
+                logging.error(f"Failed to load {layer['kind']} layer '{layer['path']}': {img_err}")
+                continue
+            if layer["kind"] == "graphic":
+                clip = clip.with_position("center")
+                if not layer.get("normalized"):
+                    clip = clip.resized(height=int(size[1] * GRAPHIC_HEIGHT_RATIO))
+            else:
+                clip = clip.with_position(text_position(layer["kind"], layer["size"], size))
+            effects = []
+            if layer.get("fade_in", True):
+                effects.append(FadeIn(FADE_SECONDS))
+            if layer.get("fade_out", True):
+                effects.append(FadeOut(FADE_SECONDS))
+            all_clips_to_composite.append(clip.with_effects(effects) if effects else clip)
+
+        final_clip = CompositeVideoClip(all_clips_to_composite, size=size).with_duration(total_duration)
+        if audio_filepath:
+            audio_clip = AudioFileClip(audio_filepath)
+            final_clip = final_clip.with_audio(audio_clip)
+
+        final_clip.write_videofile(
+            output_path,
+            codec="libx264",
+            audio_codec="aac",
+            audio=bool(audio_filepath),
+            fps=fps,
+            threads=threads,
+            preset=preset,
+            ffmpeg_params=["-crf", str(crf)] if crf is not None else None,
+            logger="bar",
+        )
+        return output_path
+    finally:
+        if audio_clip is not None:
+            audio_clip.close()
+        for clip in all_clips_to_composite:
+            clip.close()
+        if final_clip is not None:
+            final_clip.close()
@@ -0,0 +1,129 @@
+# --- utils/pipeline_dag.py ---
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class StageFailed(RuntimeError):
+    """Raised by a stage function to mark the stage as failed; dependent stages are skipped."""
+
+
+class PipelineDAG:
+    """
+    Minimal dependency-graph executor for the video pipeline.
+
+    Each stage is a function that receives the results of its dependencies as keyword arguments
+    and returns its own result. A stage starts as soon as all of its dependencies have finished,
+    so independent stages (TTS and images) run concurrently. If a stage raises, every stage that
+    depends on it is skipped.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.stages = {}  # name -> (fn, deps), in insertion order
+
+    def add(self, name: str, fn, deps=()):
+        """Dependencies are earlier stages or input names supplied through `run(initial=...)`."""
+        self.stages[name] = (fn, tuple(deps))
+        return self
+
+    def run(self, initial: dict | None = None, on_stage=None, cancel_event: threading.Event | None = None):
+        """
+        Run the graph. `initial` holds results of stages that are already done (they are not re-run).
+        `on_stage(name, status, result)` is called when a stage starts ("running") and ends
+        ("done", "failed", "skipped", "cancelled").
+        Returns (results, timings); timings[name] = {"status", "start", "seconds"} relative to the run start.
+        """
+        results = dict(initial or {})
+        unknown = {d for _, deps in self.stages.values() for d in deps if d not in self.stages and d not in results}
+        if unknown:
+            raise ValueError(f"Pipeline dependencies are neither stages nor inputs: {sorted(unknown)}")
+        timings = {name: {"status": "done", "start": 0.0, "seconds": 0.0, "resumed": True} for name in results}
+        pending = [name for name in self.stages if name not in results]
+        running = {}
+        run_start = time.time()
+
+        def notify(name, status, result=None):
+            if on_stage:
+                try:
+                    on_stage(name, status, result)
+                except Exception as e:
+                    logging.error(f"on_stage callback failed for '{name}': {e}", exc_info=True)
+
+        def timed(name, fn, kwargs):
+            start = time.time()
+            try:
+                return fn(**kwargs)
+            finally:
+                timings[name] = {"start": round(start - run_start, 3), "seconds": round(time.time() - start, 3)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in list(pending):
+                    fn, deps = self.stages[name]
+                    if any(timings.get(d, {}).get("status") in ("failed", "skipped", "cancelled") for d in deps):
+                        pending.remove(name)
+                        timings[name] = {"status": "skipped", "start": None, "seconds": 0.0}
+                        notify(name, "skipped")
+                    elif all(d in results for d in deps):
+                        pending.remove(name)
+                        if cancel_event is not None and cancel_event.is_set():
+                            timings[name] = {"status": "cancelled", "start": None, "seconds": 0.0}
+                            notify(name, "cancelled")
+                            continue
+                        notify(name, "running")
+                        running[executor.submit(timed, name, fn, {d: results[d] for d in deps})] = name
+
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        timings[name]["status"] = "done"
+                        notify(name, "done", results[name])
+                    except Exception as e:
+                        timings[name]["status"] = "failed"
+                        timings[name]["error"] = str(e)
+                        logging.error(f"Pipeline stage '{name}' failed: {e}", exc_info=not isinstance(e, StageFailed))
+                        notify(name, "failed")
+
+        timings["_total"] = {"seconds": round(time.time() - run_start, 3)}
+        return results, timings
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {"runs": 0, "wall_seconds": 0.0, "stage_seconds_sum": 0.0, "stages": {}}
+
+
+def record_run(timings: dict) -> None:
+    """Aggregate per-stage timings; `stage_seconds_sum / wall_seconds` > 1 is the overlap gained."""
+    with _stats_lock:
+        _stats["runs"] += 1
+        _stats["wall_seconds"] += timings.get("_total", {}).get("seconds", 0.0)
+        for name, timing in timings.items():
+            if name == "_total" or timing.get("resumed"):
+                continue
+            stage = _stats["stages"].setdefault(name, {"runs": 0, "failed": 0, "seconds": 0.0})
+            stage["runs"] += 1
+            stage["failed"] += int(timing.get("status") == "failed")
+            stage["seconds"] += timing.get("seconds", 0.0)
+            _stats["stage_seconds_sum"] += timing.get("seconds", 0.0)
+
+
+def pipeline_stats() -> dict:
+    with _stats_lock:
+        runs = _stats["runs"]
+        return {
+            "runs": runs,
+            "avg_wall_seconds": round(_stats["wall_seconds"] / runs, 3) if runs else 0.0,
+            "avg_stage_seconds_sum": round(_stats["stage_seconds_sum"] / runs, 3) if runs else 0.0,
+            "stages": {
+                name: {**stage, "seconds": round(stage["seconds"], 3),
+                       "avg_seconds": round(stage["seconds"] / stage["runs"], 3) if stage["runs"] else 0.0}
+                for name, stage in _stats["stages"].items()
+            },
+        }
@@ -0,0 +1,64 @@
+# --- utils/render_profiles.py ---
+# Named output profiles: frame size, frame rate and x264 settings per use case.
+# "draft" is for previews, where a fast encode matters more than picture quality.
+import os
+import threading
+
+RENDER_PROFILES = {
+    "draft": {"size": (640, 360), "fps": 15, "preset": "ultrafast", "crf": 32},
+    "standard": {"size": (1280, 720), "fps": 24, "preset": "medium", "crf": 23},
+    "high": {"size": (1920, 1080), "fps": 30, "preset": "slow", "crf": 18},
+}
+VIDEO_RENDER_PROFILE = os.getenv("VIDEO_RENDER_PROFILE", "standard")
+VIDEO_RENDER_THREADS = int(os.getenv("VIDEO_RENDER_THREADS", "4"))
+# Layout constants (font sizes, stroke) are designed for this frame height
+BASE_FRAME_HEIGHT = 720
+
+
+def get_profile(name: str | None) -> dict:
+    """Profile settings by name (default VIDEO_RENDER_PROFILE); raises ValueError for unknown names."""
+    name = (name or VIDEO_RENDER_PROFILE).lower()
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}', expected one of {sorted(RENDER_PROFILES)}")
+    return {"name": name, **RENDER_PROFILES[name], "threads": VIDEO_RENDER_THREADS}
+
+
+def render_report(profile: dict, engine: str, render_seconds: float, size_bytes: int, duration: float) -> dict:
+    return {
+        "profile": profile["name"],
+        "engine": engine,
+        "resolution": f"{profile['size'][0]}x{profile['size'][1]}",
+        "fps": profile["fps"],
+        "duration_seconds": round(duration, 2),
+        "render_seconds": round(render_seconds, 2),
+        "size_bytes": size_bytes,
+        "bitrate_kbps": round(size_bytes * 8 / duration / 1000, 1) if duration else 0.0,
+    }
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def record_render(report: dict) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(report["profile"], {"renders": 0, "render_seconds": 0.0, "video_seconds": 0.0, "bytes": 0})
+        stats["renders"] += 1
+        stats["render_seconds"] += report["render_seconds"]
+        stats["video_seconds"] += report["duration_seconds"]
+        stats["bytes"] += report["size_bytes"]
+
+
+def render_profile_stats() -> dict:
+    with _stats_lock:
+        return {
+            name: {
+                "renders": stats["renders"],
+                "avg_render_seconds": round(stats["render_seconds"] / stats["renders"], 2),
+                "realtime_factor": round(stats["video_seconds"] / stats["render_seconds"], 2) if stats["render_seconds"] else 0.0,
+                "avg_size_bytes": round(stats["bytes"] / stats["renders"]),
+                "avg_bitrate_kbps": round(stats["bytes"] * 8 / stats["video_seconds"] / 1000, 1) if stats["video_seconds"] else 0.0,
+            }
+            for name, stats in _stats.items()
+        }
@@ -0,0 +1,66 @@
+# --- utils/render_timeline.py ---
+# Engine-independent description of a video: which layer is shown where and when.
+# MoviePy and the ffmpeg filtergraph renderer both consume the same layer list.
+import os
+
+FADE_SECONDS = 0.5
+GRAPHIC_HEIGHT_RATIO = 0.8   # images are scaled to 80% of the frame height
+CAPTION_TOP_RATIO = 0.7      # captions start at 70% of the frame height (moved up if they would not fit)
+
+
+def part_end_times(script_parts_text, part_timings, total_duration):
+    """End time of every part from the SSML `part_{i}_end` marks, else an even split."""
+    num_parts = len(script_parts_text)
+    if part_timings and isinstance(part_timings, list):
+        timings = []
+        for i in range(num_parts):
+            mark_name = f"part_{i}_end"
+            timings.append(next((time for mark, time in part_timings if mark == mark_name), None))
+        return timings
+    return [total_duration * (i + 1) / num_parts for i in range(num_parts)]
+
+
+def build_timeline(graphic_filepaths, script_parts_text, part_timings, total_duration, title_duration=2.0):
+    """
+    Layers in compositing order (later layers are drawn on top):
+    {"kind": "title" | "graphic" | "caption", "part": i, "start": s, "duration": d, "text" | "path": ...}
+    Each part shows a "Part N" title card, then its graphic and caption until the part's end mark.
+    The first graphic stays on screen for the whole video (after the first title) as a backdrop.
+    Missing graphics (None or not on disk) are left out.
+    """
+    timings = part_end_times(script_parts_text, part_timings, total_duration)
+    graphic_filepaths = list(graphic_filepaths or [])
+    graphic_filepaths += [None] * (len(script_parts_text) - len(graphic_filepaths))
+
+    layers = []
+    part_start_time = 0.0
+    for i, script_part in enumerate(script_parts_text):
+        layers.append({"kind": "title", "part": i, "start": part_start_time, "duration": title_duration,
+                       "text": f"Part {i+1}"})
+
+        content_start_time = part_start_time + title_duration
+        part_end_time = timings[i] if (i < len(timings) and timings[i] is not None) else total_duration
+        content_duration = max(0.1, part_end_time - content_start_time)
+
+        graphic_path = graphic_filepaths[i]
+        if graphic_path and os.path.exists(graphic_path):
+            if i == 0:
+                layers.append({"kind": "graphic", "part": i, "start": title_duration,
+                               "duration": total_duration - title_duration, "path": graphic_path})
+            else:
+                layers.append({"kind": "graphic", "part": i, "start": content_start_time,
+                               "duration": content_duration, "path": graphic_path})
+
+        layers.append({"kind": "caption", "part": i, "start": content_start_time, "duration": content_duration,
+                       "text": script_part})
+        part_start_time = part_end_time
+    return layers
+
+
+def text_position(kind: str, size, frame_size) -> tuple[int, int]:
+    """Top-left pixel position of a rasterized title/caption layer of `size` in a `frame_size` frame."""
+    (w, h), (frame_w, frame_h) = size, frame_size
+    x = (frame_w - w) // 2
+    if kind == "caption":
+        return x, max(0, min(int(frame_h * CAPTION_TOP_RATIO), frame_h - h))
+    return x, (frame_h - h) // 2
@@ -12,6 +12,8 @@ from langchain_core.prompts import PromptTemplate
 import vertexai
 from langchain_google_vertexai import ChatVertexAI, HarmBlockThreshold, HarmCategory
 from requests.exceptions import RequestException
+from pydantic import BaseModel
+from utils.structured_output import invoke_structured, StructuredOutputError
 
 load_dotenv()
 
@@ -47,6 +49,14 @@ llm = ChatVertexAI(
 
 app = Flask(__name__)
 
+class ScriptPart(BaseModel):
+    # Required, so response_schema makes the model write both fields for every part
+    part_text: str
+    image_prompt: str
+
+class VideoScript(BaseModel):
+    script_parts: list[ScriptPart]
+
 def create_script_and_image_prompts( summary_json_str: str, language: str = "en", category: str = "business" ) -> tuple[list[str] | None, list[str] | None]:
     """
     Generates a full video script (as parts) AND a list of corresponding image prompts
@@ -150,40 +160,20 @@ def create_script_and_image_prompts( summary_json_str: str, language: str = "en"
 
     # --- 3. Call the LLM and Process the Response ---
     try:
-        # Use the globally defined 'llm' client
-        response = llm.invoke(prompt_to_use)
-
-        script_data_text = getattr(response, "content", None) or getattr(response, "text", None)
-        logging.info(f"Raw LLM response: {script_data_text}")
-        if not script_data_text or not script_data_text.strip():
-            logging.warning("LLM returned empty response for script/prompts.")
-            return None, None
-
-        # Pre-process: Remove code fences and markdown
-        cleaned_text = script_data_text.strip()
-        cleaned_text = re.sub(r"^```[a-zA-Z]*\\s*", "", cleaned_text)
-        cleaned_text = re.sub(r"```\\s*$", "", cleaned_text)
-        cleaned_text = cleaned_text.strip()
-
-        # Extract JSON object
-        json_match = re.search(r"\{.*\}", cleaned_text, re.DOTALL)
-        if not json_match:
-            logging.warning(f"Failed to find valid JSON in LLM response: {cleaned_text}")
-            return None, None
-
+        # Use the globally defined 'llm' client; the reply is constrained to the VideoScript schema
         try:
-            script_data = json.loads(json_match.group(0))
-        except Exception as json_err:
-            logging.warning(f"JSON decode error: {json_err}\nRaw JSON: {json_match.group(0)}")
+            script_data = invoke_structured(llm, prompt_to_use, VideoScript, "video_script")
+        except StructuredOutputError as e:
+            logging.warning(f"{e}\nRaw LLM response: {e.raw}")
             return None, None
 
         # Now, extract the data into two parallel lists
         script_parts = []
         image_prompts = []
 
-        for part in script_data.get("script_parts", []):
-            script_text = part.get("part_text")
-            image_prompt = part.get("image_prompt")
+        for part in script_data.script_parts:
+            script_text = part.part_text
+            image_prompt = part.image_prompt
 
             # Ensure both parts exist before adding
             if script_text and image_prompt:
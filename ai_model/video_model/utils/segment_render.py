@@ -0,0 +1,81 @@
+# --- utils/segment_render.py ---
+# Segment-parallel rendering: the timeline is cut at part boundaries, every part is encoded as
+# a silent H.264 segment in its own process, and the segments are joined with stream copy.
+import os
+import shutil
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from utils.ffmpeg_render import render_timeline_ffmpeg, concat_segments
+from utils.moviepy_render import render_timeline_moviepy
+
+# Processes used for one render; 0 or 1 renders the whole timeline in a single pass
+VIDEO_SEGMENT_WORKERS = int(os.getenv("VIDEO_SEGMENT_WORKERS", "0"))
+
+
+def _snap(t: float, fps: int) -> float:
+    return round(t * fps) / fps
+
+
+def segment_bounds(layers, total_duration: float, fps: int) -> list[tuple[float, float]]:
+    """(start, end) per part, cut where each part's title card starts, on the frame grid."""
+    cuts = sorted({_snap(layer["start"], fps) for layer in layers if layer["kind"] == "title"} | {0.0})
+    end = _snap(total_duration, fps)
+    cuts = [c for c in cuts if c < end]
+    return list(zip(cuts, cuts[1:] + [end]))
+
+
+def slice_layers(layers, start: float, end: float, fps: int) -> list[dict]:
+    """
+    Layers visible in [start, end), re-timed relative to `start`. A layer cut by a segment
+    boundary (the first graphic, which backs the whole video) loses its fade on that side only.
+    """
+    sliced = []
+    for layer in layers:
+        layer_start = _snap(layer["start"], fps)
+        layer_end = _snap(layer["start"] + layer["duration"], fps)
+        if layer_end <= start or layer_start >= end:
+            continue
+        clipped_start, clipped_end = max(layer_start, start), min(layer_end, end)
+        sliced.append({
+            **layer,
+            "start": clipped_start - start,
+            "duration": clipped_end - clipped_start,
+            "fade_in": layer.get("fade_in", True) and layer_start >= start,
+            "fade_out": layer.get("fade_out", True) and layer_end <= end,
+        })
+    return sliced
+
+
+def _render_segment(engine, layers, duration, output_path, encode_options):
+    """Process-pool entry point: one silent segment."""
+    if engine == "ffmpeg":
+        return render_timeline_ffmpeg(layers, None, duration, output_path, **encode_options)
+    return render_timeline_moviepy(layers, None, duration, output_path, **encode_options)
+
+
+def render_segments(layers, audio_filepath, total_duration, output_path, engine="moviepy",
+                    workers=VIDEO_SEGMENT_WORKERS, size=(1280, 720), fps=24, preset="medium", crf=None) -> str:
+    """
+    Render every part in its own process, then concatenate with stream copy and mux the audio.
+    Segments share encoder settings, so the joined stream is valid without re-encoding.
+    """
+    bounds = segment_bounds(layers, total_duration, fps)
+    workers = max(1, min(workers, len(bounds)))
+    encode_options = {"size": size, "fps": fps, "preset": preset, "crf": crf,
+                      "threads": max(1, (os.cpu_count() or 1) // workers)}
+    segment_dir = tempfile.mkdtemp(prefix="segments_", dir=os.path.dirname(os.path.abspath(output_path)))
+    logging.info(f"Rendering {len(bounds)} segments with {engine} on {workers} processes")
+    try:
+        # spawn: forking a threaded gunicorn/job worker can deadlock the child
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                pool.submit(_render_segment, engine, slice_layers(layers, start, end, fps), end - start,
+                            os.path.join(segment_dir, f"segment_{i:03d}.mp4"), encode_options)
+                for i, (start, end) in enumerate(bounds)
+            ]
+            segment_paths = [future.result() for future in futures]
+        return concat_segments(segment_paths, audio_filepath, total_duration, output_path)
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
@@ -0,0 +1,153 @@
+# --- utils/stock_images.py ---
+# Pexels client shared by all image workers: one keep-alive connection pool, a TTL cache of
+# search results, throttling from the rate-limit headers and size-capped streamed downloads.
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+import requests
+from requests.adapters import HTTPAdapter
+
+PEXELS_SEARCH_URL = "https://api.pexels.com/v1/search"
+
+# ------------------- Configuration -------------------
+PEXELS_POOL_SIZE = int(os.getenv("PEXELS_POOL_SIZE", "8"))  # concurrent downloads share this pool
+PEXELS_SEARCH_TTL_SECONDS = int(os.getenv("PEXELS_SEARCH_TTL_SECONDS", "21600"))
+PEXELS_SEARCH_CACHE_SIZE = int(os.getenv("PEXELS_SEARCH_CACHE_SIZE", "1024"))
+# Start spacing out searches when fewer requests than this are left in the window
+PEXELS_RATE_LIMIT_RESERVE = int(os.getenv("PEXELS_RATE_LIMIT_RESERVE", "20"))
+# Longest a search may wait for quota; beyond that it is skipped and the caller falls back
+PEXELS_MAX_THROTTLE_SECONDS = float(os.getenv("PEXELS_MAX_THROTTLE_SECONDS", "10"))
+PEXELS_MAX_DOWNLOAD_MB = int(os.getenv("PEXELS_MAX_DOWNLOAD_MB", "15"))
+
+
+class PexelsClient:
+    def __init__(self, api_key: str | None, pool_size: int = PEXELS_POOL_SIZE):
+        self.api_key = api_key
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._downloads = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._searches = OrderedDict()  # (query, locale, per_page) -> (expires_at, urls)
+        self._remaining = None  # from X-Ratelimit-Remaining / X-Ratelimit-Reset
+        self._reset_at = 0.0
+        self._stats = {"searches": 0, "search_cache_hits": 0, "throttled_seconds": 0.0, "skipped_for_quota": 0,
+                       "rate_limited": 0, "downloads": 0, "download_bytes": 0, "oversize_downloads": 0}
+
+    def _count(self, name: str, amount=1) -> None:
+        with self._lock:
+            self._stats[name] += amount
+
+    # ------------------- Rate limiting -------------------
+    def _update_rate_limit(self, response) -> None:
+        remaining = response.headers.get("X-Ratelimit-Remaining")
+        reset = response.headers.get("X-Ratelimit-Reset")
+        with self._lock:
+            if remaining is not None and remaining.isdigit():
+                self._remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                self._reset_at = float(reset)
+            if response.status_code == 429:
+                self._remaining = 0
+
+    def _throttle(self) -> bool:
+        """Wait for quota when it runs low; False when the wait would exceed PEXELS_MAX_THROTTLE_SECONDS."""
+        with self._lock:
+            remaining, window_left = self._remaining, self._reset_at - time.time()
+            if remaining is None or remaining > PEXELS_RATE_LIMIT_RESERVE or window_left <= 0:
+                return True
+            # Spread what is left over the rest of the window; wait for the reset when nothing is left
+            wait = window_left if remaining <= 0 else window_left / remaining
+            if wait > PEXELS_MAX_THROTTLE_SECONDS:
+                self._stats["skipped_for_quota"] += 1
+                return False
+            self._remaining = max(0, remaining - 1)  # reserve our request before sleeping
+            self._stats["throttled_seconds"] += wait
+        logging.info(f"Pexels quota low ({remaining} left), waiting {wait:.1f}s")
+        time.sleep(wait)
+        return True
+
+    # ------------------- Search -------------------
+    def search(self, query: str, per_page: int = 1, locale: str = "en") -> list[str]:
+        """Image URLs for `query`; identical searches within the TTL are served from memory."""
+        if not self.api_key:
+            logging.error("PEXELS_API_KEY not set. Cannot search stock images.")
+            return []
+        key = (" ".join(query.split()).lower(), (locale or "").lower(), per_page)
+        with self._lock:
+            cached = self._searches.get(key)
+            if cached and cached[0] > time.time():
+                self._searches.move_to_end(key)
+                self._stats["search_cache_hits"] += 1
+                return list(cached[1])
+
+        if not self._throttle():
+            logging.warning(f"Pexels quota exhausted until reset, skipping search for '{query}'")
+            return []
+        self._count("searches")
+        response = self.session.get(PEXELS_SEARCH_URL, headers={"Authorization": self.api_key},
+                                    params={"query": query, "per_page": per_page, "locale": locale}, timeout=10)
+        self._update_rate_limit(response)
+        if response.status_code == 429:
+            self._count("rate_limited")
+        response.raise_for_status()
+        photos = response.json().get("photos", [])
+        urls = [p["src"].get("large") or p["src"].get("original") for p in photos if p.get("src")]
+        urls = [url for url in urls if url]
+
+        with self._lock:
+            self._searches[key] = (time.time() + PEXELS_SEARCH_TTL_SECONDS, urls)
+            self._searches.move_to_end(key)
+            while len(self._searches) > PEXELS_SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        return list(urls)
+
+    # ------------------- Download -------------------
+    def download(self, url: str, output_filepath: str, max_bytes: int = PEXELS_MAX_DOWNLOAD_MB * 1024 * 1024) -> bool:
+        """
+        Stream `url` to `output_filepath` over the pooled session. Anything that is not an image
+        or is larger than `max_bytes` is rejected without being read in full.
+        """
+        with self._downloads, self.session.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            content_type = response.headers.get("content-type", "").lower()
+            if not content_type.startswith("image/"):
+                logging.warning(f"URL content is not an image (Content-Type: {content_type}): {url}")
+                return False
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > max_bytes:
+                self._count("oversize_downloads")
+                logging.warning(f"Image at {url} is {int(declared)} bytes, over the {max_bytes} byte cap")
+                return False
+
+            written = 0
+            with open(output_filepath, "wb") as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    written += len(chunk)
+                    if written > max_bytes:
+                        break
+                    f.write(chunk)
+        if written > max_bytes:
+            self._count("oversize_downloads")
+            logging.warning(f"Image at {url} exceeded the {max_bytes} byte cap, discarded")
+            os.remove(output_filepath)
+            return False
+        with self._lock:
+            self._stats["downloads"] += 1
+            self._stats["download_bytes"] += written
+        return True
+
+    # ------------------- Metrics -------------------
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._stats["searches"] + self._stats["search_cache_hits"]
+            return {
+                **self._stats,
+                "throttled_seconds": round(self._stats["throttled_seconds"], 2),
+                "search_cache_hit_rate": round(self._stats["search_cache_hits"] / lookups, 4) if lookups else 0.0,
+                "rate_limit_remaining": self._remaining,
+                "cached_searches": len(self._searches),
+            }
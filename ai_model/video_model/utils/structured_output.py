@@ -0,0 +1,145 @@
+# --- utils/structured_output.py ---
+# Schema-constrained JSON calls to Gemini. Each service builds its own image, so this module
+# is kept identical in document_model, summary_model, mindmap_model and video_model.
+import re
+import json
+import time
+import logging
+import threading
+from pydantic import BaseModel, ValidationError
+
+
+class StructuredOutputError(ValueError):
+    """Model output was not valid JSON or did not match the expected schema. `raw` holds the text."""
+
+    def __init__(self, message: str, raw: str = ""):
+        super().__init__(message)
+        self.raw = raw
+
+
+# ------------------- Schemas -------------------
+def response_schema(model: type[BaseModel], max_depth: int = 4) -> dict:
+    """
+    Convert a pydantic model into the OpenAPI subset accepted by Vertex `response_schema`:
+    $refs are inlined, titles/defaults dropped and Optional[...] becomes `nullable`.
+    Vertex cannot express recursion, so self-referencing models are unrolled `max_depth` levels.
+    """
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def convert(node, seen):
+        if "$ref" in node:
+            name = node["$ref"].split("/")[-1]
+            if seen.count(name) >= max_depth:
+                return None
+            return convert(defs[name], seen + [name])
+
+        if "anyOf" in node:
+            options = [option for option in node["anyOf"] if option.get("type") != "null"]
+            converted = [c for c in (convert(option, seen) for option in options) if c is not None]
+            if not converted:
+                return None
+            out = converted[0] if len(converted) == 1 else {"anyOf": converted}
+            if len(options) < len(node["anyOf"]):
+                out["nullable"] = True
+            return out
+
+        out = {key: node[key] for key in ("type", "description", "enum", "format") if key in node}
+        if "const" in node:
+            out.update(type="string", enum=[node["const"]])
+
+        if node.get("type") == "object" and "properties" in node:
+            properties = {}
+            for key, value in node["properties"].items():
+                converted = convert(value, seen)
+                if converted is not None:
+                    properties[key] = converted
+            out["properties"] = properties
+            required = [key for key in node.get("required", []) if key in properties]
+            if required:
+                out["required"] = required
+        elif node.get("type") == "array":
+            items = convert(node.get("items", {"type": "string"}), seen)
+            if items is None:
+                return None
+            out["items"] = items
+        return out
+
+    return convert(schema, [])
+
+
+# ------------------- Calls -------------------
+def _loads(text: str):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # JSON mode never fences its output, but older client versions may ignore the setting
+        unfenced = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", text.strip())
+        return json.loads(unfenced)
+
+
+def invoke_structured(llm, prompt: str, model: type[BaseModel], endpoint: str, send_schema: bool = True,
+                      max_depth: int = 4):
+    """
+    Call Gemini in JSON mode and validate the reply into `model`.
+
+    With `send_schema` the pydantic schema is passed as `response_schema`, so the reply is
+    constrained at decode time; without it only JSON mode is used (for free-form JSON such as
+    the category summary templates) and the model is applied as validation. Recursive models
+    are unrolled `max_depth` levels in the schema.
+    Raises StructuredOutputError; parse and validation failures are counted per `endpoint`.
+    """
+    kwargs = {"response_mime_type": "application/json"}
+    if send_schema:
+        kwargs["response_schema"] = response_schema(model, max_depth)
+
+    start = time.time()
+    response = llm.invoke(prompt, **kwargs)
+    latency = time.time() - start
+    raw = response.content if isinstance(response.content, str) else str(response.content)
+    usage = getattr(response, "usage_metadata", None) or {}
+
+    try:
+        data = _loads(raw)
+    except json.JSONDecodeError as e:
+        record_call(endpoint, latency, usage.get("output_tokens", 0), "parse_failure")
+        raise StructuredOutputError(f"{endpoint}: model output is not valid JSON ({e})", raw) from e
+
+    try:
+        result = model.model_validate(data)
+    except ValidationError as e:
+        record_call(endpoint, latency, usage.get("output_tokens", 0), "validation_failure")
+        raise StructuredOutputError(f"{endpoint}: model output does not match {model.__name__} ({e.error_count()} errors)", raw) from e
+
+    record_call(endpoint, latency, usage.get("output_tokens", 0), "ok")
+    return result
+
+
+# ------------------- Metrics -------------------
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def record_call(endpoint: str, latency: float, output_tokens: int, outcome: str) -> None:
+    if outcome != "ok":
+        logging.warning(f"[StructuredOutput] {endpoint}: {outcome.replace('_', ' ')}")
+    with _stats_lock:
+        stats = _stats.setdefault(endpoint, {"calls": 0, "ok": 0, "parse_failure": 0, "validation_failure": 0,
+                                             "output_tokens": 0, "latency_seconds": 0.0})
+        stats["calls"] += 1
+        stats[outcome] += 1
+        stats["output_tokens"] += output_tokens
+        stats["latency_seconds"] += latency
+
+
+def structured_output_stats() -> dict:
+    with _stats_lock:
+        return {
+            endpoint: {
+                **stats,
+                "latency_seconds": round(stats["latency_seconds"], 3),
+                "avg_output_tokens": round(stats["output_tokens"] / stats["calls"], 1),
+                "failure_rate": round((stats["parse_failure"] + stats["validation_failure"]) / stats["calls"], 4),
+            }
+            for endpoint, stats in _stats.items()
+        }
@@ -0,0 +1,180 @@
+# --- utils/text_layers.py ---
+# Title cards and captions rasterized with Pillow into transparent PNGs. Both render engines
+# (MoviePy and ffmpeg) overlay the same images, so their text looks identical.
+import os
+import re
+import json
+import math
+import time
+import uuid
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFont
+
+TITLE_STYLE = {"font_size": 90, "color": "yellow", "stroke_color": None, "stroke_width": 0, "max_width": 0.9}
+CAPTION_STYLE = {"font_size": 40, "color": "white", "stroke_color": "black", "stroke_width": 2, "max_width": 0.85}
+LINE_SPACING = 6
+PADDING = 4
+
+# ------------------- Configuration -------------------
+TEXT_LAYER_CACHE_DIR = os.getenv("TEXT_LAYER_CACHE_DIR", os.path.join(tempfile.gettempdir(), "know_your_terms_text_layers"))
+TEXT_LAYER_CACHE_MAX_MB = int(os.getenv("TEXT_LAYER_CACHE_MAX_MB", "64"))
+
+
+def _load_font(font_path: str, font_size: int):
+    try:
+        return ImageFont.truetype(font_path, font_size)
+    except OSError:
+        logging.warning(f"Font not found at {font_path}, using Pillow's default font")
+        return ImageFont.load_default(font_size)
+
+
+def _wrap(text: str, font, max_width: int) -> list[str]:
+    """Greedy word wrap on rendered pixel width (a single long word is never split)."""
+    lines = []
+    for paragraph in str(text).splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}".strip()
+            if not line or font.getlength(candidate) <= max_width:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+    return lines
+
+
+def render_text_layer(text: str, font_path: str, font_size: int, color, max_width: int,
+                      stroke_color=None, stroke_width: int = 0) -> Image.Image:
+    """Centered, word-wrapped text on a transparent RGBA image cropped to the text."""
+    font = _load_font(font_path, font_size)
+    wrapped = "\n".join(_wrap(text, font, max_width))
+    options = {"font": font, "spacing": LINE_SPACING, "align": "center", "stroke_width": stroke_width}
+
+    left, top, right, bottom = ImageDraw.Draw(Image.new("RGBA", (1, 1))).multiline_textbbox((0, 0), wrapped, **options)
+    left, top = math.floor(left), math.floor(top)
+    image = Image.new("RGBA", (math.ceil(right) - left + 2 * PADDING, math.ceil(bottom) - top + 2 * PADDING), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(
+        (PADDING - left, PADDING - top), wrapped, fill=color, stroke_fill=stroke_color, **options
+    )
+    return image
+
+
+def scale_style(style: dict, scale: float) -> dict:
+    """Style for a frame `scale` times the 720p height the styles are designed for."""
+    if scale == 1:
+        return style
+    return {**style, "font_size": max(8, round(style["font_size"] * scale)),
+            "stroke_width": max(1, round(style["stroke_width"] * scale)) if style["stroke_width"] else 0}
+
+
+# ------------------- Raster cache -------------------
+class TextLayerCache:
+    """
+    Rasterized text layers as PNG files keyed by everything that affects the pixels (text, font,
+    size, colours, stroke, wrap width). "Part N" title cards are identical in every video and
+    captions repeat across re-renders and job retries, so each is rasterized once.
+
+    The directory is shared by all renders (and processes); least recently used files are evicted
+    beyond `max_bytes`, except files used within `min_age_seconds`, which a running render may
+    still be about to read.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, min_age_seconds: int = 600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.min_age_seconds = min_age_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (path, (width, height), bytes, last_used)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_seconds = 0.0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        # Re-index files left by earlier runs, oldest first; the size is part of the file name
+        files = []
+        for name in os.listdir(cache_dir):
+            match = re.fullmatch(r"([0-9a-f]{40})_(\d+)x(\d+)\.png", name)
+            if match:
+                path = os.path.join(cache_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, match.group(1), path, (int(match.group(2)), int(match.group(3))), stat.st_size))
+        for mtime, key, path, size, nbytes in sorted(files):
+            self._entries[key] = (path, size, nbytes, mtime)
+
+    @staticmethod
+    def key_for(text: str, style: dict, font_path: str, max_width: int) -> str:
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(json.dumps(
+            [str(text), font_path, style["font_size"], style["color"], style["stroke_color"], style["stroke_width"],
+             max_width, LINE_SPACING, PADDING], ensure_ascii=False
+        ).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_or_render(self, text: str, style: dict, font_path: str, frame_width: int) -> tuple[str, tuple[int, int]]:
+        max_width = int(frame_width * style["max_width"])
+        key = self.key_for(text, style, font_path, max_width)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and os.path.exists(entry[0]):
+                self._entries[key] = (*entry[:3], now)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        start = time.time()
+        image = render_text_layer(text, font_path, style["font_size"], style["color"], max_width,
+                                  style["stroke_color"], style["stroke_width"])
+        path = os.path.join(self.cache_dir, f"{key}_{image.size[0]}x{image.size[1]}.png")
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, path)  # atomic: concurrent renders never see a partial file
+
+        with self._lock:
+            self.render_seconds += time.time() - start
+            self._entries[key] = (path, image.size, os.path.getsize(path), now)
+            self._entries.move_to_end(key)
+            self._evict_locked()
+        return path, image.size
+
+    def _evict_locked(self) -> None:
+        total = sum(entry[2] for entry in self._entries.values())
+        cutoff = time.time() - self.min_age_seconds
+        for key in list(self._entries):
+            if total <= self.max_bytes:
+                break
+            path, _, nbytes, last_used = self._entries[key]
+            if last_used > cutoff:
+                break  # the rest are even more recent
+            del self._entries[key]
+            total -= nbytes
+            self.evictions += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # ------------------- Metrics -------------------
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(entry[2] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_render_ms": round(1000 * self.render_seconds / self.misses, 1) if self.misses else 0.0,
+            }
+
+
+text_layer_cache = TextLayerCache(TEXT_LAYER_CACHE_DIR, TEXT_LAYER_CACHE_MAX_MB * 1024 * 1024)
@@ -1,22 +1,25 @@
 # --- utils/video_assembly.py ---
 import os
 import logging
+import time
 import uuid
+import shutil
+import tempfile
 from google.cloud import storage
-from moviepy import (
-    VideoFileClip,
-    TextClip,
-    CompositeVideoClip,
-    ImageClip,
-    AudioFileClip,
-    ColorClip,
-    concatenate_videoclips,
-)
-from moviepy.video.fx import FadeIn, FadeOut
+from utils.render_timeline import build_timeline, GRAPHIC_HEIGHT_RATIO
+from utils.image_assets import image_asset_store
+from utils.image_normalize import normalize_graphics, VIDEO_NORMALIZE_IMAGES
+from utils.text_layers import text_layer_cache, scale_style, TITLE_STYLE, CAPTION_STYLE
+from utils.render_profiles import get_profile, render_report, record_render, BASE_FRAME_HEIGHT
+from utils.ffmpeg_render import probe_duration, render_timeline_ffmpeg
+from utils.moviepy_render import render_timeline_moviepy
+from utils.segment_render import render_segments, VIDEO_SEGMENT_WORKERS
 
 # GCS config (reuse from image_generation)
 GCS_BUCKET_NAME = os.getenv("STORAGE_BUCKET_NAME")
 GCS_VIDEO_URL_FORMAT = "https://storage.googleapis.com/{bucket}/{filename}"
+# "moviepy" composites frames in Python; "ffmpeg" compiles the same timeline into one filtergraph
+VIDEO_RENDER_ENGINE = os.getenv("VIDEO_RENDER_ENGINE", "moviepy")
 
 def upload_video_to_gcs(local_path: str, gcs_filename: str) -> str | None:
     """Uploads a file to GCS and returns its public URL."""
@@ -32,9 +35,6 @@ def upload_video_to_gcs(local_path: str, gcs_filename: str) -> str | None:
         logging.error(f"Failed to upload {local_path} to GCS: {e}", exc_info=True)
         return None
 
-# Define a standard video size
-VIDEO_SIZE = (1280, 720)  # 720p
-
 
 def _delete_file_safe(filepath):
     try:
@@ -42,6 +42,15 @@ def _delete_file_safe(filepath):
     except Exception:
         pass
 
+def cleanup_render_inputs(graphic_filepaths, audio_filepath):
+    """Remove only the images and audio used for one video; the placeholder and stored assets are shared."""
+    used_image_files = [p for p in (graphic_filepaths or []) if p and os.path.isfile(p)
+                        and not p.endswith("default_placeholder.png") and not image_asset_store.owns(p)]
+    for img_fp in used_image_files:
+        _delete_file_safe(img_fp)
+    if audio_filepath and os.path.isfile(audio_filepath):
+        _delete_file_safe(audio_filepath)
+
 def assemble_video_with_titles(
     graphic_filepaths,
     audio_filepath,
@@ -51,152 +60,97 @@ def assemble_video_with_titles(
     base_output_path="video.mp4",
     title_duration=2.0,
     video_background=None,  # Optional: path to a video background
+    upload=True,
+    cleanup_inputs=True,
+    engine=None,
+    segment_workers=None,
+    normalize_images=None,
+    profile=None,
+    report=None,
 ) -> str | None:
     """
-    Combines graphics, audio, title cards, and text overlays into a video using MoviePy v2.x.
+    Combines graphics, audio, title cards, and text overlays into a video using MoviePy v2.x
+    or a single ffmpeg filtergraph (same timeline and text layers).
     Uses part timings from SSML marks if provided.
     base_output_path: The base filename for the video (will be made unique).
+    upload: upload to GCS and return the URL; with False the local file path is returned
+            (the pipeline uploads in its own stage).
+    cleanup_inputs: delete the images and audio afterwards; video jobs pass False so a failed
+            render can be retried from the checkpointed inputs.
+    engine: "moviepy" or "ffmpeg" (default VIDEO_RENDER_ENGINE).
+    segment_workers: render each part in its own process and join them with stream copy
+            (default VIDEO_SEGMENT_WORKERS; 0 or 1 renders in a single pass).
+    normalize_images: resize every graphic once to its on-screen size before rendering
+            (default VIDEO_NORMALIZE_IMAGES).
+    profile: render profile name, "draft" | "standard" | "high" (default VIDEO_RENDER_PROFILE).
+    report: optional dict that receives the render report (profile, render time, size, bitrate).
     """
-    all_clips_to_composite = []
-
     # Make output_path unique
     base, ext = os.path.splitext(base_output_path)
     unique_id = uuid.uuid4().hex[:8]
     unique_output_path = f"{base}_{unique_id}{ext}"
+    engine = (engine or VIDEO_RENDER_ENGINE).lower()
+    profile = get_profile(profile)
+    video_size = profile["size"]
+    encode_options = {"size": video_size, "fps": profile["fps"], "preset": profile["preset"], "crf": profile["crf"]}
+    segment_workers = VIDEO_SEGMENT_WORKERS if segment_workers is None else segment_workers
+    normalize_images = VIDEO_NORMALIZE_IMAGES if normalize_images is None else normalize_images
+    graphics_dir = tempfile.mkdtemp(prefix="graphics_")
 
     try:
-        # ...existing code...
-        # 1. Load Audio
+        # 1. Audio duration drives the timeline
         logging.info(f"Loading audio: {audio_filepath}")
-        audio_clip = AudioFileClip(audio_filepath)
-        total_duration = audio_clip.duration
+        total_duration = probe_duration(audio_filepath)
         logging.info(f"Audio duration: {total_duration:.2f}s")
 
-        # 2. Always use white background
-        background_clip = ColorClip(
-            size=VIDEO_SIZE, color=(255, 255, 255), duration=total_duration
-        )
-        all_clips_to_composite.append(background_clip)
-
-        # 3. Prepare timings
-        num_parts = len(script_parts_text)
-        if part_timings and isinstance(part_timings, list):
-            timings = []
-            for i in range(num_parts):
-                mark_name = f"part_{i}_end"
-                part_end_time = next(
-                    (time for mark, time in part_timings if mark == mark_name), None
-                )
-                timings.append(part_end_time)
-        else:
-            timings = [total_duration * (i + 1) / num_parts for i in range(num_parts)]
-
-        # 4. Create clips for each part
-        if len(graphic_filepaths) < num_parts:
-            graphic_filepaths += [None] * (num_parts - len(graphic_filepaths))
-
-        part_start_time = 0.0
-        for i, script_part in enumerate(script_parts_text):
-            title_text = f"Part {i+1}"
-            try:
-                title_clip = (
-                    TextClip(
-                        title_text,
-                        fontsize=90,
-                        color="yellow",
-                        fontfile=font_path,
-                        size=(int(VIDEO_SIZE[0] * 0.9), None),
-                        method="caption",
-                        align="center",
-                    )
-                    .with_position("center")
-                    .with_start(part_start_time)
-                    .with_duration(title_duration)
-                    .with_effects([FadeIn(0.5), FadeOut(0.5)])
-                )
-                all_clips_to_composite.append(title_clip)
-            except Exception as e:
-                logging.error(f"Title card error: {e}")
-
-            content_start_time = part_start_time + title_duration
-            part_end_time = (
-                timings[i] if (i < len(timings) and timings[i] is not None) else total_duration
-            )
-            content_duration = max(0.1, part_end_time - content_start_time)
-
-            graphic_path = graphic_filepaths[i]
-            # For the first image, stretch to full video duration (after title)
-            if i == 0 and graphic_path and os.path.exists(graphic_path):
+        # 2. Decode and resize every graphic once to its on-screen box
+        normalized = {}
+        if normalize_images:
+            start = time.time()
+            normalized = normalize_graphics(graphic_filepaths, int(video_size[1] * GRAPHIC_HEIGHT_RATIO), video_size[0], graphics_dir)
+            logging.info(f"Normalized {len(normalized)} graphics in {time.time() - start:.2f}s")
+
+        # 3. Timeline: title cards, graphics and captions per part (from SSML mark timings)
+        render_graphics = [normalized.get(p, p) for p in graphic_filepaths or []]
+        layers = build_timeline(render_graphics, script_parts_text, part_timings, total_duration, title_duration)
+        normalized_paths = set(normalized.values())
+        for layer in layers:
+            if layer["kind"] == "graphic":
+                layer["normalized"] = layer["path"] in normalized_paths
+
+        # 4. Rasterized title cards and captions from the shared cache; both engines overlay the same PNGs
+        text_scale = video_size[1] / BASE_FRAME_HEIGHT
+        for layer in layers:
+            if layer["kind"] in ("title", "caption"):
+                style = scale_style(TITLE_STYLE if layer["kind"] == "title" else CAPTION_STYLE, text_scale)
                 try:
-                    graphic_clip = (
-                        ImageClip(graphic_path)
-                        .with_duration(total_duration - title_duration)
-                        .with_start(title_duration)
-                        .with_position("center")
-                        .resized(height=int(VIDEO_SIZE[1] * 0.8))
-                        .with_effects([FadeIn(0.5), FadeOut(0.5)])
-                    )
-                    all_clips_to_composite.append(graphic_clip)
-                except Exception as img_err:
-                    logging.error(f"Failed to load image '{graphic_path}': {img_err}")
-            elif graphic_path and os.path.exists(graphic_path):
-                try:
-                    graphic_clip = (
-                        ImageClip(graphic_path)
-                        .with_duration(content_duration)
-                        .with_start(content_start_time)
-                        .with_position("center")
-                        .resized(height=int(VIDEO_SIZE[1] * 0.8))
-                        .with_effects([FadeIn(0.5), FadeOut(0.5)])
-                    )
-                    all_clips_to_composite.append(graphic_clip)
-                except Exception as img_err:
-                    logging.error(f"Failed to load image '{graphic_path}': {img_err}")
-            else:
-                logging.warning(f"Graphic file not found for part {i+1}: {graphic_path}")
-
-            try:
-                text_overlay_clip = (
-                    TextClip.create_caption_clip(
-                        txt=script_part,
-                        font_size=40,
-                        color="white",
-                        font=font_path,
-                        size=(int(VIDEO_SIZE[0] * 0.85), int(VIDEO_SIZE[1] * 0.4)),
-                        method="caption",
-                        align="center",
-                        stroke_color="black",
-                        stroke_width=1.5,
-                    )
-                    .with_position(("center", 0.7))
-                    .with_start(content_start_time)
-                    .with_duration(content_duration)
-                    .with_effects([FadeIn(0.5), FadeOut(0.5)])
-                )
-                all_clips_to_composite.append(text_overlay_clip)
-            except Exception as e:
-                logging.error(f"Text overlay error: {e}")
-
-            part_start_time = part_end_time
-
-        # 5. Composite Final Video
-        logging.info("Compositing final video…")
-        final_clip = CompositeVideoClip(all_clips_to_composite, size=VIDEO_SIZE)
-        final_clip = final_clip.with_duration(total_duration).with_audio(audio_clip)
-
-        # 6. Write video file
-        logging.info(f"Writing final video to {unique_output_path}…")
-        final_clip.write_videofile(
-            unique_output_path,
-            codec="libx264",
-            audio_codec="aac",
-            fps=24,
-            threads=4,
-            logger="bar",
-        )
-        logging.info("Video assembly complete.")
-
-        # 7. Upload to GCS and return link
+                    layer["path"], layer["size"] = text_layer_cache.get_or_render(layer["text"], style, font_path, video_size[0])
+                except Exception as e:
+                    logging.error(f"Text layer error ({layer['kind']} {layer['part'] + 1}): {e}")
+        layers = [layer for layer in layers if layer.get("path")]
+
+        # 5. Render: one pass, or one process per part joined with stream copy
+        logging.info(f"Rendering {len(layers)} layers with {engine} ({profile['name']}) to {unique_output_path}…")
+        render_start = time.time()
+        if segment_workers > 1 and len(script_parts_text) > 1:
+            render_segments(layers, audio_filepath, total_duration, unique_output_path,
+                            engine=engine, workers=segment_workers, **encode_options)
+        elif engine == "ffmpeg":
+            render_timeline_ffmpeg(layers, audio_filepath, total_duration, unique_output_path,
+                                   threads=profile["threads"], **encode_options)
+        else:
+            render_timeline_moviepy(layers, audio_filepath, total_duration, unique_output_path,
+                                    threads=profile["threads"], **encode_options)
+        render_info = render_report(profile, engine, time.time() - render_start,
+                                    os.path.getsize(unique_output_path), total_duration)
+        record_render(render_info)
+        if report is not None:
+            report.update(render_info)
+        logging.info(f"Video assembly complete: {render_info}")
+        if not upload:
+            return unique_output_path
+
+        # 6. Upload to GCS and return link
         gcs_filename = os.path.basename(unique_output_path)
         gcs_url = upload_video_to_gcs(unique_output_path, gcs_filename)
         if gcs_url:
@@ -212,21 +166,11 @@ def assemble_video_with_titles(
         return None
 
     finally:
-        if "audio_clip" in locals():
-            audio_clip.close()
-        for clip in all_clips_to_composite:
-            if hasattr(clip, "close"):
-                clip.close()
-        if "final_clip" in locals():
-            final_clip.close()
+        shutil.rmtree(graphics_dir, ignore_errors=True)
 
         # --- Cleanup only used images and audio ---
-        # Remove only the files used for this video
-        used_image_files = [p for p in graphic_filepaths if p and os.path.isfile(p) and not p.endswith("default_placeholder.png")]
-        for img_fp in used_image_files:
-            _delete_file_safe(img_fp)
-        if audio_filepath and os.path.isfile(audio_filepath):
-            _delete_file_safe(audio_filepath)
+        if cleanup_inputs:
+            cleanup_render_inputs(graphic_filepaths, audio_filepath)
 
 
 # --- Example usage wrapper ---
@@ -234,6 +178,13 @@ def build_video_from_pipeline_output(
     pipeline_output,
     font_path="/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
     base_output_path="output_video.mp4",
+    upload=True,
+    cleanup_inputs=True,
+    engine=None,
+    segment_workers=None,
+    normalize_images=None,
+    profile=None,
+    report=None,
 ):
     """
     pipeline_output: dict with keys 'audio_filepath', 'graphic_filepaths', 'script_parts_text', 'mark_timings'
@@ -245,4 +196,11 @@ def build_video_from_pipeline_output(
         part_timings=pipeline_output.get("mark_timings"),
         font_path=font_path,
         base_output_path=base_output_path,
+        upload=upload,
+        cleanup_inputs=cleanup_inputs,
+        engine=engine,
+        segment_workers=segment_workers,
+        normalize_images=normalize_images,
+        profile=profile,
+        report=report,
     )
@@ -0,0 +1,335 @@
+# --- utils/video_jobs.py ---
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+
+# ------------------- Configuration -------------------
+VIDEO_JOBS_DIR = os.getenv("VIDEO_JOBS_DIR", os.path.join(os.path.dirname(__file__), "..", ".video_jobs"))
+VIDEO_JOB_WORKERS = int(os.getenv("VIDEO_JOB_WORKERS", "2"))
+# MoviePy renders are CPU and memory heavy; this bounds them across job workers and /generate_video
+VIDEO_MAX_CONCURRENT_RENDERS = int(os.getenv("VIDEO_MAX_CONCURRENT_RENDERS", "1"))
+# Workers renew the lease on their running jobs every VIDEO_JOB_LEASE_SECONDS / 4; a job whose lease
+# has expired belongs to a process that died (or was frozen) and is queued again
+VIDEO_JOB_LEASE_SECONDS = int(os.getenv("VIDEO_JOB_LEASE_SECONDS", "120"))
+VIDEO_JOB_RETENTION_SECONDS = int(os.getenv("VIDEO_JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))  # 7 days
+
+VIDEO_STAGES = ("script", "audio", "images", "render", "upload")
+
+render_slots = threading.BoundedSemaphore(VIDEO_MAX_CONCURRENT_RENDERS)
+
+
+class VideoJobQueue:
+    """
+    Persistent queue of /generate_video jobs backed by a SQLite file.
+
+    Worker threads claim queued jobs and run them through `runner(params, checkpoint, on_stage, cancel_event)`,
+    which returns the pipeline's (results, timings). The result of every finished stage is written to the
+    job's checkpoint, so a retried (or crash-recovered) job resumes after the last completed stage.
+    Cancelling a running job takes effect at the next stage boundary.
+
+    A running job is owned by the process that claimed it and leased for `lease_seconds`, renewed by a
+    heartbeat thread. Only jobs whose lease expired are recovered, so several processes can share the file.
+    """
+
+    def __init__(self, jobs_dir: str, workers: int, poll_seconds: float = 2.0,
+                 lease_seconds: int = VIDEO_JOB_LEASE_SECONDS):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._threads = []
+        self._runner = None
+        self._resumable = None
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.resumed = 0
+        self.recovered = 0
+
+        os.makedirs(jobs_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(jobs_dir, "video_jobs.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " stages TEXT NOT NULL,"
+            " checkpoint TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT,"
+            " lease_expires_at REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:  # files created before leases were added
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+        self._conn.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND updated_at < ?",
+            (time.time() - VIDEO_JOB_RETENTION_SECONDS,)
+        )
+        self._conn.commit()
+
+    # ------------------- Workers -------------------
+    def start(self, runner, resumable=None) -> None:
+        """
+        Start the worker and heartbeat threads once per process. Jobs left "running" by a process that
+        died (redeploy, OOM kill) are requeued once their lease expires, here and before every claim.
+        `resumable(checkpoint)` drops checkpointed stages that can no longer be reused (e.g. deleted files).
+        """
+        with self._lock:
+            if self._threads:
+                return
+            self._runner = runner
+            self._resumable = resumable
+            self._recover_locked()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"video-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name="video-job-heartbeat", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _recover_locked(self) -> None:
+        """Requeue running jobs whose owner stopped renewing the lease (rows without one predate leases)."""
+        now = time.time()
+        requeued = self._conn.execute(
+            "UPDATE jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL, updated_at = ? "
+            "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)",
+            (now, now)
+        ).rowcount
+        self._conn.commit()
+        if requeued:
+            self.recovered += requeued
+            logging.warning(f"[VideoJobs] Requeued {requeued} job(s) whose worker stopped renewing the lease")
+
+    def _heartbeat(self) -> None:
+        while True:
+            time.sleep(self.lease_seconds / 4)
+            try:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE jobs SET lease_expires_at = ? WHERE status = 'running' AND owner = ?",
+                        (time.time() + self.lease_seconds, self.owner)
+                    )
+                    self._conn.commit()
+            except Exception as e:
+                logging.error(f"[VideoJobs] Failed to renew job leases: {e}", exc_info=True)
+
+    def _worker(self) -> None:
+        while True:
+            try:
+                job = self._claim()
+            except Exception as e:
+                logging.error(f"[VideoJobs] Failed to claim a job: {e}", exc_info=True)
+                job = None
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            self._run(job)
+
+    def _claim(self) -> dict | None:
+        with self._lock:
+            self._recover_locked()
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            # Guarded on status so that two processes sharing the file never claim the same job
+            now = time.time()
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = ? AND status = 'queued'",
+                (self.owner, now + self.lease_seconds, now, row[0])
+            ).rowcount
+            self._conn.commit()
+            return self._get_locked(row[0], include_checkpoint=True) if claimed else None
+
+    def _run(self, job: dict) -> None:
+        job_id = job["id"]
+        stages = job["stages"]
+        checkpoint = job["checkpoint"]
+        if checkpoint and self._resumable:
+            checkpoint = self._resumable(checkpoint)
+        for name in VIDEO_STAGES:
+            if name not in checkpoint:
+                stages[name] = {"status": "pending"}
+        cancel_event = threading.Event()
+        if checkpoint:
+            self.resumed += 1
+            logging.info(f"[VideoJobs] Job {job_id} resuming after: {', '.join(checkpoint)}")
+
+        def on_stage(name, status, result=None):
+            if name not in VIDEO_STAGES:
+                return
+            stages[name] = {**stages.get(name, {}), "status": status, "updated_at": round(time.time(), 3)}
+            if status == "done":
+                checkpoint[name] = result
+            with self._lock:
+                owned = self._conn.execute(
+                    "UPDATE jobs SET stages = ?, checkpoint = ?, updated_at = ? WHERE id = ? AND owner = ?",
+                    (json.dumps(stages), json.dumps(checkpoint, ensure_ascii=False), time.time(), job_id, self.owner)
+                ).rowcount
+                self._conn.commit()
+                cancel = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if not owned:
+                logging.warning(f"[VideoJobs] Job {job_id} lost its lease to another worker, stopping")
+                cancel_event.set()
+            elif cancel and cancel[0]:
+                cancel_event.set()
+
+        results, timings, error = {}, {}, None
+        try:
+            results, timings = self._runner(job["params"], dict(checkpoint), on_stage, cancel_event)
+        except Exception as e:
+            logging.error(f"[VideoJobs] Job {job_id} crashed: {e}", exc_info=True)
+            error = str(e)
+
+        for name in VIDEO_STAGES:
+            timing = timings.get(name)
+            if timing and not timing.get("resumed"):
+                stages[name] = {**stages.get(name, {}), "status": timing.get("status", "failed"),
+                                "seconds": timing.get("seconds", 0.0)}
+                if timing.get("error"):
+                    stages[name]["error"] = timing["error"]
+
+        if results.get("upload"):
+            status = "done"
+        elif cancel_event.is_set():
+            status = "cancelled"
+        else:
+            status = "failed"
+            error = error or next((f"{name}: {stages[name].get('error', 'failed')}" for name in VIDEO_STAGES
+                                   if stages.get(name, {}).get("status") == "failed"), "Pipeline failed")
+
+        with self._lock:
+            owned = self._conn.execute(
+                "UPDATE jobs SET status = ?, stages = ?, checkpoint = ?, result = ?, error = ?, owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND owner = ?",
+                (status, json.dumps(stages), json.dumps(checkpoint, ensure_ascii=False),
+                 results.get("upload"), None if status == "done" else error, time.time(), job_id, self.owner)
+            ).rowcount
+            self._conn.commit()
+        if not owned:
+            logging.warning(f"[VideoJobs] Job {job_id} was taken over by another worker; its {status} result is discarded")
+            return
+        if status == "done":
+            self.completed += 1
+        elif status == "cancelled":
+            self.cancelled += 1
+        else:
+            self.failed += 1
+        logging.info(f"[VideoJobs] Job {job_id} {status}")
+
+    # ------------------- API -------------------
+    def submit(self, params: dict) -> dict:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        stages = {name: {"status": "pending"} for name in VIDEO_STAGES}
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, params, stages, checkpoint, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, '{}', ?, ?)",
+                (job_id, json.dumps(params, ensure_ascii=False), json.dumps(stages), now, now)
+            )
+            self._conn.commit()
+            job = self._get_locked(job_id)
+        self._wake.set()
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            return self._get_locked(job_id)
+
+    def cancel(self, job_id: str) -> dict | None:
+        """Queued jobs are cancelled at once; running jobs stop before their next stage starts."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = CASE status WHEN 'queued' THEN 'cancelled' ELSE status END, "
+                "cancel_requested = 1, updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (time.time(), job_id)
+            )
+            self._conn.commit()
+            return self._get_locked(job_id)
+
+    def retry(self, job_id: str) -> dict | None:
+        """
+        Queue a failed or cancelled job again; completed stages are not re-run. A "running" job whose
+        lease expired is orphaned and can be retried too.
+        """
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET status = 'queued', cancel_requested = 0, error = NULL, owner = NULL, "
+                "lease_expires_at = NULL, updated_at = ? WHERE id = ? AND (status IN ('failed', 'cancelled') "
+                "OR (status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)))",
+                (now, job_id, now)
+            )
+            self._conn.commit()
+            job = self._get_locked(job_id)
+        self._wake.set()
+        return job
+
+    def _get_locked(self, job_id: str, include_checkpoint: bool = False) -> dict | None:
+        row = self._conn.execute(
+            "SELECT id, status, params, stages, checkpoint, result, error, attempts, cancel_requested, created_at, updated_at "
+            "FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        stages = json.loads(row[3])
+        checkpoint = json.loads(row[4])
+        job = {
+            "id": row[0],
+            "status": row[1],
+            "params": json.loads(row[2]),
+            "stages": stages,
+            "progress": round(sum(s.get("status") == "done" for s in stages.values()) / len(VIDEO_STAGES), 2),
+            "video_path": row[5],
+            "render": (checkpoint.get("render") or {}).get("report"),
+            "error": row[6],
+            "attempts": row[7],
+            "cancel_requested": bool(row[8]),
+            "created_at": row[9],
+            "updated_at": row[10],
+        }
+        if include_checkpoint:
+            job["checkpoint"] = checkpoint
+        else:
+            job["params"].pop("summary_text", None)  # can be large; the client already has it
+        return job
+
+    # ------------------- Metrics -------------------
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {
+            "workers": self.workers,
+            "max_concurrent_renders": VIDEO_MAX_CONCURRENT_RENDERS,
+            "by_status": counts,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "resumed": self.resumed,
+            "recovered": self.recovered,
+            "owner": self.owner,
+            "lease_seconds": self.lease_seconds,
+        }
+
+
+video_jobs = VideoJobQueue(VIDEO_JOBS_DIR, VIDEO_JOB_WORKERS)